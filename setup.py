@@ -82,7 +82,7 @@ elif os.path.exists(SASVIEW_BUILD):
 # 'sys.maxsize' and 64bit: Not supported for python2.5
 is_64bits = sys.maxsize > 2**32
 
-enable_openmp = False
+enable_openmp = True
 if sys.platform == 'darwin':
     if not is_64bits:
         # Disable OpenMP
@@ -438,6 +438,7 @@ setup(
     entry_points={
         'console_scripts': [
             "sasview = sas.sasview.sasview:run_gui",
+            "sasview-batchfit = sas.sascalc.fit.batch_fit:main",
         ]
     },
     cmdclass={'build_ext': build_ext_subclass,
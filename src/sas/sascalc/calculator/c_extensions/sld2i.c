@@ -2,7 +2,11 @@
 Computes the (magnetic) scattering form sld (n and m) profile
  */
 #include <stdio.h>
+#include <stdlib.h>
 #include <math.h>
+#ifdef _OPENMP
+#include <omp.h>
+#endif
 #include "sld2i.h"
 #include "libfunc.h"
 #include "librefl.h"
@@ -23,11 +27,14 @@ Computes the (magnetic) scattering form sld (n and m) profile
  * @param in_spin: ratio of up spin in Iin
  * @param out_spin: ratio of up spin in Iout
  * @param s_theta: angle (from x-axis) of the up spin in degree
+ * @param n_nuc: number of leading pixels without magnetization when the
+ *   pixels are split for genicomXY (no null pixels, non-magnetic first);
+ *   negative if the pixels are not split
  */
 void initGenI(GenI* this, int is_avg, int npix, double* x, double* y, double* z, double* sldn,
 			double* mx, double* my, double* mz, double* voli,
 			double in_spin, double out_spin,
-			double s_theta) {
+			double s_theta, int n_nuc) {
 	this->is_avg = is_avg;
 	this->n_pix = npix;
 	this->x_val = x;
@@ -41,44 +48,244 @@ void initGenI(GenI* this, int is_avg, int npix, double* x, double* y, double* z,
 	this->inspin = in_spin;
 	this->outspin = out_spin;
 	this->stheta = s_theta;
+	this->n_nuc = n_nuc;
+}
+
+/**
+ * Number of threads to use for a loop over q
+ * @param nthreads: requested number of threads; <= 0 for the OpenMP default
+ */
+static int get_nthreads(int nthreads) {
+#ifdef _OPENMP
+	return nthreads > 0 ? nthreads : omp_get_max_threads();
+#else
+	return 1;
+#endif
+}
+
+/**
+ * Compute 2D anisotropic for split pixels (see initGenI)
+ *
+ * Same result as the per pixel calculation in genicomXY, but the spin
+ * dependent slds of cal_msld are expanded here: the non-magnetic pixels
+ * need only one phase sum per q point, and for the magnetic pixels the
+ * phases and the magnetization components are stored in arrays that are
+ * then reduced in one loop per active spin channel.
+ *
+ * @return 0 if the work arrays could not be allocated, else 1
+ */
+static int genicomXY_split(GenI* this, int npoints, double *qx, double *qy, double *I_out, int nthreads){
+	double pi = 4.0*atan(1.0);
+	double s_theta = this->stheta * pi/180.0;
+	double cos_st = cos(-s_theta);
+	double sin_st = sin(-s_theta);
+	double in_spin = this->inspin;
+	double out_spin = this->outspin;
+	int n_nuc = this->n_nuc;
+	int n_mag = this->n_pix - this->n_nuc;
+	int has_uu = (this->inspin > 0.0 && this->outspin > 0.0);
+	int has_dd = (this->inspin < 1.0 && this->outspin < 1.0);
+	int has_ud = (this->inspin > 0.0 && this->outspin < 1.0);
+	int has_du = (this->inspin < 1.0 && this->outspin > 0.0);
+	// spin weights of the non-magnetic pixels
+	double nuc_uu = sqrt(sqrt(in_spin * out_spin));
+	double nuc_dd = sqrt(sqrt((1.0 - in_spin) * (1.0 - out_spin)));
+	double mag_uu, mag_dd, mag_ud, mag_du;
+	double count = 0.0;
+	double *work;
+	int n_threads = get_nthreads(nthreads);
+	int i, j;
+
+	// Magnetic pixels use the spin fractions clipped to [0, 1]
+	if (in_spin < 0.0) in_spin = 0.0;
+	if (in_spin > 1.0) in_spin = 1.0;
+	if (out_spin < 0.0) out_spin = 0.0;
+	if (out_spin > 1.0) out_spin = 1.0;
+	mag_uu = sqrt(sqrt(in_spin * out_spin));
+	mag_dd = sqrt(sqrt((1.0 - in_spin) * (1.0 - out_spin)));
+	mag_ud = sqrt(sqrt(in_spin * (1.0 - out_spin)));
+	mag_du = sqrt(sqrt((1.0 - in_spin) * out_spin));
+
+	for(j=0; j<this->n_pix; j++){
+		count += this->vol_pix[j];
+	}
+
+	// Four work arrays of n_mag values per thread
+	work = (double *)malloc((size_t)n_threads * 4 * (n_mag > 0 ? n_mag : 1) * sizeof(double));
+	if (work == NULL) return 0;
+
+	#pragma omp parallel num_threads(n_threads) private(i, j)
+	{
+		// Structure of arrays for the magnetic pixels of one q point
+		int thread = 0;
+		double *buf;
+		double *x = this->x_val + n_nuc;
+		double *y = this->y_val + n_nuc;
+		double *sld = this->sldn_val + n_nuc;
+		double *mx = this->mx_val + n_nuc;
+		double *my = this->my_val + n_nuc;
+		double *mz = this->mz_val + n_nuc;
+		double *vol = this->vol_pix + n_nuc;
+		double *e_re, *e_im, *sig_x, *sig_y;
+#ifdef _OPENMP
+		thread = omp_get_thread_num();
+#endif
+		buf = work + (size_t)thread * 4 * n_mag;
+		e_re = buf;
+		e_im = buf + n_mag;
+		sig_x = buf + 2 * n_mag;
+		sig_y = buf + 3 * n_mag;
+
+		#pragma omp for schedule(dynamic)
+		for(i=0; i<npoints; i++){
+			double q_angle, qr, m_x, m_perp_x, m_perp_y;
+			double cos_qa, sin_qa, cos_mqa, sin_mqa;
+			double nuc_re = 0.0, nuc_im = 0.0;
+			double uu_re = 0.0, uu_im = 0.0, dd_re = 0.0, dd_im = 0.0;
+			double ud_re = 0.0, ud_im = 0.0, du_re = 0.0, du_im = 0.0;
+			double b_re, b_im;
+			int is_q0 = (fabs(qx[i]) < 1.0e-16 && fabs(qy[i]) < 1.0e-16);
+
+			// Non-magnetic pixels: one phase sum for all channels
+			for(j=0; j<n_nuc; j++){
+				qr = (qx[i]*this->x_val[j] + qy[i]*this->y_val[j]);
+				nuc_re += this->sldn_val[j] * this->vol_pix[j] * cos(qr);
+				nuc_im += this->sldn_val[j] * this->vol_pix[j] * sin(qr);
+			}
+
+			// q direction as in cal_msld
+			if (qx[i] == 0.0) q_angle = pi / 2.0;
+			else q_angle = atan(qy[i]/qx[i]);
+			if (qy[i] < 0.0 && qx[i] < 0.0) q_angle -= pi;
+			else if (qy[i] > 0.0 && qx[i] < 0.0) q_angle += pi;
+			q_angle = pi/2.0 - q_angle;
+			if (q_angle > pi) q_angle -= 2.0 * pi;
+			else if (q_angle < -pi) q_angle += 2.0 * pi;
+			cos_qa = cos(q_angle);
+			sin_qa = sin(q_angle);
+			cos_mqa = cos(-q_angle);
+			sin_mqa = sin(-q_angle);
+
+			// Magnetic pixels: phases and the magnetization components
+			// along the neutron spin frame
+			for(j=0; j<n_mag; j++){
+				qr = (qx[i]*x[j] + qy[i]*y[j]);
+				e_re[j] = vol[j] * cos(qr);
+				e_im[j] = vol[j] * sin(qr);
+				m_x = is_q0 ? 0.0 : mx[j];
+				m_perp_x = m_x * cos_qa - mz[j] * sin_qa;
+				m_perp_y = m_perp_x * sin_mqa;
+				m_perp_x *= cos_mqa;
+				sig_x[j] = m_perp_x * cos_st - m_perp_y * sin_st;
+				sig_y[j] = m_perp_x * sin_st + m_perp_y * cos_st;
+			}
+			//up_up
+			if (has_uu){
+				for(j=0; j<n_mag; j++){
+					b_re = mag_uu * (sld[j] - sig_x[j]);
+					uu_re += b_re * e_re[j];
+					uu_im += b_re * e_im[j];
+				}
+				uu_re += nuc_uu * nuc_re;
+				uu_im += nuc_uu * nuc_im;
+			}
+			//down_down
+			if (has_dd){
+				for(j=0; j<n_mag; j++){
+					b_re = mag_dd * (sld[j] + sig_x[j]);
+					dd_re += b_re * e_re[j];
+					dd_im += b_re * e_im[j];
+				}
+				dd_re += nuc_dd * nuc_re;
+				dd_im += nuc_dd * nuc_im;
+			}
+			//up_down
+			if (has_ud){
+				for(j=0; j<n_mag; j++){
+					b_re = mag_ud * sig_y[j];
+					b_im = mag_ud * my[j];
+					ud_re += b_re * e_re[j] - b_im * e_im[j];
+					ud_im += b_re * e_im[j] + b_im * e_re[j];
+				}
+			}
+			//down_up
+			if (has_du){
+				for(j=0; j<n_mag; j++){
+					b_re = mag_du * sig_y[j];
+					b_im = -mag_du * my[j];
+					du_re += b_re * e_re[j] - b_im * e_im[j];
+					du_im += b_re * e_im[j] + b_im * e_re[j];
+				}
+			}
+
+			I_out[i] = (uu_re*uu_re + uu_im*uu_im);
+			I_out[i] += (ud_re*ud_re + ud_im*ud_im);
+			I_out[i] += (du_re*du_re + du_im*du_im);
+			I_out[i] += (dd_re*dd_re + dd_im*dd_im);
+
+			I_out[i] *= (1.0E+8 / count); //in cm (unit) / number; //to be multiplied by vol_pix
+		}
+	}
+	free(work);
+	return 1;
 }
 
 /**
  * Compute 2D anisotropic
+ *
+ * The q points are independent and are shared between nthreads threads,
+ * so the result does not depend on the number of threads.
  */
-void genicomXY(GenI* this, int npoints, double *qx, double *qy, double *I_out){
+void genicomXY(GenI* this, int npoints, double *qx, double *qy, double *I_out, int nthreads){
 	//npoints is given negative for angular averaging
 	// Assumes that q doesn't have qz component and sld_n is all real
 	//double q = 0.0;
 	//double Pi = 4.0*atan(1.0);
-	polar_sld b_sld;
-	double qr = 0.0;
-	Cplx iqr;
-	Cplx ephase;
-	Cplx comp_sld;
-
-	Cplx sumj_uu;
-	Cplx sumj_ud;
-	Cplx sumj_du;
-	Cplx sumj_dd;
-	Cplx temp_fi;
-
 	double count = 0.0;
 	int i, j;
 
-	cassign(&iqr, 0.0, 0.0);
-	cassign(&ephase, 0.0, 0.0);
-	cassign(&comp_sld, 0.0, 0.0);
+	if (this->n_nuc >= 0 && genicomXY_split(this, npoints, qx, qy, I_out, nthreads)) {
+		return;
+	}
 
 	//Assume that pixel volumes are given in vol_pix in A^3 unit
 	//int x_size = 0; //in Ang
 	//int y_size = 0; //in Ang
 	//int z_size = 0; //in Ang
 
+	// Total volume of the non-zero pixels; computed once before the
+	// q loop so that it is not shared between threads
+	for(j=0; j<this->n_pix; j++){
+		if (this->sldn_val[j]!=0.0
+			||this->mx_val[j]!=0.0
+			||this->my_val[j]!=0.0
+			||this->mz_val[j]!=0.0)
+		{
+			count += this->vol_pix[j];
+		}
+	}
+
 	// Loop over q-values and multiply apply matrix
 
 	//printf("npoints: %d, npix: %d\n", npoints, this->n_pix);
+	#pragma omp parallel for num_threads(get_nthreads(nthreads)) private(j) schedule(dynamic)
 	for(i=0; i<npoints; i++){
+		polar_sld b_sld;
+		double qr = 0.0;
+		Cplx iqr;
+		Cplx ephase;
+		Cplx comp_sld;
+
+		Cplx sumj_uu;
+		Cplx sumj_ud;
+		Cplx sumj_du;
+		Cplx sumj_dd;
+		Cplx temp_fi;
+
+		cassign(&iqr, 0.0, 0.0);
+		cassign(&ephase, 0.0, 0.0);
+		cassign(&comp_sld, 0.0, 0.0);
+
 		//I_out[i] = 0.0;
 		cassign(&sumj_uu, 0.0, 0.0);
 		cassign(&sumj_ud, 0.0, 0.0);
@@ -129,10 +336,6 @@ void genicomXY(GenI* this, int npoints, double *qx, double *qy, double *I_out){
 					cplx_mult(&temp_fi, comp_sld, ephase);
 					cplx_add(&sumj_du, sumj_du, temp_fi);
 				}
-
-				if (i == 0){
-					count += this->vol_pix[j];
-				}
 			}
 		}
 		//printf("aa%d=%g %g %d\n", i, (sumj_uu.re*sumj_uu.re + sumj_uu.im*sumj_uu.im), (sumj_dd.re*sumj_dd.re + sumj_dd.im*sumj_dd.im), count);
@@ -151,20 +354,26 @@ void genicomXY(GenI* this, int npoints, double *qx, double *qy, double *I_out){
  * Isotropic: Assumes all slds are real (no magnetic)
  * Also assumes there is no polarization: No dependency on spin
  */
-void genicom(GenI* this, int npoints, double *q, double *I_out){
+void genicom(GenI* this, int npoints, double *q, double *I_out, int nthreads){
 	//npoints is given negative for angular averaging
 	// Assumes that q doesn't have qz component and sld_n is all real
 	//double Pi = 4.0*atan(1.0);
-	double qr = 0.0;
-	double sumj;
-	double sld_j = 0.0;
 	double count = 0.0;
 	int i, j, k;
 
+	// Total pixel volume; computed once before the q loop so that it is
+	// not shared between threads
+	for(j=0; j<this->n_pix; j++){
+		count += this->vol_pix[j];
+	}
+
 	//Assume that pixel volumes are given in vol_pix in A^3 unit
 	// Loop over q-values and multiply apply matrix
+	#pragma omp parallel for num_threads(get_nthreads(nthreads)) private(j, k) schedule(dynamic)
 	for(i=0; i<npoints; i++){
-		sumj =0.0;
+		double qr = 0.0;
+		double sumj = 0.0;
+		double sld_j = 0.0;
 		for(j=0; j<this->n_pix; j++){
 			//Isotropic: Assumes all slds are real (no magnetic)
 			//Also assumes there is no polarization: No dependency on spin
@@ -181,7 +390,6 @@ void genicom(GenI* this, int npoints, double *q, double *I_out){
 			}
 			else{
 				//full calculation
-				//pragma omp parallel for
 				for(k=0; k<this->n_pix; k++){
 					sld_j =  this->sldn_val[j] * this->sldn_val[k] * this->vol_pix[j] * this->vol_pix[k];
 					qr = (this->x_val[j]-this->x_val[k])*(this->x_val[j]-this->x_val[k])+
@@ -196,9 +404,6 @@ void genicom(GenI* this, int npoints, double *q, double *I_out){
 					}
 				}
 			}
-			if (i == 0){
-				count += this->vol_pix[j];
-			}
 		}
 		I_out[i] = sumj;
 		if (this->is_avg == 1) {
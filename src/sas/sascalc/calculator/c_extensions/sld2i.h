@@ -23,15 +23,17 @@ typedef struct {
     double inspin;
     double outspin;
     double stheta;
+    // number of non-magnetic pixels if split, else negative
+    int n_nuc;
 } GenI;
 
 // Constructor
 void initGenI(GenI*, int is_avg, int npix, double* x, double* y, double* z,
 		double* sldn, double* mx, double* my, double* mz, double* voli,
 		double in_spin, double out_spin,
-		double s_theta);
+		double s_theta, int n_nuc);
 // compute function
-void genicomXY(GenI*, int npoints, double* qx, double* qy, double *I_out);
-void genicom(GenI*, int npoints, double* q, double *I_out);
+void genicomXY(GenI*, int npoints, double* qx, double* qy, double *I_out, int nthreads);
+void genicom(GenI*, int npoints, double* q, double *I_out, int nthreads);
 
 #endif
@@ -67,11 +67,12 @@ PyObject * new_GenI(PyObject *self, PyObject *args) {
 	double inspin;
 	double outspin;
 	double stheta;
+	int n_nuc = -1;
 	PyObject *obj;
 	GenI* sld2i;
 
 	//printf("new GenI\n");
-	if (!PyArg_ParseTuple(args, "iOOOOOOOOddd", &is_avg, &x_val_obj, &y_val_obj, &z_val_obj, &sldn_val_obj, &mx_val_obj, &my_val_obj, &mz_val_obj, &vol_pix_obj, &inspin, &outspin, &stheta)) return NULL;
+	if (!PyArg_ParseTuple(args, "iOOOOOOOOddd|i", &is_avg, &x_val_obj, &y_val_obj, &z_val_obj, &sldn_val_obj, &mx_val_obj, &my_val_obj, &mz_val_obj, &vol_pix_obj, &inspin, &outspin, &stheta, &n_nuc)) return NULL;
 	INVECTOR(x_val_obj, x_val, n_x);
 	INVECTOR(y_val_obj, y_val, n_y);
 	INVECTOR(z_val_obj, z_val, n_z);
@@ -83,7 +84,7 @@ PyObject * new_GenI(PyObject *self, PyObject *args) {
 	sld2i = PyMem_Malloc(sizeof(GenI));
 	//printf("sldi:%p\n", sld2i);
 	if (sld2i != NULL) {
-		initGenI(sld2i,is_avg,(int)n_x,x_val,y_val,z_val,sldn_val,mx_val,my_val,mz_val,vol_pix,inspin,outspin,stheta);
+		initGenI(sld2i,is_avg,(int)n_x,x_val,y_val,z_val,sldn_val,mx_val,my_val,mz_val,vol_pix,inspin,outspin,stheta,n_nuc);
 	}
 	obj = PyCapsule_New(sld2i, "GenI", del_sld2i);
 	//printf("constructed %p\n", obj);
@@ -102,10 +103,11 @@ PyObject * genicom_inputXY(PyObject *self, PyObject *args) {
 	double *qx;
 	double *qy;
 	double *I_out;
+	int nthreads = 0;
 	GenI* sld2i;
 
 	//printf("in genicom_inputXY\n");
-	if (!PyArg_ParseTuple(args, "OOOO",  &gen_obj, &qx_obj, &qy_obj, &I_out_obj)) return NULL;
+	if (!PyArg_ParseTuple(args, "OOOO|i",  &gen_obj, &qx_obj, &qy_obj, &I_out_obj, &nthreads)) return NULL;
 	sld2i = (GenI *)PyCapsule_GetPointer(gen_obj, "GenI");
 	INVECTOR(qx_obj, qx, n_qx);
 	INVECTOR(qy_obj, qy, n_qy);
@@ -115,7 +117,9 @@ PyObject * genicom_inputXY(PyObject *self, PyObject *args) {
 	// Sanity check
 	//if(n_q!=n_out) return Py_BuildValue("i",-1);
 
-	genicomXY(sld2i, (int)n_qx, qx, qy, I_out);
+	Py_BEGIN_ALLOW_THREADS
+	genicomXY(sld2i, (int)n_qx, qx, qy, I_out, nthreads);
+	Py_END_ALLOW_THREADS
 	//printf("done calc\n");
 	//return PyCObject_FromVoidPtr(s, del_genicom);
 	return Py_BuildValue("i",1);
@@ -131,9 +135,10 @@ PyObject * genicom_input(PyObject *self, PyObject *args) {
 	Py_ssize_t n_q, n_out;
 	double *q;
 	double *I_out;
+	int nthreads = 0;
 	GenI *sld2i;
 
-	if (!PyArg_ParseTuple(args, "OOO",  &gen_obj, &q_obj, &I_out_obj)) return NULL;
+	if (!PyArg_ParseTuple(args, "OOO|i",  &gen_obj, &q_obj, &I_out_obj, &nthreads)) return NULL;
 	sld2i = (GenI *)PyCapsule_GetPointer(gen_obj, "GenI");
 	INVECTOR(q_obj, q, n_q);
 	OUTVECTOR(I_out_obj, I_out, n_out);
@@ -141,7 +146,9 @@ PyObject * genicom_input(PyObject *self, PyObject *args) {
 	// Sanity check
 	//if (n_q!=n_out) return Py_BuildValue("i",-1);
 
-	genicom(sld2i, (int)n_q, q, I_out);
+	Py_BEGIN_ALLOW_THREADS
+	genicom(sld2i, (int)n_q, q, I_out, nthreads);
+	Py_END_ALLOW_THREADS
 	return Py_BuildValue("i",1);
 }
 
@@ -152,9 +159,9 @@ static PyMethodDef module_methods[] = {
 	{"new_GenI", (PyCFunction)new_GenI, METH_VARARGS,
 		  "Create a new GenI object"},
 	{"genicom",(PyCFunction)genicom_input, METH_VARARGS,
-		  "genicom the given 1d input arrays"},
+		  "genicom the given 1d input arrays using nthreads (optional) threads"},
 	{"genicomXY",(PyCFunction)genicom_inputXY, METH_VARARGS,
-		  "genicomXY the given 2d input arrays"},
+		  "genicomXY the given 2d input arrays using nthreads (optional) threads"},
     {NULL}
 };
 
@@ -40,6 +40,11 @@ class ResolutionCalculator(object):
         # 2d image of the resolution
         self.image = []
         self.image_lam = []
+        # number of points of the image grid in each direction
+        self.image_size = 1000
+        # the image of each wavelength is only computed within this many
+        # sigmas of q (None for the whole image)
+        self.image_nsigma = 6
         # resolutions
         # lamda in r-direction
         self.sigma_lamd = 0
@@ -92,6 +97,22 @@ class ResolutionCalculator(object):
         : qx_value: x component of q
         : qy_value: y component of q
         """
+        image = self.compute_image(qx_value, qy_value, qx_min, qx_max,
+                                   qy_min, qy_max, coord)
+        # plot image
+        return self.plot_image(image)
+
+    def compute_image(self, qx_value, qy_value, qx_min, qx_max,
+                      qy_min, qy_max, coord='cartesian'):
+        """
+        Compute the resolution and its 2D image, without plotting it
+        : qx_value: x component of q
+        : qy_value: y component of q
+
+        : return: the image, added to the images of the previous calls
+            until reset_image is called; its q range is given by
+            get_detector_qrange
+        """
         # make sure to update all the variables need.
         # except lambda, dlambda, and intensity
         self.get_all_instrument_params()
@@ -190,8 +211,7 @@ class ResolutionCalculator(object):
         else:
             self.image = image_out
 
-        # plot image
-        return self.plot_image(self.image)
+        return self.image
 
     def setup_tof(self, wavelength, wavelength_spread):
         """
@@ -217,6 +237,128 @@ class ResolutionCalculator(object):
         : qx_value: x component of q
         : qy_value: y component of q
         """
+        qr_value, phi, sigma_1, sigma_2, sigma_r, sigma1d = \
+            self._compute(wavelength, wavelength_spread, qx_value, qy_value,
+                          coord, tof)
+        # set sigmas
+        self.sigma_1 = sigma_1
+        self.sigma_lamd = sigma_r
+        self.sigma_2 = sigma_2
+        self.sigma_1d = sigma1d
+        return qr_value, phi, sigma_1, sigma_2, sigma_r, sigma1d
+
+    def compute_resolution(self, qx_value, qy_value, wavelength=None,
+                           wavelength_spread=None):
+        """
+        Compute the Q resolution at many q values, and for many wavelengths,
+        in one call
+
+        : qx_value: array of x components of q
+        : qy_value: array of y components of q
+        : wavelength: wavelength, or list of wavelengths (default: the list
+            of wavelengths of the calculator)
+        : wavelength_spread: wavelength spread, or list of spreads (default:
+            the list of spreads of the calculator)
+
+        : return: qr_value, phi, sigma_1, sigma_2, sigma_r, sigma1d arrays
+            of the shape of qx_value and qy_value, with a leading wavelength
+            axis when a list of wavelengths is given
+        """
+        self.get_all_instrument_params()
+        lamb, lamb_spread, tof = self._get_wave_arrays(wavelength,
+                                                       wavelength_spread)
+        qx_value = np.asarray(qx_value, dtype=float)
+        qy_value = np.asarray(qy_value, dtype=float)
+        if np.ndim(lamb) > 0:
+            shape = (len(lamb),) + (1,) * np.broadcast(qx_value, qy_value).ndim
+            lamb = lamb.reshape(shape)
+            lamb_spread = lamb_spread.reshape(shape)
+        return self._compute_arrays(lamb, lamb_spread, qx_value, qy_value, tof)
+
+    def compute_detector(self, wavelength=None, wavelength_spread=None):
+        """
+        Compute the Q resolution at the center of every pixel of the detector
+
+        : wavelength: wavelength, or list of wavelengths (default: the list
+            of wavelengths of the calculator)
+        : wavelength_spread: wavelength spread, or list of spreads (default:
+            the list of spreads of the calculator)
+
+        : return: qx_value, qy_value, sigma_1, sigma_2, sigma_r, sigma1d
+            arrays with one value per pixel, of shape (pixels in x, pixels
+            in y), with a leading wavelength axis when a list of wavelengths
+            is given
+        """
+        self.get_all_instrument_params()
+        lamb, lamb_spread, tof = self._get_wave_arrays(wavelength,
+                                                       wavelength_spread)
+        if np.ndim(lamb) > 0:
+            qxqy = [self._get_detector_qxqy(lam) for lam in lamb]
+            qx_value = np.array([qx for qx, _ in qxqy])
+            qy_value = np.array([qy for _, qy in qxqy])
+            lamb = lamb[:, None, None]
+            lamb_spread = lamb_spread[:, None, None]
+        else:
+            qx_value, qy_value = self._get_detector_qxqy(lamb)
+        _, _, sigma_1, sigma_2, sigma_r, sigma1d = \
+            self._compute_arrays(lamb, lamb_spread, qx_value, qy_value, tof)
+        return qx_value, qy_value, sigma_1, sigma_2, sigma_r, sigma1d
+
+    def _get_wave_arrays(self, wavelength, wavelength_spread):
+        """
+        Get the wavelengths and spreads to compute the resolution for
+
+        : return: wavelength, wavelength_spread, tof; the first two are
+            scalars for a single wavelength, and 1D arrays for a list
+        """
+        lamda_list, dlamb_list = self.get_wave_list()
+        if wavelength is None:
+            wavelength = lamda_list
+        if wavelength_spread is None:
+            wavelength_spread = dlamb_list
+        if np.ndim(wavelength) == 0:
+            lamb = float(wavelength)
+            lamb_spread = float(np.ravel(wavelength_spread)[0])
+            tof = False
+        else:
+            lamb = np.asarray(wavelength, dtype=float)
+            lamb_spread = np.array(np.broadcast_to(wavelength_spread,
+                                                   lamb.shape), dtype=float)
+            tof = len(lamb) > 1
+        if np.any(lamb == 0):
+            msg = "Can't compute the resolution: the wavelength is zero..."
+            raise RuntimeError(msg)
+        return lamb, lamb_spread, tof
+
+    def _compute_arrays(self, lamb, lamb_spread, qx_value, qy_value, tof):
+        """
+        Compute the Q resolution of arrays, keeping the state of the
+        calculator
+        """
+        gravity_phi = self.gravity_phi
+        try:
+            qr_value, phi, sigma_1, sigma_2, sigma_r, sigma1d = \
+                self._compute(lamb, lamb_spread, qx_value, qy_value,
+                              'cartesian', tof)
+        finally:
+            self.gravity_phi = gravity_phi
+        # sigma_1 and sigma_2 don't depend on q
+        shape = np.broadcast(qr_value, lamb).shape
+        return (np.broadcast_to(qr_value, shape),
+                np.broadcast_to(phi, shape),
+                np.broadcast_to(sigma_1, shape),
+                np.broadcast_to(sigma_2, shape),
+                np.broadcast_to(sigma_r, shape),
+                np.broadcast_to(sigma1d, shape))
+
+    def _compute(self, wavelength, wavelength_spread, qx_value, qy_value,
+                 coord='cartesian', tof=False):
+        """
+        Compute the Q resolution in || and + direction of 2D, for scalars
+        or arrays of q values and wavelengths
+
+        : return: qr_value, phi, sigma_1, sigma_2, sigma_r, sigma1d
+        """
         coord = 'cartesian'
         lamb = wavelength
         lamb_spread = wavelength_spread
@@ -233,11 +375,8 @@ class ResolutionCalculator(object):
         # vacuum wave transfer
         knot = 2*pi/lamb
         # scattering angle theta; always true for plane detector
-        # aligned vertically to the ko direction
-        if qr_value > knot:
-            theta = pi/2
-        else:
-            theta = math.asin(qr_value/knot)
+        # aligned vertically to the ko direction; pi/2 if qr_value > knot
+        theta = np.arcsin(np.minimum(qr_value/knot, 1.0))
         # source aperture size
         rone = self.source_aperture_size
         # sample aperture size
@@ -259,7 +398,7 @@ class ResolutionCalculator(object):
         l1_cor = (l_ssa * l_two) / (l_sas + l_two)
         lp_cor = (l_ssa * l_two) / (l_one + l_two)
         # the radial distance to the pixel from the center of the detector
-        radius = math.tan(theta) * l_two
+        radius = np.tan(theta) * l_two
         #Lp = l_one*l_two/(l_one+l_two)
         # default polar coordinate
         comp1 = 'radial'
@@ -295,8 +434,8 @@ class ResolutionCalculator(object):
         # for 2d
         #sigma_1 += sigma_wave_1
         # normalize
-        sigma_1 = knot * sqrt(sigma_1 / 12)
-        sigma_r = knot * sqrt(sigma_wave_1 / (tof_factor *12))
+        sigma_1 = knot * np.sqrt(sigma_1 / 12)
+        sigma_r = knot * np.sqrt(sigma_wave_1 / (tof_factor *12))
         # sigma in the phi/y direction
         # for source apperture
         sigma_2 = self.get_variance(rone, l1_cor, phi, comp2)
@@ -327,13 +466,8 @@ class ResolutionCalculator(object):
         #sigma_2 =  knot*sqrt(sigma_2/12)
         #sigma_2 += sigma_wave_2
         # normalize
-        sigma_2 = knot * sqrt(sigma_2 / 12)
-        sigma1d = sqrt(variance_1d_1 + variance_1d_2)
-        # set sigmas
-        self.sigma_1 = sigma_1
-        self.sigma_lamd = sigma_r
-        self.sigma_2 = sigma_2
-        self.sigma_1d = sigma1d
+        sigma_2 = knot * np.sqrt(sigma_2 / 12)
+        sigma1d = np.sqrt(variance_1d_1 + variance_1d_2)
         return qr_value, phi, sigma_1, sigma_2, sigma_r, sigma1d
 
     def _within_detector_range(self, qx_value, qy_value):
@@ -392,11 +526,21 @@ class ResolutionCalculator(object):
             return None
 
         # Make an empty graph in the detector scale
-        dx_size = (self.qx_max - self.qx_min) / (1000 - 1)
-        dy_size = (self.qy_max - self.qy_min) / (1000 - 1)
+        npts = self.image_size
+        dx_size = (self.qx_max - self.qx_min) / (npts - 1)
+        dy_size = (self.qy_max - self.qy_min) / (npts - 1)
         x_val = np.arange(self.qx_min, self.qx_max, dx_size)
         y_val = np.arange(self.qy_max, self.qy_min, -dy_size)
-        q_1, q_2 = np.meshgrid(x_val, y_val)
+        # Only compute the image where the gaussian is not negligible
+        if coord == 'polar':
+            half_x, half_y = self._gaussian2d_polar_extent(phi, sigma_1,
+                                                           sigma_2, sigma_r)
+        else:
+            half_x, half_y = self._gaussian2d_extent(sigma_1, sigma_2,
+                                                     sigma_r)
+        rows, cols = self._get_image_window(x_val, y_val, qx_value, qy_value,
+                                            half_x, half_y)
+        q_1, q_2 = np.meshgrid(x_val[cols], y_val[rows])
         #q_phi = numpy.arctan(q_1,q_2)
         # check whether polar or cartesian
         if coord == 'polar':
@@ -425,13 +569,35 @@ class ResolutionCalculator(object):
             #return self.image
 
         # Add it if there are more than one inputs.
-        if len(self.image_lam) > 0:
-            self.image_lam += image * self.intensity
-        else:
-            self.image_lam = image * self.intensity
+        if len(self.image_lam) == 0:
+            self.image_lam = np.zeros((len(y_val), len(x_val)))
+        self.image_lam[rows, cols] += image * self.intensity
 
         return self.image_lam
 
+    def _get_image_window(self, x_val, y_val, qx_value, qy_value,
+                          half_x, half_y):
+        """
+        Get the part of the image within image_nsigma of q
+
+        : x_val: increasing qx values of the image
+        : y_val: decreasing qy values of the image
+        : half_x: half width of the window at one sigma in the x direction,
+            or None for the whole image
+        : half_y: half width of the window at one sigma in the y direction
+
+        : return: rows, cols slices of the image
+        """
+        if self.image_nsigma is None or half_x is None:
+            return slice(None), slice(None)
+        half_x *= self.image_nsigma
+        half_y *= self.image_nsigma
+        cols = slice(np.searchsorted(x_val, qx_value - half_x, 'left'),
+                     np.searchsorted(x_val, qx_value + half_x, 'right'))
+        rows = slice(np.searchsorted(-y_val, -qy_value - half_y, 'left'),
+                     np.searchsorted(-y_val, -qy_value + half_y, 'right'))
+        return rows, cols
+
     def plot_image(self, image):
         """
         Plot image using pyplot
@@ -530,29 +696,25 @@ class ResolutionCalculator(object):
             return 0, 0
         else:
             # calculate sigma^2 for 1d
-            sigma1d = 2 * math.pow(radius/distance*spread, 2)
+            sigma1d = 2 * (radius/distance*spread)**2
             if comp == 'x':
-                sigma1d *= (math.cos(phi)*math.cos(phi))
+                sigma1d = sigma1d * (np.cos(phi)*np.cos(phi))
             elif comp == 'y':
-                sigma1d *= (math.sin(phi)*math.sin(phi))
-            else:
-                sigma1d *= 1
+                sigma1d = sigma1d * (np.sin(phi)*np.sin(phi))
             # sigma^2 for 2d
             # shift the coordinate due to the gravitational shift
-            rad_x = radius * math.cos(phi)
-            rad_y = A_value - radius * math.sin(phi)
-            radius = math.sqrt(rad_x * rad_x + rad_y * rad_y)
+            rad_x = radius * np.cos(phi)
+            rad_y = A_value - radius * np.sin(phi)
+            radius = np.sqrt(rad_x * rad_x + rad_y * rad_y)
             # new phi
-            phi = math.atan2(-rad_y, rad_x)
+            phi = np.arctan2(-rad_y, rad_x)
             self.gravity_phi = phi
             # calculate sigma^2
-            sigma = 2 * math.pow(radius/distance*spread, 2)
+            sigma = 2 * (radius/distance*spread)**2
             if comp == 'x':
-                sigma *= (math.cos(phi)*math.cos(phi))
+                sigma = sigma * (np.cos(phi)*np.cos(phi))
             elif comp == 'y':
-                sigma *= (math.sin(phi)*math.sin(phi))
-            else:
-                sigma *= 1
+                sigma = sigma * (np.sin(phi)*np.sin(phi))
 
             return sigma, sigma1d
 
@@ -579,9 +741,9 @@ class ResolutionCalculator(object):
         else:
             a_value = self._cal_A_value(None, s_distance, d_distance)
             # calculate sigma^2
-            sigma = math.pow(a_value / d_distance, 2)
-            sigma *= math.pow(wavelength, 4)
-            sigma *= math.pow(spread, 2)
+            sigma = (a_value / d_distance)**2
+            sigma = sigma * wavelength**4
+            sigma = sigma * spread**2
             sigma *= 8
             return sigma
 
@@ -602,13 +764,13 @@ class ResolutionCalculator(object):
         m_over_h = self.mass / h_constant
         # A value
         a_value = d_distance * (s_distance + d_distance)
-        a_value *= math.pow(m_over_h / 2, 2)
+        a_value *= (m_over_h / 2)**2
         a_value *= gravy
         # unit correction (1/cm to 1/A) for A and d_distance below
         a_value *= 1.0E-16
         # if lamda is give (broad meanning of A)  return 2* lamda^2 * A
         if lamda is not None:
-            a_value *= (4 * lamda * lamda)
+            a_value = a_value * (4 * lamda * lamda)
         return a_value
 
     def get_intensity(self):
@@ -915,6 +1077,50 @@ class ResolutionCalculator(object):
 
         return gaussian
 
+    def _gaussian2d_extent(self, sigma_x, sigma_y, sigma_r):
+        """
+        Get the extent of the 2D Gaussian distribution of _gaussian2d
+        : sigma_x: variance in x-direction
+        : sigma_y: variance in y-direction
+
+        : return: half widths in x and y of the ellipse at one sigma, or
+            None, None if the distribution is not bounded
+        """
+        if sigma_x == 0 or sigma_y == 0:
+            return None, None
+        sin_phi = np.sin(self.gravity_phi)
+        cos_phi = np.cos(self.gravity_phi)
+        new_sig_x = sqrt(sigma_r * sigma_r / (sigma_x * sigma_x) + 1)
+        new_sig_y = sqrt(sigma_r * sigma_r / (sigma_y * sigma_y) + 1)
+        # the exponent is -0.5*|M.v|^2 for the offset v from the center
+        rotation = np.array([[cos_phi, sin_phi], [-sin_phi, cos_phi]])
+        scaling = np.array([[cos_phi / new_sig_x, -sin_phi],
+                            [sin_phi / new_sig_y, cos_phi]])
+        scaling /= np.array([[sigma_x], [sigma_y]])
+        inverse = np.linalg.inv(np.dot(scaling, rotation))
+        half_x, half_y = np.sqrt((inverse * inverse).sum(axis=1))
+        return half_x, half_y
+
+    def _gaussian2d_polar_extent(self, phi, sigma_x, sigma_y, sigma_r):
+        """
+        Get the extent of the 2D Gaussian distribution of _gaussian2d_polar
+        : phi: angle of the r-direction
+        : sigma_x: variance in r-direction
+        : sigma_y: variance in phi-direction
+        : sigma_r: wavelength variance in r-direction
+
+        : return: half widths in x and y of the ellipse at one sigma, or
+            None, None if the distribution is not bounded
+        """
+        sigma_x = sqrt(sigma_x * sigma_x + sigma_r * sigma_r)
+        if sigma_x == 0 or sigma_y == 0:
+            return None, None
+        cos_phi = math.cos(phi)
+        sin_phi = math.sin(phi)
+        half_x = sqrt((sigma_x * cos_phi)**2 + (sigma_y * sin_phi)**2)
+        half_y = sqrt((sigma_x * sin_phi)**2 + (sigma_y * cos_phi)**2)
+        return half_x, half_y
+
     def _gaussian2d_polar(self, x_val, y_val, x0_val, y0_val,
                           sigma_x, sigma_y, sigma_r):
         """
@@ -970,7 +1176,7 @@ class ResolutionCalculator(object):
 
         : return phi: the azimuthal angle of q on x-y plane
         """
-        phi = math.atan2(qy_value, qx_value)
+        phi = np.arctan2(qy_value, qx_value)
         return phi
 
     def _get_detector_qxqy_pixels(self):
@@ -983,9 +1189,56 @@ class ResolutionCalculator(object):
 
         # wavelength
         wavelength = self.wave.wavelength
-        # Gavity correction
-        delta_y = self._get_beamcenter_drop()  # in cm
+        qx_value, qy_value = self._get_detector_qxqy(wavelength)
+        pix_x_size, pix_y_size = self._get_pix_sizes()
+        # Sample to detector distance = sample slit to detector
+        # minus sample offset
+        sample2detector_distance = self.sample2detector_distance[0] - \
+                                    self.sample2sample_distance[0]
+
+        # p min and max values among the center of pixels
+        self.qx_min = np.min(qx_value)
+        self.qx_max = np.max(qx_value)
+        self.qy_min = np.min(qy_value)
+        self.qy_max = np.max(qy_value)
 
+        # Appr. min and max values of the detector display limits
+        # i.e., edges of the last pixels.
+        self.qy_min += self._get_qx(-0.5 * pix_y_size,
+                                    sample2detector_distance, wavelength)
+        self.qy_max += self._get_qx(0.5 * pix_y_size,
+                                    sample2detector_distance, wavelength)
+        #if self.qx_min == self.qx_max:
+        self.qx_min += self._get_qx(-0.5 * pix_x_size,
+                                    sample2detector_distance, wavelength)
+        self.qx_max += self._get_qx(0.5 * pix_x_size,
+                                    sample2detector_distance, wavelength)
+
+        # min and max values of detecter
+        self.detector_qx_min = self.qx_min
+        self.detector_qx_max = self.qx_max
+        self.detector_qy_min = self.qy_min
+        self.detector_qy_max = self.qy_max
+
+        # try to set it as a Data2D otherwise pass (not required for now)
+        try:
+            from sas.sascalc.dataloader.data_info import Data2D
+            output = Data2D()
+            inten = np.zeros_like(qx_value)
+            output.data = inten
+            output.qx_data = qx_value
+            output.qy_data = qy_value
+        except:
+            logger.error(sys.exc_value)
+
+        return output
+
+    def _get_pix_sizes(self):
+        """
+        Get the pixel sizes of the detector
+
+        :return: pix_x_size, pix_y_size [cm]
+        """
         # detector_pix size
         detector_pix_size = self.detector_pix_size
         # Square or circular pixel
@@ -998,6 +1251,21 @@ class ResolutionCalculator(object):
             pix_y_size = detector_pix_size[1]
         else:
             raise ValueError(" Input value format error...")
+        return pix_x_size, pix_y_size
+
+    def _get_detector_qxqy(self, wavelength):
+        """
+        Get the q values at the centers of the detector pixels
+
+        :param wavelength: wavelength
+
+        :return: qx_value, qy_value arrays of shape
+            (no of pix_x, no of pix_y)
+        """
+        # Gavity correction
+        delta_y = self._get_beamcenter_drop(wavelength)  # in cm
+
+        pix_x_size, pix_y_size = self._get_pix_sizes()
         # Sample to detector distance = sample slit to detector
         # minus sample offset
         sample2detector_distance = self.sample2detector_distance[0] - \
@@ -1042,17 +1310,10 @@ class ResolutionCalculator(object):
         detector_ind_x = detector_ind_x * pix_x_size
         detector_ind_y = detector_ind_y * pix_y_size
 
-        qx_value = np.zeros(len(detector_ind_x))
-        qy_value = np.zeros(len(detector_ind_y))
-        i = 0
-
-        for indx in detector_ind_x:
-            qx_value[i] = self._get_qx(indx, sample2detector_distance, wavelength)
-            i += 1
-        i = 0
-        for indy in detector_ind_y:
-            qy_value[i] = self._get_qx(indy, sample2detector_distance, wavelength)
-            i += 1
+        qx_value = self._get_qx(detector_ind_x, sample2detector_distance,
+                                wavelength)
+        qy_value = self._get_qx(detector_ind_y, sample2detector_distance,
+                                wavelength)
 
         # qx_value and qy_value values in array
         qx_value = qx_value.repeat(detector_pix_nums_y)
@@ -1061,42 +1322,7 @@ class ResolutionCalculator(object):
         qy_value = qy_value.reshape(detector_pix_nums_y, detector_pix_nums_x)
         qy_value = qy_value.transpose()
 
-        # p min and max values among the center of pixels
-        self.qx_min = np.min(qx_value)
-        self.qx_max = np.max(qx_value)
-        self.qy_min = np.min(qy_value)
-        self.qy_max = np.max(qy_value)
-
-        # Appr. min and max values of the detector display limits
-        # i.e., edges of the last pixels.
-        self.qy_min += self._get_qx(-0.5 * pix_y_size,
-                                    sample2detector_distance, wavelength)
-        self.qy_max += self._get_qx(0.5 * pix_y_size,
-                                    sample2detector_distance, wavelength)
-        #if self.qx_min == self.qx_max:
-        self.qx_min += self._get_qx(-0.5 * pix_x_size,
-                                    sample2detector_distance, wavelength)
-        self.qx_max += self._get_qx(0.5 * pix_x_size,
-                                    sample2detector_distance, wavelength)
-
-        # min and max values of detecter
-        self.detector_qx_min = self.qx_min
-        self.detector_qx_max = self.qx_max
-        self.detector_qy_min = self.qy_min
-        self.detector_qy_max = self.qy_max
-
-        # try to set it as a Data2D otherwise pass (not required for now)
-        try:
-            from sas.sascalc.dataloader.data_info import Data2D
-            output = Data2D()
-            inten = np.zeros_like(qx_value)
-            output.data = inten
-            output.qx_data = qx_value
-            output.qy_data = qy_value
-        except:
-            logger.error(sys.exc_value)
-
-        return output
+        return qx_value, qy_value
 
     def _get_qx(self, dx_size, det_dist, wavelength):
         """
@@ -1119,7 +1345,7 @@ class ResolutionCalculator(object):
         : return qr_value, phi
         """
         # find |q| on detector plane
-        qr_value = sqrt(qx_value*qx_value + qy_value*qy_value)
+        qr_value = np.sqrt(qx_value*qx_value + qy_value*qy_value)
         # find angle phi
         phi = self._atan_phi(qy_value, qx_value)
 
@@ -1144,19 +1370,24 @@ class ResolutionCalculator(object):
 
         return pos_x, pos_y
 
-    def _get_beamcenter_drop(self):
+    def _get_beamcenter_drop(self, wavelength=None):
         """
         Get the beam center drop (delta y) in y diection due to gravity
 
+        :param wavelength: wavelength (default: the wavelength of the
+            calculator)
+
         :return delta y: the beam center drop in cm
         """
         # Check if mass == 0 (X-ray).
         if self.mass == 0:
             return 0
+        if wavelength is None:
+            wavelength = self.wave.wavelength
         # Covert unit from A to cm
         unit_cm = 1e-08
         # Velocity of neutron in horizontal direction (~ actual velocity)
-        velocity = _PLANK_H / (self.mass * self.wave.wavelength * unit_cm)
+        velocity = _PLANK_H / (self.mass * wavelength * unit_cm)
         # Compute delta y
         delta_y = 0.5
         delta_y *= _GRAVITY
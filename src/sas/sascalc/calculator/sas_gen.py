@@ -7,7 +7,11 @@ from __future__ import print_function
 import os
 import sys
 import copy
+import struct
+import hashlib
 import logging
+import zipfile
+import functools
 
 from periodictable import formula
 from periodictable import nsf
@@ -78,6 +82,14 @@ class GenSAS(BaseComponent):
         self.data_mz = None
         self.data_vol = None #[A^3]
         self.is_avg = False
+        # pair-distance histogram bin width [A]; None for the exact sum
+        self.bin_width = None
+        self._pair_hist = None
+        self._has_m = None
+        self._is_magnetic = None
+        self._pixel_split = None
+        # number of threads for sld2i; 0 uses OMP_NUM_THREADS or all cores
+        self.nthreads = 0
         ## Name of the model
         self.name = "GenSAS"
         ## Define parameters
@@ -110,6 +122,7 @@ class GenSAS(BaseComponent):
         if self.data_vol is None:
             raise TypeError("data_vol is missing")
         self.data_vol = volume
+        self._pair_hist = None
 
     def set_is_avg(self, is_avg=False):
         """
@@ -117,6 +130,78 @@ class GenSAS(BaseComponent):
         """
         self.is_avg = is_avg
 
+    def set_nthreads(self, nthreads=0):
+        """
+        Sets the number of threads used to compute the q points in sld2i.
+
+        The q points are independent, so the result does not depend on
+        the number of threads.  Only effective when sld2i is built with
+        OpenMP.
+
+        :Param nthreads: number of threads [int]; 0 to use the
+            OMP_NUM_THREADS environment variable or else all the cores
+        """
+        if nthreads < 0:
+            raise ValueError("nthreads must be positive or 0")
+        self.nthreads = int(nthreads)
+
+    def set_bin_width(self, bin_width=None):
+        """
+        Sets the pair-distance bin width used by the 1D full calculation.
+
+        When set, I(q) is evaluated as a Debye sum over a histogram of
+        the weighted pair distances, which is built once and reused for
+        any q, scale or background.  The error is bounded by q * bin_width.
+
+        :Param bin_width: bin width [A]; None for the exact pairwise sum
+        """
+        if bin_width is not None and bin_width <= 0:
+            raise ValueError("bin_width must be positive")
+        if bin_width != self.bin_width:
+            self._pair_hist = None
+        self.bin_width = bin_width
+
+    def _get_pair_hist(self, sldn):
+        """
+        Return the cached pair-distance histogram, building it if the
+        solvent SLD has changed since it was computed.
+
+        :Param sldn: solvent subtracted nuclear sld [array]
+        :return: (sum of the self terms, bin distances, bin weights)
+        """
+        solvent_sld = self.params['solvent_SLD']
+        if self._pair_hist is None or self._pair_hist[0] != solvent_sld:
+            weights = sldn * self.data_vol
+            steps = _lattice_steps(self.sld_data)
+            hist = None
+            if steps is not None:
+                hist = _lattice_pair_hist(self.data_x, self.data_y,
+                                          self.data_z, weights, steps,
+                                          self.bin_width)
+            if hist is None:
+                hist = _pair_hist(self.data_x, self.data_y, self.data_z,
+                                  weights, self.bin_width)
+            self._pair_hist = (solvent_sld, hist)
+        return self._pair_hist[1]
+
+    def _gen_debye(self, q, sldn):
+        """
+        Compute the 1D full calculation from the pair-distance histogram
+        :Param q: array of q-values
+        :Param sldn: solvent subtracted nuclear sld [array]
+        :return: I(q) in the units of genicom
+        """
+        self_terms, r_bins, h_bins = self._get_pair_hist(sldn)
+        I_out = np.empty_like(q)
+        # bound the size of the q x bin sinc matrix
+        step = max(1, _CHUNK_SIZE // max(1, len(r_bins)))
+        for start in range(0, len(q), step):
+            qr = np.outer(q[start:start + step], r_bins)
+            I_out[start:start + step] = np.dot(np.sinc(qr / np.pi), h_bins)
+        I_out += self_terms
+        I_out *= 1.0E+8 / np.sum(self.data_vol)
+        return I_out
+
     def _gen(self, qx, qy):
         """
         Evaluate the function
@@ -132,33 +217,73 @@ class GenSAS(BaseComponent):
             pos_x, pos_y, pos_z = transform_center(pos_x, pos_y, pos_z)
         sldn = copy.deepcopy(self.data_sldn)
         sldn -= self.params['solvent_SLD']
+        if not len(qy) and not self.is_avg and self.bin_width is not None:
+            I_out = self._gen_debye(_vec(qx), sldn)
+        else:
+            I_out = self._gen_direct(qx, qy, pos_x, pos_y, pos_z, sldn)
+        vol_correction = self.data_total_volume / self.params['total_volume']
+        result = (self.params['scale'] * vol_correction * I_out
+                  + self.params['background'])
+        return result
+
+    def _gen_direct(self, qx, qy, pos_x, pos_y, pos_z, sldn):
+        """
+        Compute I(q) by direct summation over the pixels in sld2i
+        :Param qx: array of qx-values
+        :Param qy: array of qy-values; empty for 1D
+        :return: I(q) before scale and background
+        """
         # **** WARNING **** new_GenI holds pointers to numpy vectors
         # be sure that they are contiguous double precision arrays and make 
         # sure the GC doesn't eat them before genicom is called.
         # TODO: rewrite so that the parameters are passed directly to genicom
+        pixels = [pos_x, pos_y, pos_z, sldn, self.data_mx, self.data_my,
+                  self.data_mz, self.data_vol]
+        n_nuc = -1
+        if len(qy):
+            # genicomXY skips the null pixels and computes the
+            # non-magnetic ones separately
+            order, n_nuc = self._get_pixel_split(sldn)
+            pixels = [_vec(v[order]) for v in pixels]
         args = (
             (1 if self.is_avg else 0),
-            pos_x, pos_y, pos_z,
-            sldn, self.data_mx, self.data_my,
-            self.data_mz, self.data_vol,
+            pixels[0], pixels[1], pixels[2],
+            pixels[3], pixels[4], pixels[5],
+            pixels[6], pixels[7],
             self.params['Up_frac_in'],
             self.params['Up_frac_out'],
-            self.params['Up_theta'])
+            self.params['Up_theta'],
+            n_nuc)
         model = mod.new_GenI(*args)
         if len(qy):
             qx, qy = _vec(qx), _vec(qy)
             I_out = np.empty_like(qx)
             #print("npoints", qx.shape, "npixels", pos_x.shape)
-            mod.genicomXY(model, qx, qy, I_out)
+            mod.genicomXY(model, qx, qy, I_out, self.nthreads)
             #print("I_out after", I_out)
         else:
             qx = _vec(qx)
             I_out = np.empty_like(qx)
-            mod.genicom(model, qx, I_out)
-        vol_correction = self.data_total_volume / self.params['total_volume']
-        result = (self.params['scale'] * vol_correction * I_out
-                  + self.params['background'])
-        return result
+            mod.genicom(model, qx, I_out, self.nthreads)
+        return I_out
+
+    def _get_pixel_split(self, sldn):
+        """
+        Return the pixel order used by genicomXY, with the null pixels
+        dropped and the non-magnetic pixels first.  It is only rebuilt if
+        the solvent SLD has changed since it was computed.
+
+        :Param sldn: solvent subtracted nuclear sld [array]
+        :return: (pixel indices, number of non-magnetic pixels)
+        """
+        solvent_sld = self.params['solvent_SLD']
+        if self._pixel_split is None or self._pixel_split[0] != solvent_sld:
+            active = self._has_m | (sldn != 0.0)
+            nuc = np.flatnonzero(active & ~self._is_magnetic)
+            mag = np.flatnonzero(active & self._is_magnetic)
+            self._pixel_split = (solvent_sld, np.concatenate((nuc, mag)),
+                                 len(nuc))
+        return self._pixel_split[1:]
 
     def set_sld_data(self, sld_data=None):
         """
@@ -176,6 +301,16 @@ class GenSAS(BaseComponent):
         self.data_vol = _vec(sld_data.vol_pix)
         self.data_total_volume = sum(sld_data.vol_pix)
         self.params['total_volume'] = sum(sld_data.vol_pix)
+        self._pair_hist = None
+        # Pixels with any magnetization, and pixels that are magnetic by
+        # the 1e-32 threshold of cal_msld
+        self._has_m = ((self.data_mx != 0.0) | (self.data_my != 0.0)
+                       | (self.data_mz != 0.0))
+        self._is_magnetic = ((np.fabs(self.data_mx) >= 1.0e-32)
+                             | (np.fabs(self.data_my) >= 1.0e-32)
+                             | (np.fabs(self.data_mz) >= 1.0e-32))
+        self._pixel_split = None
+        self._get_pixel_split(self.data_sldn - self.params['solvent_SLD'])
 
     def getProfile(self):
         """
@@ -231,6 +366,215 @@ class GenSAS(BaseComponent):
 def _vec(v):
     return np.ascontiguousarray(v, 'd')
 
+# Number of elements in the temporary arrays of the histogram builders
+_CHUNK_SIZE = 2**22
+# Largest zero-padded grid used for the lattice autocorrelation
+_MAX_LATTICE_CELLS = 2**26
+
+def _lattice_steps(sld_data):
+    """
+    Return the (x, y, z) step sizes if sld_data is a regular pixel lattice
+    :Param sld_data: MagSLD object
+    :return: step sizes [tuple] or None
+    """
+    if sld_data is None or sld_data.pix_type != 'pixel' \
+            or not sld_data.has_stepsize:
+        return None
+    steps = (sld_data.xstepsize, sld_data.ystepsize, sld_data.zstepsize)
+    if any(step is None or step <= 0 for step in steps):
+        return None
+    return steps
+
+def _pair_hist(pos_x, pos_y, pos_z, weights, bin_width):
+    """
+    Histogram of the weighted pair distances by direct O(N^2) summation
+    :Param weights: pixel weights, sld * volume [array]
+    :Param bin_width: distance bin width [A]
+    :return: (sum of the self terms, bin distances, bin weights)
+    """
+    npix = len(weights)
+    dmax = np.sqrt((pos_x.max() - pos_x.min())**2
+                   + (pos_y.max() - pos_y.min())**2
+                   + (pos_z.max() - pos_z.min())**2)
+    nbins = int(dmax / bin_width) + 1
+    h_bins = np.zeros(nbins)
+    r_moment = np.zeros(nbins)
+    h_abs = np.zeros(nbins)
+    rows = max(1, _CHUNK_SIZE // max(1, npix))
+    for start in range(0, npix - 1, rows):
+        stop = min(start + rows, npix - 1)
+        # pairs (j, k) with start <= j < stop and k > j
+        cols = slice(start + 1, npix)
+        upper = (np.arange(start + 1, npix)[None, :]
+                 > np.arange(start, stop)[:, None])
+        dist = np.sqrt((pos_x[start:stop, None] - pos_x[None, cols])**2
+                       + (pos_y[start:stop, None] - pos_y[None, cols])**2
+                       + (pos_z[start:stop, None] - pos_z[None, cols])**2)
+        pair_w = 2.0 * weights[start:stop, None] * weights[None, cols]
+        dist, pair_w = dist[upper], pair_w[upper]
+        index = np.minimum((dist / bin_width).astype(int), nbins - 1)
+        h_bins += np.bincount(index, weights=pair_w, minlength=nbins)
+        r_moment += np.bincount(index, weights=np.fabs(pair_w) * dist,
+                                minlength=nbins)
+        h_abs += np.bincount(index, weights=np.fabs(pair_w), minlength=nbins)
+    r_bins = _bin_distances(r_moment, h_abs, bin_width)
+    return np.sum(weights * weights), r_bins, h_bins
+
+def _lattice_pair_hist(pos_x, pos_y, pos_z, weights, steps, bin_width):
+    """
+    Histogram of the weighted pair distances for pixels on a regular
+    lattice, from the FFT autocorrelation of the weight grid.
+    :Param weights: pixel weights, sld * volume [array]
+    :Param steps: lattice step sizes (x, y, z) [A]
+    :Param bin_width: distance bin width [A]
+    :return: (sum of the self terms, bin distances, bin weights), or None
+        if the pixels are not on the lattice or the grid is too large
+    """
+    index = []
+    for pos, step in zip((pos_x, pos_y, pos_z), steps):
+        idx = np.rint((pos - pos.min()) / step)
+        if not np.allclose(idx * step + pos.min(), pos, rtol=0,
+                           atol=1.0e-6 * step):
+            return None
+        index.append(idx.astype(int))
+    shape = tuple(int(idx.max()) + 1 for idx in index)
+    padded = tuple(2 * n - 1 for n in shape)
+    ncells = int(np.prod(padded))
+    if ncells > _MAX_LATTICE_CELLS or ncells > len(weights)**2:
+        return None
+    grid = np.zeros(shape)
+    np.add.at(grid, tuple(index), weights)
+    spectrum = np.fft.rfftn(grid, padded)
+    corr = np.fft.irfftn(spectrum * spectrum.conj(), padded)
+    # wrap the padded indices round to signed lattice offsets
+    offsets = [np.where(np.arange(m) < n, np.arange(m), np.arange(m) - m) * step
+               for n, m, step in zip(shape, padded, steps)]
+    dist = np.sqrt(offsets[0][:, None, None]**2
+                   + offsets[1][None, :, None]**2
+                   + offsets[2][None, None, :]**2)
+    self_terms = corr[0, 0, 0]
+    corr[0, 0, 0] = 0.0
+    dist, corr = dist.ravel(), corr.ravel()
+    index = (dist / bin_width).astype(int)
+    h_bins = np.bincount(index, weights=corr)
+    r_moment = np.bincount(index, weights=np.fabs(corr) * dist)
+    h_abs = np.bincount(index, weights=np.fabs(corr))
+    r_bins = _bin_distances(r_moment, h_abs, bin_width)
+    return self_terms, r_bins, h_bins
+
+def _bin_distances(r_moment, h_abs, bin_width):
+    """
+    Representative distance of each histogram bin: the mean pair distance
+    weighted by abs(weight), or the bin center for empty bins.
+    """
+    r_bins = (np.arange(len(h_abs)) + 0.5) * bin_width
+    filled = h_abs > 0
+    r_bins[filled] = r_moment[filled] / h_abs[filled]
+    return r_bins
+
+# Directory holding the binary caches of the text readers; None for the
+# default ~/.sasview/sld_cache
+_CACHE_DIR = None
+_CACHE_ENABLED = True
+# Bump when the layout of the cached objects changes
+_CACHE_VERSION = 1
+
+def set_cache_dir(path=None, enabled=True):
+    """
+    Set where the text readers keep their binary caches
+
+    :Param path: cache directory; None for ~/.sasview/sld_cache
+    :Param enabled: False to always parse the text files
+    """
+    global _CACHE_DIR, _CACHE_ENABLED
+    _CACHE_DIR = path
+    _CACHE_ENABLED = enabled
+
+def _cache_path(reader, path):
+    """
+    Cache file of the given reader for the source file at path
+    """
+    cache_dir = _CACHE_DIR
+    if cache_dir is None:
+        from sas import get_user_dir
+        cache_dir = os.path.join(get_user_dir(), 'sld_cache')
+    key = "%s:%s" % (reader.__class__.__name__, os.path.abspath(path))
+    name = hashlib.sha1(key.encode('utf-8')).hexdigest() + '.npz'
+    return os.path.join(cache_dir, name)
+
+def _use_cache(read):
+    """
+    Decorate a reader's read method to reuse the binary cache of the file
+    while the source path, mtime and size are unchanged, and to write the
+    cache after parsing the text otherwise.
+    """
+    @functools.wraps(read)
+    def cached_read(self, path):
+        if not _CACHE_ENABLED:
+            return read(self, path)
+        try:
+            stat = os.stat(path)
+            cache = _cache_path(self, path)
+        except Exception:
+            return read(self, path)
+        source = (os.path.abspath(path), stat.st_mtime, stat.st_size)
+        if os.path.isfile(cache):
+            try:
+                data, cached_source = SLDCache().read_source(cache)
+                if cached_source == source:
+                    return data
+            except Exception as exc:
+                logger.warning("Ignoring the cache %s: %s", cache, exc)
+        data = read(self, path)
+        try:
+            if not os.path.isdir(os.path.dirname(cache)):
+                os.makedirs(os.path.dirname(cache))
+            SLDCache().write(cache, data, source=source)
+        except Exception as exc:
+            logger.warning("Could not write the cache %s: %s", cache, exc)
+        return data
+    return cached_read
+
+def _npz_memmap(path, mmap_mode):
+    """
+    Memory map the arrays of an uncompressed .npz file
+
+    :return: dict of name: array; arrays that can't be mapped are read
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as fid:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith('.npy') \
+                else info.filename
+            if info.compress_type == zipfile.ZIP_STORED:
+                # Skip the zip local header to reach the .npy member
+                fid.seek(info.header_offset)
+                header = fid.read(30)
+                name_len, extra_len = struct.unpack('<HH', header[26:30])
+                fid.seek(info.header_offset + 30 + name_len + extra_len)
+                version = np.lib.format.read_magic(fid)
+                if version == (1, 0):
+                    header = np.lib.format.read_array_header_1_0(fid)
+                elif version == (2, 0):
+                    header = np.lib.format.read_array_header_2_0(fid)
+                else:
+                    header = None
+                if header is not None and not header[2].hasobject:
+                    shape, fortran_order, dtype = header
+                    order = 'F' if fortran_order else 'C'
+                    if np.prod(shape, dtype=int) == 0:
+                        arrays[name] = np.zeros(shape, dtype=dtype,
+                                                order=order)
+                    else:
+                        arrays[name] = np.memmap(fid, dtype=dtype,
+                                                 mode=mmap_mode,
+                                                 offset=fid.tell(),
+                                                 shape=shape, order=order)
+                    continue
+            with archive.open(info) as member:
+                arrays[name] = np.lib.format.read_array(member)
+    return arrays
+
 class OMF2SLD(object):
     """
     Convert OMFData to MAgData
@@ -371,6 +715,7 @@ class OMFReader(object):
     ## List of allowed extensions
     ext = ['.omf', '.OMF']
 
+    @_use_cache
     def read(self, path):
         """
         Load data file
@@ -378,122 +723,164 @@ class OMFReader(object):
         :return: x, y, z, sld_n, sld_mx, sld_my, sld_mz
         """
         desc = ""
-        mx = np.zeros(0)
-        my = np.zeros(0)
-        mz = np.zeros(0)
+        xnodes = ynodes = znodes = None
+        # m values, preallocated from the node counts in the header
+        values = None
+        npts = 0
+        factor = None
         try:
-            input_f = open(path, 'rb')
-            buff = decode(input_f.read())
-            lines = buff.split('\n')
-            input_f.close()
             output = OMFData()
             valueunit = None
-            for line in lines:
-                line = line.strip()
-                # Read data
-                if line and not line.startswith('#'):
-                    try:
-                        toks = line.split()
-                        _mx = float(toks[0])
-                        _my = float(toks[1])
-                        _mz = float(toks[2])
-                        _mx = mag2sld(_mx, valueunit)
-                        _my = mag2sld(_my, valueunit)
-                        _mz = mag2sld(_mz, valueunit)
-                        mx = np.append(mx, _mx)
-                        my = np.append(my, _my)
-                        mz = np.append(mz, _mz)
-                    except Exception as exc:
-                        # Skip non-data lines
-                        logger.error(str(exc)+" when processing %r"%line)
-                #Reading Header; Segment count ignored
-                s_line = line.split(":", 1)
-                if s_line[0].lower().count("oommf") > 0:
-                    oommf = s_line[1].lstrip()
-                if s_line[0].lower().count("title") > 0:
-                    title = s_line[1].lstrip()
-                if s_line[0].lower().count("desc") > 0:
-                    desc += s_line[1].lstrip()
-                    desc += '\n'
-                if s_line[0].lower().count("meshtype") > 0:
-                    meshtype = s_line[1].lstrip()
-                if s_line[0].lower().count("meshunit") > 0:
-                    meshunit = s_line[1].lstrip()
-                    if meshunit.count("m") < 1:
-                        msg = "Error: \n"
-                        msg += "We accept only m as meshunit"
-                        raise ValueError(msg)
-                if s_line[0].lower().count("xbase") > 0:
-                    xbase = s_line[1].lstrip()
-                if s_line[0].lower().count("ybase") > 0:
-                    ybase = s_line[1].lstrip()
-                if s_line[0].lower().count("zbase") > 0:
-                    zbase = s_line[1].lstrip()
-                if s_line[0].lower().count("xstepsize") > 0:
-                    xstepsize = s_line[1].lstrip()
-                if s_line[0].lower().count("ystepsize") > 0:
-                    ystepsize = s_line[1].lstrip()
-                if s_line[0].lower().count("zstepsize") > 0:
-                    zstepsize = s_line[1].lstrip()
-                if s_line[0].lower().count("xnodes") > 0:
-                    xnodes = s_line[1].lstrip()
-                if s_line[0].lower().count("ynodes") > 0:
-                    ynodes = s_line[1].lstrip()
-                if s_line[0].lower().count("znodes") > 0:
-                    znodes = s_line[1].lstrip()
-                if s_line[0].lower().count("xmin") > 0:
-                    xmin = s_line[1].lstrip()
-                if s_line[0].lower().count("ymin") > 0:
-                    ymin = s_line[1].lstrip()
-                if s_line[0].lower().count("zmin") > 0:
-                    zmin = s_line[1].lstrip()
-                if s_line[0].lower().count("xmax") > 0:
-                    xmax = s_line[1].lstrip()
-                if s_line[0].lower().count("ymax") > 0:
-                    ymax = s_line[1].lstrip()
-                if s_line[0].lower().count("zmax") > 0:
-                    zmax = s_line[1].lstrip()
-                if s_line[0].lower().count("valueunit") > 0:
-                    valueunit = s_line[1].lstrip().rstrip()
-                if s_line[0].lower().count("valuemultiplier") > 0:
-                    valuemultiplier = s_line[1].lstrip()
-                if s_line[0].lower().count("valuerangeminmag") > 0:
-                    valuerangeminmag = s_line[1].lstrip()
-                if s_line[0].lower().count("valuerangemaxmag") > 0:
-                    valuerangemaxmag = s_line[1].lstrip()
-                if s_line[0].lower().count("end") > 0:
-                    output.filename = os.path.basename(path)
-                    output.oommf = oommf
-                    output.title = title
-                    output.desc = desc
-                    output.meshtype = meshtype
-                    output.xbase = float(xbase) * METER2ANG
-                    output.ybase = float(ybase) * METER2ANG
-                    output.zbase = float(zbase) * METER2ANG
-                    output.xstepsize = float(xstepsize) * METER2ANG
-                    output.ystepsize = float(ystepsize) * METER2ANG
-                    output.zstepsize = float(zstepsize) * METER2ANG
-                    output.xnodes = float(xnodes)
-                    output.ynodes = float(ynodes)
-                    output.znodes = float(znodes)
-                    output.xmin = float(xmin) * METER2ANG
-                    output.ymin = float(ymin) * METER2ANG
-                    output.zmin = float(zmin) * METER2ANG
-                    output.xmax = float(xmax) * METER2ANG
-                    output.ymax = float(ymax) * METER2ANG
-                    output.zmax = float(zmax) * METER2ANG
-                    output.valuemultiplier = valuemultiplier
-                    output.valuerangeminmag = mag2sld(float(valuerangeminmag), \
-                                                      valueunit)
-                    output.valuerangemaxmag = mag2sld(float(valuerangemaxmag), \
-                                                      valueunit)
-            output.set_m(mx, my, mz)
+            with open(path, 'rb') as input_f:
+                for line in input_f:
+                    line = decode(line).strip()
+                    # Read data
+                    if line and not line.startswith('#'):
+                        try:
+                            toks = line.split()
+                            _mx = float(toks[0])
+                            _my = float(toks[1])
+                            _mz = float(toks[2])
+                            if factor is None:
+                                factor = mag2sld(1.0, valueunit)
+                            if values is None:
+                                values = np.empty((_omf_size(xnodes, ynodes,
+                                                             znodes), 3))
+                            elif npts == len(values):
+                                values = np.resize(values, (2 * npts, 3))
+                            values[npts] = (factor * _mx, factor * _my,
+                                            factor * _mz)
+                            npts += 1
+                        except Exception as exc:
+                            # Skip non-data lines
+                            logger.error(str(exc)+" when processing %r"%line)
+                        continue
+                    #Reading Header; Segment count ignored
+                    s_line = line.split(":", 1)
+                    if s_line[0].lower().count("oommf") > 0:
+                        oommf = s_line[1].lstrip()
+                    if s_line[0].lower().count("title") > 0:
+                        title = s_line[1].lstrip()
+                    if s_line[0].lower().count("desc") > 0:
+                        desc += s_line[1].lstrip()
+                        desc += '\n'
+                    if s_line[0].lower().count("meshtype") > 0:
+                        meshtype = s_line[1].lstrip()
+                    if s_line[0].lower().count("meshunit") > 0:
+                        meshunit = s_line[1].lstrip()
+                        if meshunit.count("m") < 1:
+                            msg = "Error: \n"
+                            msg += "We accept only m as meshunit"
+                            raise ValueError(msg)
+                    if s_line[0].lower().count("xbase") > 0:
+                        xbase = s_line[1].lstrip()
+                    if s_line[0].lower().count("ybase") > 0:
+                        ybase = s_line[1].lstrip()
+                    if s_line[0].lower().count("zbase") > 0:
+                        zbase = s_line[1].lstrip()
+                    if s_line[0].lower().count("xstepsize") > 0:
+                        xstepsize = s_line[1].lstrip()
+                    if s_line[0].lower().count("ystepsize") > 0:
+                        ystepsize = s_line[1].lstrip()
+                    if s_line[0].lower().count("zstepsize") > 0:
+                        zstepsize = s_line[1].lstrip()
+                    if s_line[0].lower().count("xnodes") > 0:
+                        xnodes = s_line[1].lstrip()
+                    if s_line[0].lower().count("ynodes") > 0:
+                        ynodes = s_line[1].lstrip()
+                    if s_line[0].lower().count("znodes") > 0:
+                        znodes = s_line[1].lstrip()
+                    if s_line[0].lower().count("xmin") > 0:
+                        xmin = s_line[1].lstrip()
+                    if s_line[0].lower().count("ymin") > 0:
+                        ymin = s_line[1].lstrip()
+                    if s_line[0].lower().count("zmin") > 0:
+                        zmin = s_line[1].lstrip()
+                    if s_line[0].lower().count("xmax") > 0:
+                        xmax = s_line[1].lstrip()
+                    if s_line[0].lower().count("ymax") > 0:
+                        ymax = s_line[1].lstrip()
+                    if s_line[0].lower().count("zmax") > 0:
+                        zmax = s_line[1].lstrip()
+                    if s_line[0].lower().count("valueunit") > 0:
+                        valueunit = s_line[1].lstrip().rstrip()
+                        factor = None
+                    if s_line[0].lower().count("valuemultiplier") > 0:
+                        valuemultiplier = s_line[1].lstrip()
+                    if s_line[0].lower().count("valuerangeminmag") > 0:
+                        valuerangeminmag = s_line[1].lstrip()
+                    if s_line[0].lower().count("valuerangemaxmag") > 0:
+                        valuerangemaxmag = s_line[1].lstrip()
+                    if s_line[0].lower().count("end") > 0:
+                        output.filename = os.path.basename(path)
+                        output.oommf = oommf
+                        output.title = title
+                        output.desc = desc
+                        output.meshtype = meshtype
+                        output.xbase = float(xbase) * METER2ANG
+                        output.ybase = float(ybase) * METER2ANG
+                        output.zbase = float(zbase) * METER2ANG
+                        output.xstepsize = float(xstepsize) * METER2ANG
+                        output.ystepsize = float(ystepsize) * METER2ANG
+                        output.zstepsize = float(zstepsize) * METER2ANG
+                        output.xnodes = float(xnodes)
+                        output.ynodes = float(ynodes)
+                        output.znodes = float(znodes)
+                        output.xmin = float(xmin) * METER2ANG
+                        output.ymin = float(ymin) * METER2ANG
+                        output.zmin = float(zmin) * METER2ANG
+                        output.xmax = float(xmax) * METER2ANG
+                        output.ymax = float(ymax) * METER2ANG
+                        output.zmax = float(zmax) * METER2ANG
+                        output.valuemultiplier = valuemultiplier
+                        output.valuerangeminmag = mag2sld(float(valuerangeminmag), \
+                                                          valueunit)
+                        output.valuerangemaxmag = mag2sld(float(valuerangemaxmag), \
+                                                          valueunit)
+            if values is None:
+                values = np.zeros((0, 3))
+            output.set_m(np.ascontiguousarray(values[:npts, 0]),
+                         np.ascontiguousarray(values[:npts, 1]),
+                         np.ascontiguousarray(values[:npts, 2]))
             return output
         except Exception:
             msg = "%s is not supported: \n" % path
             msg += "We accept only Text format OMF file."
             raise RuntimeError(msg)
 
+# Neutron sld [1/A^2] and volume [A^3] of the atoms read so far
+_ATOM_PROPERTIES = {}
+
+def _atom_properties(atom_name):
+    """
+    Return the neutron sld and the volume of an atom, looked up in
+    periodictable only once for each atom name
+    :Param atom_name: element symbol
+    :return: (sld [1/A^2], volume [A^3]), or None for unknown atoms
+    """
+    if atom_name not in _ATOM_PROPERTIES:
+        try:
+            val = nsf.neutron_sld(atom_name)[0]
+            # sld in Ang^-2 unit
+            val *= 1.0e-6
+            atom = formula(atom_name)
+            # cm to A units
+            vol = 1.0e+24 * atom.mass / atom.density / NA
+            _ATOM_PROPERTIES[atom_name] = (val, vol)
+        except Exception:
+            _ATOM_PROPERTIES[atom_name] = None
+    return _ATOM_PROPERTIES[atom_name]
+
+def _omf_size(xnodes, ynodes, znodes):
+    """
+    Number of data points given by the OMF header node counts
+    :return: size [int]; 1024 if the counts are missing or invalid
+    """
+    try:
+        return max(1, int(float(xnodes) * float(ynodes) * float(znodes)))
+    except (TypeError, ValueError):
+        return 1024
+
 class PDBReader(object):
     """
     PDB reader class: limited for reading the lines starting with 'ATOM'
@@ -504,6 +891,7 @@ class PDBReader(object):
     ## List of allowed extensions
     ext = ['.pdb', '.PDB']
 
+    @_use_cache
     def read(self, path):
         """
         Load data file
@@ -512,103 +900,101 @@ class PDBReader(object):
         :return: MagSLD
         :raise RuntimeError: when the file can't be opened
         """
-        pos_x = np.zeros(0)
-        pos_y = np.zeros(0)
-        pos_z = np.zeros(0)
-        sld_n = np.zeros(0)
-        sld_mx = np.zeros(0)
-        sld_my = np.zeros(0)
-        sld_mz = np.zeros(0)
-        vol_pix = np.zeros(0)
-        pix_symbol = np.zeros(0)
+        # Columns are grown as lists and converted to arrays once
+        pos_x = []
+        pos_y = []
+        pos_z = []
+        sld_n = []
+        vol_pix = []
+        pix_symbol = []
         x_line = []
         y_line = []
         z_line = []
-        x_lines = []
-        y_lines = []
-        z_lines = []
+        # Bonds already in x_line, y_line and z_line
+        x_set = set()
+        y_set = set()
+        z_set = set()
         try:
-            input_f = open(path, 'rb')
-            buff = decode(input_f.read())
-            lines = buff.split('\n')
-            input_f.close()
             num = 0
-            for line in lines:
-                try:
-                    # check if line starts with "ATOM"
-                    if line[0:6].strip().count('ATM') > 0 or \
-                                line[0:6].strip() == 'ATOM':
-                        # define fields of interest
-                        atom_name = line[12:16].strip()
-                        try:
-                            float(line[12])
-                            atom_name = atom_name[1].upper()
-                        except Exception:
-                            if len(atom_name) == 4:
-                                atom_name = atom_name[0].upper()
-                            elif line[12] != ' ':
-                                atom_name = atom_name[0].upper() + \
-                                        atom_name[1].lower()
-                            else:
-                                atom_name = atom_name[0].upper()
-                        _pos_x = float(line[30:38].strip())
-                        _pos_y = float(line[38:46].strip())
-                        _pos_z = float(line[46:54].strip())
-                        pos_x = np.append(pos_x, _pos_x)
-                        pos_y = np.append(pos_y, _pos_y)
-                        pos_z = np.append(pos_z, _pos_z)
-                        try:
-                            val = nsf.neutron_sld(atom_name)[0]
-                            # sld in Ang^-2 unit
-                            val *= 1.0e-6
-                            sld_n = np.append(sld_n, val)
-                            atom = formula(atom_name)
-                            # cm to A units
-                            vol = 1.0e+24 * atom.mass / atom.density / NA
-                            vol_pix = np.append(vol_pix, vol)
-                        except Exception:
-                            logger.error("Error: set the sld of %s to zero"% atom_name)
-                            sld_n = np.append(sld_n, 0.0)
-                        sld_mx = np.append(sld_mx, 0)
-                        sld_my = np.append(sld_my, 0)
-                        sld_mz = np.append(sld_mz, 0)
-                        pix_symbol = np.append(pix_symbol, atom_name)
-                    elif line[0:6].strip().count('CONECT') > 0:
-                        toks = line.split()
-                        num = int(toks[1]) - 1
-                        val_list = []
-                        for val in toks[2:]:
+            with open(path, 'rb') as input_f:
+                for line in input_f:
+                    line = decode(line).rstrip('\n')
+                    try:
+                        # check if line starts with "ATOM"
+                        if line[0:6].strip().count('ATM') > 0 or \
+                                    line[0:6].strip() == 'ATOM':
+                            # define fields of interest
+                            atom_name = line[12:16].strip()
                             try:
-                                int_val = int(val)
+                                float(line[12])
+                                atom_name = atom_name[1].upper()
                             except Exception:
-                                break
-                            if int_val == 0:
-                                break
-                            val_list.append(int_val)
-                        #need val_list ordered
-                        for val in val_list:
-                            index = val - 1
-                            if (pos_x[index], pos_x[num]) in x_line and \
-                               (pos_y[index], pos_y[num]) in y_line and \
-                               (pos_z[index], pos_z[num]) in z_line:
-                                continue
-                            x_line.append((pos_x[num], pos_x[index]))
-                            y_line.append((pos_y[num], pos_y[index]))
-                            z_line.append((pos_z[num], pos_z[index]))
-                    if len(x_line) > 0:
-                        x_lines.append(x_line)
-                        y_lines.append(y_line)
-                        z_lines.append(z_line)
-                except Exception:
-                    logger.error(sys.exc_value)
-
-            output = MagSLD(pos_x, pos_y, pos_z, sld_n, sld_mx, sld_my, sld_mz)
+                                if len(atom_name) == 4:
+                                    atom_name = atom_name[0].upper()
+                                elif line[12] != ' ':
+                                    atom_name = atom_name[0].upper() + \
+                                            atom_name[1].lower()
+                                else:
+                                    atom_name = atom_name[0].upper()
+                            _pos_x = float(line[30:38].strip())
+                            _pos_y = float(line[38:46].strip())
+                            _pos_z = float(line[46:54].strip())
+                            pos_x.append(_pos_x)
+                            pos_y.append(_pos_y)
+                            pos_z.append(_pos_z)
+                            props = _atom_properties(atom_name)
+                            if props is not None:
+                                sld_n.append(props[0])
+                                vol_pix.append(props[1])
+                            else:
+                                logger.error("Error: set the sld of %s to zero"% atom_name)
+                                sld_n.append(0.0)
+                            pix_symbol.append(atom_name)
+                        elif line[0:6].strip().count('CONECT') > 0:
+                            toks = line.split()
+                            num = int(toks[1]) - 1
+                            val_list = []
+                            for val in toks[2:]:
+                                try:
+                                    int_val = int(val)
+                                except Exception:
+                                    break
+                                if int_val == 0:
+                                    break
+                                val_list.append(int_val)
+                            #need val_list ordered
+                            for val in val_list:
+                                index = val - 1
+                                if (pos_x[index], pos_x[num]) in x_set and \
+                                   (pos_y[index], pos_y[num]) in y_set and \
+                                   (pos_z[index], pos_z[num]) in z_set:
+                                    continue
+                                bond_x = (pos_x[num], pos_x[index])
+                                bond_y = (pos_y[num], pos_y[index])
+                                bond_z = (pos_z[num], pos_z[index])
+                                x_line.append(bond_x)
+                                y_line.append(bond_y)
+                                z_line.append(bond_z)
+                                x_set.add(bond_x)
+                                y_set.add(bond_y)
+                                z_set.add(bond_z)
+                    except Exception:
+                        logger.error(sys.exc_value)
+
+            natoms = len(pos_x)
+            output = MagSLD(np.array(pos_x, dtype=float),
+                            np.array(pos_y, dtype=float),
+                            np.array(pos_z, dtype=float),
+                            np.array(sld_n, dtype=float),
+                            np.zeros(natoms), np.zeros(natoms),
+                            np.zeros(natoms))
             output.set_conect_lines(x_line, y_line, z_line)
             output.filename = os.path.basename(path)
             output.set_pix_type('atom')
-            output.set_pixel_symbols(pix_symbol)
+            output.set_pixel_symbols(np.array(pix_symbol) if pix_symbol
+                                     else np.zeros(0))
             output.set_nodes()
-            output.set_pixel_volumes(vol_pix)
+            output.set_pixel_volumes(np.array(vol_pix, dtype=float))
             output.sld_unit = '1/A^(2)'
             return output
         except Exception:
@@ -632,6 +1018,7 @@ class SLDReader(object):
             "all files (*.*)|*.*"]
     ## List of allowed extensions
     ext = ['.sld', '.SLD', '.txt', '.TXT', '.*']
+    @_use_cache
     def read(self, path):
         """
         Load data file
@@ -666,35 +1053,27 @@ class SLDReader(object):
                     vol_pix = None
             except Exception:
                 # For older version of numpy
-                input_f = open(path, 'rb')
-                buff = decode(input_f.read())
-                lines = buff.split('\n')
-                input_f.close()
-                for line in lines:
-                    toks = line.split()
-                    try:
-                        _pos_x = float(toks[0])
-                        _pos_y = float(toks[1])
-                        _pos_z = float(toks[2])
-                        _sld_n = float(toks[3])
-                        _sld_mx = float(toks[4])
-                        _sld_my = float(toks[5])
-                        _sld_mz = float(toks[6])
-                        pos_x = np.append(pos_x, _pos_x)
-                        pos_y = np.append(pos_y, _pos_y)
-                        pos_z = np.append(pos_z, _pos_z)
-                        sld_n = np.append(sld_n, _sld_n)
-                        sld_mx = np.append(sld_mx, _sld_mx)
-                        sld_my = np.append(sld_my, _sld_my)
-                        sld_mz = np.append(sld_mz, _sld_mz)
+                columns = [[] for _ in range(7)]
+                vol_pix = []
+                with open(path, 'rb') as input_f:
+                    for line in input_f:
+                        toks = decode(line).split()
                         try:
-                            _vol_pix = float(toks[7])
-                            vol_pix = np.append(vol_pix, _vol_pix)
-                        except Exception:
-                            vol_pix = None
-                    except Exception:
-                        # Skip non-data lines
-                        logger.error(sys.exc_value)
+                            values = [float(toks[col]) for col in range(7)]
+                            for column, value in zip(columns, values):
+                                column.append(value)
+                            try:
+                                vol_pix.append(float(toks[7]))
+                            except Exception:
+                                vol_pix = None
+                        except Exception as exc:
+                            # Skip non-data lines
+                            logger.error(exc)
+                (pos_x, pos_y, pos_z, sld_n,
+                 sld_mx, sld_my, sld_mz) = [np.array(column, dtype=float)
+                                            for column in columns]
+                if vol_pix is not None:
+                    vol_pix = np.array(vol_pix, dtype=float)
             output = MagSLD(pos_x, pos_y, pos_z, sld_n,
                             sld_mx, sld_my, sld_mz)
             output.filename = os.path.basename(path)
@@ -742,6 +1121,111 @@ class SLDReader(object):
         out.close()
 
 
+class SLDCache(object):
+    """
+    Binary container for MagSLD and OMFData objects.
+
+    The arrays (positions, SLDs, pixel volumes and symbols, CONECT lines or
+    OMF m values) are stored uncompressed in a .npz file so they can be
+    memory mapped on reading; the other attributes are stored alongside.
+    """
+    ## File type
+    type_name = "SLD cache"
+    ## Wildcards
+    type = ["SLD cache files (*.npz)|*.npz"]
+    ## List of allowed extensions
+    ext = ['.npz']
+    ## Classes which can be stored
+    classes = ('MagSLD', 'OMFData')
+
+    def read(self, path, mmap_mode='c'):
+        """
+        Load a cache file
+
+        :param path: file path
+        :param mmap_mode: numpy memmap mode for the arrays, None to read
+            them in memory; the default 'c' maps them copy-on-write
+        :return: MagSLD or OMFData
+        :raise RuntimeError: when the file is not a cache file
+        """
+        return self.read_source(path, mmap_mode)[0]
+
+    def read_source(self, path, mmap_mode='c'):
+        """
+        Load a cache file
+
+        :return: (data, source) where source is the (path, mtime, size) of
+            the text file the cache was written from, or None
+        """
+        try:
+            if mmap_mode is None:
+                with np.load(path) as npz:
+                    arrays = dict((name, npz[name]) for name in npz.files)
+            else:
+                arrays = _npz_memmap(path, mmap_mode)
+            version = int(arrays.pop('__version__'))
+            class_name = str(arrays.pop('__class__'))
+        except Exception:
+            raise RuntimeError("%s is not a sld cache file" % path)
+        if version != _CACHE_VERSION or class_name not in self.classes:
+            raise RuntimeError("%s: unsupported sld cache" % path)
+        source = None
+        if '__source__' in arrays:
+            mtime, size = arrays.pop('__source_stat__')
+            source = (str(arrays.pop('__source__')[()]), float(mtime),
+                      int(size))
+        none_names = [str(name) for name in arrays.pop('__none__')]
+        list_names = [str(name) for name in arrays.pop('__list__')]
+        array_names = [str(name) for name in arrays.pop('__array__')]
+        cls = MagSLD if class_name == 'MagSLD' else OMFData
+        data = cls.__new__(cls)
+        for name in none_names:
+            setattr(data, name, None)
+        for name, value in arrays.items():
+            if name in list_names:
+                value = [tuple(item) for item in value.tolist()]
+            elif name not in array_names:
+                value = value[()].item() if value.dtype.kind != 'U' \
+                    else str(value[()])
+            setattr(data, name, value)
+        return data, source
+
+    def write(self, path, data, source=None):
+        """
+        Write data to a cache file
+
+        :param path: file path; written uncompressed, whatever its extension
+        :param data: MagSLD or OMFData
+        :param source: (path, mtime, size) of the text file data came from
+        """
+        class_name = data.__class__.__name__
+        if class_name not in self.classes:
+            raise ValueError("can't write %s to a sld cache" % class_name)
+        arrays = {'__version__': np.array(_CACHE_VERSION),
+                  '__class__': np.array(class_name)}
+        if source is not None:
+            arrays['__source__'] = np.array(source[0])
+            arrays['__source_stat__'] = np.array(source[1:], dtype=float)
+        none_names = []
+        list_names = []
+        array_names = []
+        for name, value in vars(data).items():
+            if value is None:
+                none_names.append(name)
+            elif isinstance(value, list):
+                list_names.append(name)
+                arrays[name] = np.array(value, dtype=float)
+            elif isinstance(value, np.ndarray):
+                array_names.append(name)
+                arrays[name] = np.ascontiguousarray(value)
+            else:
+                arrays[name] = np.array(value)
+        arrays['__none__'] = np.array(none_names, dtype='U')
+        arrays['__list__'] = np.array(list_names, dtype='U')
+        arrays['__array__'] = np.array(array_names, dtype='U')
+        with open(path, 'wb') as fid:
+            np.savez(fid, **arrays)
+
 class OMFData(object):
     """
     OMF Data.
@@ -5,12 +5,14 @@ import warnings
 import numpy as np
 from scipy.optimize import curve_fit
 from scipy.interpolate import interp1d
-from scipy.fftpack import dct
+from scipy.fftpack import dct, fft, ifft, next_fast_len
+from scipy.integrate import trapz, cumtrapz
 from scipy.signal import argrelextrema
 from numpy.linalg import lstsq
 from sas.sascalc.dataloader.data_info import Data1D
 from sas.sascalc.corfunc.transform_thread import FourierThread
 from sas.sascalc.corfunc.transform_thread import HilbertThread
+from sas.sascalc.corfunc.transform_thread import PorodTail
 
 class CorfuncCalculator(object):
 
@@ -76,6 +78,8 @@ class CorfuncCalculator(object):
         self.upperq = upperq
         self.background = self.compute_background()
         self._transform_thread = None
+        # Porod tail of the last extrapolation, if computed analytically
+        self._porod_tail = None
 
     def set_data(self, data, scale=1):
         """
@@ -113,18 +117,37 @@ class CorfuncCalculator(object):
 
         return bg
 
-    def compute_extrapolation(self):
+    def compute_extrapolation(self, padding=None):
         """
         Extrapolate and interpolate scattering data
 
+        The data is extrapolated to 100*Qmax. If padding is given, the
+        extrapolation stops at padding*Qmax and the contribution of the Porod
+        tail beyond it is summed analytically by the Fourier transform, which
+        then only computes the transforms up to x = 200.
+
+        :param padding: Extent of the extrapolated data, as a multiple of
+            Qmax, at least 1 so that the Porod tail does not replace the
+            measured data (optional)
         :return: The extrapolated data
         """
+        if padding is not None and not padding >= 1:
+            raise ValueError("padding must be at least 1, not %r" % padding)
         q = self._data.x
         iq = self._data.y
+        dq = q[1]-q[0]
 
         params, s2 = self._fit_data(q, iq)
         # Extrapolate to 100*Qmax in experimental data
-        qs = np.arange(0, q[-1]*100, (q[1]-q[0]))
+        n_points = int(np.ceil(q[-1]*100/dq))
+        if padding is None:
+            self._porod_tail = None
+            qs = np.arange(0, q[-1]*100, dq)
+        else:
+            n_data = min(int(np.ceil(padding*q[-1]/dq)), n_points)
+            self._porod_tail = PorodTail(params['K'], params['sigma'],
+                                         self.background, dq, n_data, n_points)
+            qs = np.arange(n_data)*dq
         iqs = s2(qs)
 
         extrapolation = Data1D(qs, iqs)
@@ -154,7 +177,7 @@ class CorfuncCalculator(object):
         if trans_type == 'fourier':
             self._transform_thread = FourierThread(self._data, extrapolation,
             background, completefn=completefn,
-            updatefn=updatefn)
+            updatefn=updatefn, porod_tail=self._porod_tail)
         elif trans_type == 'hilbert':
             self._transform_thread = HilbertThread(self._data, extrapolation,
             background, completefn=completefn, updatefn=updatefn)
@@ -220,7 +243,7 @@ class CorfuncCalculator(object):
         # Find the data points where the graph is linear to within 1%
         mask = np.where(np.abs((y-(m*x+b))/y) < 0.01)[0]
         if len(mask) == 0:  # Return garbage for bad fits
-            return { 'max': self._round_sig_figs(x[maxs[0]], 6) }
+            return { 'max': x[maxs[0]] }
         dtr = x[mask[0]]  # Beginning of Linear Section
         d0 = x[mask[-1]]  # End of Linear Section
         GammaMax = y[mask[-1]]
@@ -284,3 +307,229 @@ class CorfuncCalculator(object):
         params = {'A': g[1], 'B': g[0], 'K': k, 'sigma': sigma}
 
         return params, s2
+
+
+def _dct_rows(x):
+    """
+    DCT-II of each row of x, as dct(x, axis=1). When the length of the rows
+    is not a fast FFT length (e.g. a prime, for which fftpack takes O(N^2)
+    time), the transform is computed with Bluestein's algorithm, as a
+    convolution by FFTs of a fast length.
+    """
+    n = x.shape[1]
+    if next_fast_len(n) == n:
+        return dct(x, axis=1)
+    m = next_fast_len(2*n - 1)
+    k = np.arange(n)
+    # exp(-i*pi*k^2/(2n)), with k^2 reduced modulo 4n to keep the precision
+    chirp = np.exp(-0.5j*np.pi*((k*k) % (4*n))/n)
+    kernel = np.zeros(m, dtype=complex)
+    kernel[:n] = chirp.conj()
+    kernel[m-n+1:] = chirp[:0:-1].conj()
+    conv = ifft(fft(x*chirp, m, axis=1)*fft(kernel), axis=1)[:, :n]
+    # dct(x)[k] = 2*Re(exp(-i*pi*k/(2n)) * sum(x[j]*exp(-i*pi*k*j/n)))
+    return 2*(np.exp(-0.5j*np.pi*k/n)*chirp*conv).real
+
+
+class BatchCorfuncCalculator(object):
+    """
+    Run the corfunc analysis of CorfuncCalculator (Fourier transform only) on
+    a stack of frames sharing one q grid, such as a time-resolved series.
+
+    The Guinier fits of all the frames are solved at once on their shared
+    design matrix, as are the linear Porod fits with sigma = 0; only the
+    frames whose Porod fit improves with sigma > 0 are refined individually.
+    The extrapolation weights are computed once for all the frames, and the
+    transforms of all the frames are computed together, row by row.
+    """
+    # Parameters returned by CorfuncCalculator.extract_parameters
+    PARAMETERS = ('max', 'dtr', 'Lc', 'd0', 'A', 'fill')
+
+    def __init__(self, q, frames, lowerq, upperq, scale=1):
+        """
+        :param q: q values shared by the frames
+        :param frames: 2D array of intensities, with one frame per row
+        :param lowerq: The Q value to use as the boundary for
+            Guinier extrapolation
+        :param upperq: A tuple of the form (lower, upper).
+            Values between lower and upper will be used for Porod extrapolation
+        :param scale: Scaling factor for I(q)
+        """
+        q = np.asarray(q, dtype=np.float64)
+        frames = np.asarray(frames, dtype=np.float64)
+        if frames.ndim != 2 or frames.shape[1] != len(q) or len(q) <= 1:
+            msg = "The frames must be a 2D array with one row per frame "
+            msg += "and %d > 1 columns; got shape %s" % (len(q), frames.shape)
+            raise ValueError(msg)
+        self.q = q
+        self.frames = frames * scale
+        self.lowerq = lowerq
+        self.upperq = upperq
+        self._calculator = CorfuncCalculator()
+        # Porod fits of each frame, as (K, sigma, background) rows
+        self._porod = self._fit_porod()
+        self.background = self._porod[:, 2].copy()
+
+    def _fit_porod(self):
+        """
+        Fit the Porod region of each frame
+
+        :return: 2D array of (K, sigma, background) rows
+        """
+        mask = np.logical_and(self.q > self.upperq[0],
+                              self.q < self.upperq[1])
+        q = self.q[mask]
+        iq = self.frames[:, mask]
+        # With sigma = 0, I(q)*q^2 = K/q^2 + background*q^2 is linear in K
+        # and the background
+        design = np.vstack([q**(-2), q**2]).T
+        coeffs = lstsq(design, (iq*q**2).T, rcond=-1)[0]
+        residuals = np.dot(design, coeffs) - (iq*q**2).T
+        fits = np.column_stack([coeffs[0], np.zeros(len(iq)), coeffs[1]])
+        # The derivative of the squared residuals with respect to sigma^2
+        # is -2*K*sum(residuals) at sigma = 0: refine the frames for which
+        # it is negative
+        for i in np.flatnonzero(coeffs[0]*residuals.sum(axis=0) > 0):
+            fits[i] = self._calculator._fit_porod(q, iq[i])
+        return fits
+
+    def _fit_guinier(self):
+        """
+        Fit the Guinier region of each frame
+
+        :return: 2D array of (A, B) rows, ln(I(q)) = A + B*q^2
+        """
+        mask = np.logical_and(self.q < self.lowerq, 0 < self.q)
+        q = self.q[mask]
+        design = np.vstack([q**2, np.ones(q.shape)]).T
+        g = lstsq(design, np.log(self.frames[:, mask]).T, rcond=-1)[0]
+        return np.column_stack([g[1], g[0]])
+
+    def _interpolate_data(self, x):
+        """
+        Linear interpolation of the frames at x, within the q range
+        """
+        i = np.clip(np.searchsorted(self.q, x), 1, len(self.q) - 1)
+        w = (x - self.q[i - 1])/(self.q[i] - self.q[i - 1])
+        return self.frames[:, i - 1]*(1 - w) + self.frames[:, i]*w
+
+    @staticmethod
+    def _smoothed_frames(x, f, g, start, stop, n_frames):
+        """
+        Interpolate between the frame curves f and g over start:stop, as
+        CorfuncCalculator._Interpolator does
+
+        :param x: 1D array of q values
+        :param f: Function of x returning the first curve of each frame
+        :param g: Function of x returning the second curve of each frame
+        :param n_frames: Number of frames
+        :return: 2D array of the interpolated curves, one row per frame
+        """
+        ys = np.empty((n_frames, len(x)))
+        below = x <= start
+        above = x >= stop
+        mask = np.logical_not(np.logical_or(below, above))
+        ys[:, below] = f(x[below])
+        ys[:, above] = g(x[above])
+        h = 1/(1+(x[mask]-stop)**2/(start-x[mask])**2)
+        ys[:, mask] = h*g(x[mask])+(1-h)*f(x[mask])
+        return ys
+
+    def compute_extrapolation(self):
+        """
+        Extrapolate and interpolate the frames to 100*Qmax
+
+        :return: params, qs, iqs = dictionary of the arrays of the A and B
+            Guinier and K and sigma Porod parameters of each frame, the
+            extrapolated q values and the 2D array of the extrapolated frames
+        """
+        q = self.q
+        n_frames = len(self.frames)
+        guinier = self._fit_guinier()
+        k, sigma = self._porod[:, 0:1], self._porod[:, 1:2]
+        bg = self.background[:, None]
+
+        def porod(x):
+            return bg + (k*x**(-4))*np.exp(-x**2*sigma**2)
+
+        def s1(x):
+            return self._smoothed_frames(x, self._interpolate_data, porod,
+                                         self.upperq[0], q[-1], n_frames)
+
+        def guinier_curve(x):
+            return np.exp(guinier[:, 0:1] + guinier[:, 1:2]*x**2)
+
+        qs = np.arange(0, q[-1]*100, (q[1]-q[0]))
+        iqs = self._smoothed_frames(qs, guinier_curve, s1, q[0], self.lowerq,
+                                    n_frames)
+        params = {'A': guinier[:, 0], 'B': guinier[:, 1],
+                  'K': self._porod[:, 0], 'sigma': self._porod[:, 1]}
+        return params, qs, iqs
+
+    def compute_transform(self, qs, iqs, background=None):
+        """
+        Fourier transform the extrapolated frames, as FourierThread does
+
+        :param qs: The extrapolated q values
+        :param iqs: 2D array of the extrapolated frames
+        :param background: The background of each frame (if not provided,
+            the backgrounds of the Porod fits are used)
+        :return: xs, gamma1, gamma3, idf = the x values, and the 2D arrays of
+            the 1D correlation functions, of the 3D correlation functions up
+            to x = 200 and of the interface distribution functions
+        """
+        if background is None:
+            background = self.background
+        iqs = iqs - np.reshape(background, (-1, 1))
+        xs = np.pi*np.arange(len(qs),dtype=np.float32)/(qs[1]-qs[0])/len(qs)
+
+        # ----- 1D Correlation Function -----
+        gamma1 = _dct_rows(iqs*qs**2)
+        Q = gamma1.max(axis=1)[:, None]
+        gamma1 /= Q
+
+        # ----- 3D Correlation Function -----
+        n = np.count_nonzero(xs <= 200.0)
+        gamma3 = cumtrapz(gamma1[:, :n], xs[:n], axis=1)/xs[1:n]
+        gamma3 = np.hstack((np.ones((len(iqs), 1)), gamma3))
+
+        # ----- Interface Distribution function -----
+        idf = _dct_rows(-qs**4 * iqs)
+        idf[:, 0] = trapz(-qs**4 * iqs, qs, axis=1)
+        idf /= Q
+
+        return xs, gamma1, gamma3, idf
+
+    def extract_parameters(self, xs, gamma1):
+        """
+        Extract the parameters of CorfuncCalculator.extract_parameters from
+        the correlation function of each frame
+
+        :param xs: The x values of the correlation functions
+        :param gamma1: 2D array of the 1D correlation functions
+        :return: A structured array with one row per frame and one field per
+            parameter, which is NaN where it couldn't be extracted
+        """
+        table = np.full(len(gamma1), np.nan,
+                        dtype=[(name, np.float64) for name in self.PARAMETERS])
+        for i, y in enumerate(gamma1):
+            try:
+                params = self._calculator.extract_parameters(Data1D(xs, y))
+            except IndexError:
+                # No minimum or inflection point
+                params = None
+            if params is None:
+                continue
+            for name, value in params.items():
+                table[name][i] = value
+        return table
+
+    def compute_parameters(self):
+        """
+        Extrapolate and transform the frames, and extract their parameters
+
+        :return: The structured array of extract_parameters
+        """
+        _, qs, iqs = self.compute_extrapolation()
+        xs, gamma1, _, _ = self.compute_transform(qs, iqs)
+        return self.extract_parameters(xs, gamma1)
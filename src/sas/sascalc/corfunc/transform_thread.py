@@ -5,13 +5,102 @@ from scipy.integrate import trapz, cumtrapz
 import numpy as np
 from time import sleep
 
+# Largest x at which the transforms are plotted, and computed in the
+# analytic tail mode
+XMAX = 200.0
+# Ratio of the lengths of consecutive segments of the Porod tail sums
+TAIL_RATIO = 1.01
+# Number of x values transformed together in the analytic tail mode
+X_CHUNK = 256
+
+
+class PorodTail(object):
+    """
+    The Porod tail of an extrapolation, I(q) = bg + K q^-4 exp(-q^2 sigma^2)
+    at q = n*dq for n_start <= n < n_end, whose contribution to the
+    transforms is summed in closed form rather than over every point
+    """
+    def __init__(self, K, sigma, bg, dq, n_start, n_end):
+        self.K = K
+        self.sigma = sigma
+        self.bg = bg
+        self.dq = dq
+        self.n_start = n_start
+        self.n_end = n_end
+
+    def subtracted(self, n, background):
+        """
+        I(q) - background at the points of index n, without subtracting
+        the background from the small Porod term
+
+        :param n: Indices of the points
+        :param background: Background to subtract from I(q)
+        """
+        q = n * self.dq
+        return ((self.bg - background)
+                + self.K * q**(-4) * np.exp(-q**2 * self.sigma**2))
+
+    def segments(self):
+        """
+        Split the tail into segments of geometrically growing lengths
+
+        :return: first index of each segment, number of points of each
+        """
+        n_nodes = int(np.ceil(np.log(float(self.n_end) / self.n_start)
+                              / np.log(TAIL_RATIO))) + 1
+        nodes = np.unique(np.round(self.n_start * TAIL_RATIO**np.arange(
+            n_nodes)).astype(np.int64))
+        nodes = np.append(nodes[nodes < self.n_end], self.n_end)
+        return nodes[:-1], np.diff(nodes)
+
+
+def _linear_cosine_sums(theta, starts, lengths, first, middle, last):
+    """
+    Sums of a_n*cos(theta*(n + 1/2)) over segments of consecutive n, in which
+    a_n is approximated by mean + slope*k, with k = n - c centred on the
+    middle c of the segment, the mean given by Simpson's rule and the slope
+    by the end points. The sum is then
+    cos(phi)*mean*sum(cos(k theta)) - sin(phi)*slope*sum(k sin(k theta)),
+    both sums having closed forms.
+
+    :param theta: 1D array of angles
+    :param starts: first index n of each segment
+    :param lengths: number of points of each segment
+    :param first: value of a_n at the first point of each segment
+    :param middle: value of a_n at the middle c of each segment
+    :param last: value of a_n at the last point of each segment
+    :return: Sum over all the segments for each theta
+    """
+    t = theta[:, None]
+    m = lengths[None, :].astype(np.float64)
+    mean = (first + 4 * middle + last) / 6
+    slope = (last - first) / np.maximum(m - 1, 1)
+    half = t / 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sin_half = np.sin(half)
+        d = np.sin(m * half) / sin_half
+        e = (0.5 * np.sin(m * half) * np.cos(half)
+             - 0.5 * m * np.cos(m * half) * sin_half) / sin_half**2
+    # Series expansions where the closed forms lose precision
+    small = m * t < 0.01
+    s2 = m * (m * m - 1) / 12
+    s4 = m * (m * m - 1) * (3 * m * m - 7) / 240
+    d = np.where(small, m - t**2 * s2 / 2 + t**4 * s4 / 24, d)
+    e = np.where(small, t * s2 - t**3 * s4 / 6, e)
+    phase = t * (starts + (m - 1) / 2 + 0.5)
+    return np.sum(np.cos(phase) * mean * d - np.sin(phase) * slope * e,
+                  axis=1)
+
+
 class FourierThread(CalcThread):
     def __init__(self, raw_data, extrapolated_data, bg, updatefn=None,
-        completefn=None):
+        completefn=None, porod_tail=None):
         CalcThread.__init__(self, updatefn=updatefn, completefn=completefn)
         self.data = raw_data
         self.background = bg
         self.extrapolation = extrapolated_data
+        # PorodTail beyond the extrapolated data, or None
+        self.porod_tail = porod_tail
 
     def check_if_cancelled(self):
         if self.isquit():
@@ -33,6 +122,9 @@ class FourierThread(CalcThread):
         self.ready(delay=0.0)
 
         if self.check_if_cancelled(): return
+        if self.porod_tail is not None:
+            self.compute_with_tail()
+            return
         try:
             # ----- 1D Correlation Function -----
             gamma1 = dct((iqs-background)*qs**2)
@@ -85,6 +177,76 @@ class FourierThread(CalcThread):
 
         self.complete(transforms=transforms)
 
+    def compute_with_tail(self):
+        """
+        Compute the transforms up to x = XMAX, on the x values of the
+        transform of the whole extrapolation, from the extrapolated data and
+        the Porod tail beyond it
+        """
+        tail = self.porod_tail
+        qs = self.extrapolation.x
+        iqs = self.extrapolation.y
+        background = self.background
+        dq = tail.dq
+        n_points = tail.n_end
+
+        xs = np.pi*np.arange(int(XMAX*dq*n_points/np.pi) + 2,
+                             dtype=np.float32)/dq/n_points
+        xs = xs[xs <= XMAX]
+        # x*dq, without the rounding of the single precision xs
+        theta = np.pi*np.arange(len(xs))/n_points
+
+        try:
+            # Integrands of gamma1 and the IDF on the extrapolated data...
+            f1 = (iqs-background)*qs**2
+            f2 = -qs**4 * (iqs-background)
+            # ...and at the ends and middles of the segments of the tail
+            starts, lengths = tail.segments()
+            points = (starts, starts + (lengths-1)/2.0, starts + lengths - 1)
+            tail_f1 = [tail.subtracted(n, background)*(n*dq)**2
+                       for n in points]
+            tail_f2 = [-(n*dq)**4 * tail.subtracted(n, background)
+                       for n in points]
+
+            gamma1 = np.empty(len(xs))
+            idf = np.empty(len(xs))
+            n = np.arange(len(qs)) + 0.5
+            for i in range(0, len(xs), X_CHUNK):
+                if self.check_if_cancelled(): return
+                t = theta[i:i + X_CHUNK]
+                # 2*sum(f_n cos(theta (n + 1/2))), as computed by the DCT
+                cosines = np.cos(np.outer(t, n))
+                gamma1[i:i + X_CHUNK] = 2*(np.dot(cosines, f1)
+                    + _linear_cosine_sums(t, starts, lengths, *tail_f1))
+                idf[i:i + X_CHUNK] = 2*(np.dot(cosines, f2)
+                    + _linear_cosine_sums(t, starts, lengths, *tail_f2))
+            Q = gamma1.max()
+            gamma1 /= Q
+
+            # ----- 3D Correlation Function -----
+            gamma3 = cumtrapz(gamma1, xs)/xs[1:]
+            gamma3 = np.hstack((1.0, gamma3)) # Gamma_3(0) is defined as 1
+
+            # IDF(0) = int_0^inf q^4 * I(q) * dq, with the trapezium rule
+            # over the extrapolation and the tail points
+            idf[0] = (idf[0]/2 - (f2[0] + tail_f2[2][-1])/2)*dq
+            idf /= Q # Normalise using scattering invariant
+
+        except Exception as e:
+            import logging
+            logger = logging.getLogger(__name__)
+            logger.error(e)
+
+            self.update(msg="Fourier transform failed.")
+            self.complete(transforms=None)
+            return
+        if self.isquit():
+            return
+        self.update(msg="Fourier transform completed.")
+
+        transforms = (Data1D(xs, gamma1), Data1D(xs, gamma3), Data1D(xs, idf))
+        self.complete(transforms=transforms)
+
 class HilbertThread(CalcThread):
     def __init__(self, raw_data, extrapolated_data, bg, updatefn=None,
         completefn=None):
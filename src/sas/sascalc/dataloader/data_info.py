@@ -24,7 +24,51 @@ from __future__ import print_function
 #from sas.guitools.plottables import Data1D as plottable_1D
 from sas.sascalc.data_util.uncertainty import Uncertainty
 import numpy as np
-import math
+
+
+def _fill(target, values):
+    """
+    Store values in target when it is a writable float array of the same
+    shape, so that operations update data sets without new allocations.
+
+    :param target: array currently held by the data set, or None
+    :param values: new values
+    :return: target, or a new float array holding values
+    """
+    if isinstance(target, np.ndarray) and target.dtype == np.float64 \
+            and target.shape == np.shape(values) and target.flags.writeable:
+        target[...] = values
+        return target
+    return np.array(values, dtype=float)
+
+
+def _average_resolution(res, res_self, res_other):
+    """
+    Combine the resolution of two data sets the same way the operators
+    always did, sqrt((res*res_self + res_other**2)/2).
+
+    :param res: resolution of the result, a copy of res_self or res_self itself
+    :param res_self: resolution of the data set on the left of the operator
+    :param res_other: resolution of the other data set
+    :return: the combined resolution
+    """
+    value = np.asarray(res, dtype=float) * res_self
+    value += np.asarray(res_other)**2
+    value /= 2
+    return _fill(res, np.sqrt(value))
+
+
+def _mismatch(values, other_values, tolerance):
+    """
+    Flag the points where two sets of coordinates differ by more than
+    a relative tolerance.
+
+    :return: boolean array
+    """
+    values = np.asarray(values)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.fabs((values - other_values)/values) > tolerance
+
 
 class plottable_1D(object):
     """
@@ -575,6 +619,14 @@ class DataInfo(object):
         """
         return NotImplemented
 
+    def _perform_inplace_operation(self, other, operation):
+        """
+        Private method to perform an operation in place. Not implemented for
+        DataInfo, but should be implemented for each data class inherited
+        from DataInfo that holds actual data (ex.: Data1D)
+        """
+        return NotImplemented
+
     def _perform_union(self, other):
         """
         Private method to perform union operation. Not implemented for DataInfo,
@@ -679,6 +731,60 @@ class DataInfo(object):
             return b/a
         return self._perform_operation(other, operation)
 
+    # Python 3 only looks up the true division methods
+    __truediv__ = __div__
+    __rtruediv__ = __rdiv__
+
+    def __iadd__(self, other):
+        """
+        Add a data set to the current one in place
+
+        :param other: data set to add to the current one
+        :return: the current data set, with its arrays updated
+        :raise ValueError: raised when two data sets are incompatible
+        """
+        def operation(a, b):
+            return a + b
+        return self._perform_inplace_operation(other, operation)
+
+    def __isub__(self, other):
+        """
+        Subtract a data set from the current one in place
+
+        :param other: data set to subtract from the current one
+        :return: the current data set, with its arrays updated
+        :raise ValueError: raised when two data sets are incompatible
+        """
+        def operation(a, b):
+            return a - b
+        return self._perform_inplace_operation(other, operation)
+
+    def __imul__(self, other):
+        """
+        Multiply the current data set by another in place
+
+        :param other: data set to multiply the current one by
+        :return: the current data set, with its arrays updated
+        :raise ValueError: raised when two data sets are incompatible
+        """
+        def operation(a, b):
+            return a * b
+        return self._perform_inplace_operation(other, operation)
+
+    def __idiv__(self, other):
+        """
+        Divide the current data set by another in place
+
+        :param other: data set that the current one is divided by
+        :return: the current data set, with its arrays updated
+        :raise ValueError: raised when two data sets are incompatible
+        """
+        def operation(a, b):
+            return a/b
+        return self._perform_inplace_operation(other, operation)
+
+    __itruediv__ = __idiv__
+
     def __or__(self, other):
         """
         Union a data set with another
@@ -798,10 +904,9 @@ class Data1D(plottable_1D, DataInfo):
                 raise ValueError(msg)
             # Here we could also extrapolate between data points
             TOLERANCE = 0.01
-            for i in range(len(self.x)):
-                if math.fabs((self.x[i] - other.x[i])/self.x[i]) > TOLERANCE:
-                    msg = "Incompatible data sets: x-values do not match"
-                    raise ValueError(msg)
+            if np.any(_mismatch(self.x, other.x, TOLERANCE)):
+                msg = "Incompatible data sets: x-values do not match"
+                raise ValueError(msg)
 
             # Check that the other data set has errors, otherwise
             # create zero vector
@@ -831,34 +936,51 @@ class Data1D(plottable_1D, DataInfo):
         else:
             result.dxl = np.zeros(len(self.x))
 
-        for i in range(len(self.x)):
-            result.x[i] = self.x[i]
-            if self.dx is not None and len(self.x) == len(self.dx):
-                result.dx[i] = self.dx[i]
-            if self.dxw is not None and len(self.x) == len(self.dxw):
-                result.dxw[i] = self.dxw[i]
-            if self.dxl is not None and len(self.x) == len(self.dxl):
-                result.dxl[i] = self.dxl[i]
-
-            a = Uncertainty(self.y[i], dy[i]**2)
-            if isinstance(other, Data1D):
-                b = Uncertainty(other.y[i], dy_other[i]**2)
-                if other.dx is not None:
-                    result.dx[i] *= self.dx[i]
-                    result.dx[i] += (other.dx[i]**2)
-                    result.dx[i] /= 2
-                    result.dx[i] = math.sqrt(result.dx[i])
-                if result.dxl is not None and other.dxl is not None:
-                    result.dxl[i] *= self.dxl[i]
-                    result.dxl[i] += (other.dxl[i]**2)
-                    result.dxl[i] /= 2
-                    result.dxl[i] = math.sqrt(result.dxl[i])
-            else:
-                b = other
-
-            output = operation(a, b)
-            result.y[i] = output.x
-            result.dy[i] = math.sqrt(math.fabs(output.variance))
+        result.x[:] = self.x
+        if self.dx is not None and len(self.x) == len(self.dx):
+            result.dx[:] = self.dx
+        if self.dxw is not None and len(self.x) == len(self.dxw):
+            result.dxw[:] = self.dxw
+        if self.dxl is not None and len(self.x) == len(self.dxl):
+            result.dxl[:] = self.dxl
+        return self._apply_operation(result, other, operation, dy, dy_other)
+
+    def _perform_inplace_operation(self, other, operation):
+        """
+        Perform an operation on the arrays of this data set, leaving
+        its metadata untouched.
+        """
+        dy, dy_other = self._validity_check(other)
+        return self._apply_operation(self, other, operation, dy, dy_other)
+
+    def _apply_operation(self, result, other, operation, dy, dy_other):
+        """
+        Apply an operation to whole arrays, with uncertainty propagation,
+        and store the output in result.
+
+        :param result: data set holding a copy of the x and resolution
+            arrays of this data set, or this data set itself
+        :param other: other data set or number
+        :param operation: function defining the operation
+        :param dy: errors on y, as returned by _validity_check
+        :param dy_other: errors on the y of the other data set
+        :return: result
+        """
+        a = Uncertainty(np.asarray(self.y), np.asarray(dy)**2)
+        if isinstance(other, Data1D):
+            b = Uncertainty(np.asarray(other.y), np.asarray(dy_other)**2)
+        else:
+            b = other
+        output = operation(a, b)
+
+        if isinstance(other, Data1D):
+            if other.dx is not None:
+                result.dx = _average_resolution(result.dx, self.dx, other.dx)
+            if result.dxl is not None and other.dxl is not None:
+                result.dxl = _average_resolution(result.dxl, self.dxl,
+                                                 other.dxl)
+        result.y = _fill(result.y, output.x)
+        result.dy = _fill(result.dy, np.sqrt(np.fabs(output.variance)))
         return result
 
     def _validity_check_union(self, other):
@@ -1020,13 +1142,17 @@ class Data2D(plottable_2D, DataInfo):
                 len(self.qy_data) != len(other.qy_data):
                 msg = "Unable to perform operation: data length are not equal"
                 raise ValueError(msg)
-            for ind in range(len(self.data)):
-                if math.fabs((self.qx_data[ind] - other.qx_data[ind])/self.qx_data[ind]) > TOLERANCE:
+            bad_qx = _mismatch(self.qx_data, other.qx_data, TOLERANCE)
+            bad_qy = _mismatch(self.qy_data, other.qy_data, TOLERANCE)
+            bad = np.flatnonzero(bad_qx | bad_qy)
+            if len(bad) > 0:
+                # Report the first point that does not match
+                ind = bad[0]
+                if bad_qx[ind]:
                     msg = "Incompatible data sets: qx-values do not match: %s %s" % (self.qx_data[ind], other.qx_data[ind])
-                    raise ValueError(msg)
-                if math.fabs((self.qy_data[ind] - other.qy_data[ind])/self.qy_data[ind]) > TOLERANCE:
+                else:
                     msg = "Incompatible data sets: qy-values do not match: %s %s" % (self.qy_data[ind], other.qy_data[ind])
-                    raise ValueError(msg)
+                raise ValueError(msg)
 
             # Check that the scales match
             err_other = other.err_data
@@ -1038,7 +1164,7 @@ class Data2D(plottable_2D, DataInfo):
         err = self.err_data
         if self.err_data is None or \
             (len(self.err_data) != len(self.data)):
-            err = np.zeros(len(other.data))
+            err = np.zeros(len(self.data))
         return err, err_other
 
     def _perform_operation(self, other, operation):
@@ -1057,40 +1183,54 @@ class Data2D(plottable_2D, DataInfo):
         else:
             result.dqx_data = np.zeros(len(self.data))
             result.dqy_data = np.zeros(len(self.data))
-        for i in range(np.size(self.data)):
-            result.data[i] = self.data[i]
-            if self.err_data is not None and \
-                            np.size(self.data) == np.size(self.err_data):
-                result.err_data[i] = self.err_data[i]
-            if self.dqx_data is not None:
-                result.dqx_data[i] = self.dqx_data[i]
-            if self.dqy_data is not None:
-                result.dqy_data[i] = self.dqy_data[i]
-            result.qx_data[i] = self.qx_data[i]
-            result.qy_data[i] = self.qy_data[i]
-            result.q_data[i] = self.q_data[i]
-            result.mask[i] = self.mask[i]
-
-            a = Uncertainty(self.data[i], dy[i]**2)
-            if isinstance(other, Data2D):
-                b = Uncertainty(other.data[i], dy_other[i]**2)
-                if other.dqx_data is not None and \
-                        result.dqx_data is not None:
-                    result.dqx_data[i] *= self.dqx_data[i]
-                    result.dqx_data[i] += (other.dqx_data[i]**2)
-                    result.dqx_data[i] /= 2
-                    result.dqx_data[i] = math.sqrt(result.dqx_data[i])
-                if other.dqy_data is not None and \
-                        result.dqy_data is not None:
-                    result.dqy_data[i] *= self.dqy_data[i]
-                    result.dqy_data[i] += (other.dqy_data[i]**2)
-                    result.dqy_data[i] /= 2
-                    result.dqy_data[i] = math.sqrt(result.dqy_data[i])
-            else:
-                b = other
-            output = operation(a, b)
-            result.data[i] = output.x
-            result.err_data[i] = math.sqrt(math.fabs(output.variance))
+        if result.dqx_data is not None:
+            result.dqx_data[:] = self.dqx_data
+            result.dqy_data[:] = self.dqy_data
+        result.qx_data[:] = self.qx_data
+        result.qy_data[:] = self.qy_data
+        result.q_data[:] = self.q_data
+        result.mask[:] = self.mask
+        return self._apply_operation(result, other, operation, dy, dy_other)
+
+    def _perform_inplace_operation(self, other, operation):
+        """
+        Perform an operation on the arrays of this data set, leaving
+        its q values, mask and metadata untouched.
+        """
+        dy, dy_other = self._validity_check(other)
+        return self._apply_operation(self, other, operation, dy, dy_other)
+
+    def _apply_operation(self, result, other, operation, dy, dy_other):
+        """
+        Apply an operation to whole arrays, with uncertainty propagation,
+        and store the output in result.
+
+        :param result: data set holding a copy of the q and resolution
+            arrays of this data set, or this data set itself
+        :param other: other data set or number
+        :param operation: function defining the operation
+        :param dy: errors on the data, as returned by _validity_check
+        :param dy_other: errors on the data of the other data set
+        :return: result
+        """
+        a = Uncertainty(np.asarray(self.data), np.asarray(dy)**2)
+        if isinstance(other, Data2D):
+            b = Uncertainty(np.asarray(other.data),
+                            np.asarray(dy_other)**2)
+        else:
+            b = other
+        output = operation(a, b)
+
+        if isinstance(other, Data2D):
+            if other.dqx_data is not None and result.dqx_data is not None:
+                result.dqx_data = _average_resolution(
+                    result.dqx_data, self.dqx_data, other.dqx_data)
+            if other.dqy_data is not None and result.dqy_data is not None:
+                result.dqy_data = _average_resolution(
+                    result.dqy_data, self.dqy_data, other.dqy_data)
+        result.data = _fill(result.data, output.x)
+        result.err_data = _fill(result.err_data,
+                                np.sqrt(np.fabs(output.variance)))
         return result
 
     def _validity_check_union(self, other):
@@ -1159,7 +1299,14 @@ def combine_data_info_with_plottable(data, datainfo):
     """
 
     final_dataset = None
-    if isinstance(data, plottable_1D):
+    if isinstance(data, Data1D):
+        # Already a data object, e.g. a lazily read data set
+        final_dataset = data
+        final_dataset.x_unit = data._xunit
+        final_dataset.y_unit = data._yunit
+    elif isinstance(data, Data2D):
+        final_dataset = data
+    elif isinstance(data, plottable_1D):
         final_dataset = Data1D(data.x, data.y, isSesans=datainfo.isSesans)
         final_dataset.dx = data.dx
         final_dataset.dy = data.dy
@@ -22,6 +22,7 @@ PYTHONPATH=../src/ python2  -m sasdataloader.test.utest_averaging DataInfoTests.
 # TODO: copy the meta data from the 2D object to the resulting 1D object
 import math
 import numpy as np
+from scipy import sparse
 import sys
 
 #from data_info import plottable_2D
@@ -196,6 +197,13 @@ def get_dq_data(data2D):
     q = 0. Note This method works on only pinhole geometry.
     Extrapolate dqx(r) and dqy(phi) at q = 0, and take an average.
     '''
+    return _get_dq(data2D)[np.isfinite(data2D.data)]
+
+def _get_dq(data2D):
+    '''
+    Get the dq for resolution averaging of every pixel, finite or not
+    (see get_dq_data)
+    '''
     z_max = max(data2D.q_data)
     z_min = min(data2D.q_data)
     dqx_at_z_max = data2D.dqx_data[np.argmax(data2D.q_data)]
@@ -220,14 +228,50 @@ def get_dq_data(data2D):
     # Final protection of dq
     if dq_overlap < 0:
         dq_overlap = dqy_at_z_min
-    dqx_data = data2D.dqx_data[np.isfinite(data2D.data)]
-    dqy_data = data2D.dqy_data[np.isfinite(
-        data2D.data)] - dq_overlap
+    dqx_data = data2D.dqx_data
+    dqy_data = data2D.dqy_data - dq_overlap
     # def; dqx_data = dq_r dqy_data = dq_phi
     # Convert dq 2D to 1D here
     dq_data = np.sqrt(dqx_data**2 + dqx_data**2)
     return dq_data
 
+def _err_squared(data, err_data):
+    """
+    Squared error of each point; abs(data) is used for the points with
+    no error.
+    """
+    if err_data is None:
+        return np.fabs(data)
+    return np.where(err_data == 0.0, np.fabs(data), err_data * err_data)
+
+def _bin_sums(nbins, pixels, i_bin, data2D, dq_data=None):
+    """
+    Sum q, I, the squared errors and dq over the bins, accumulated in the
+    order of the pixels
+
+    :param pixels: indices of the pixels in the ROI
+    :param i_bin: bin indices of the pixels
+    :param dq_data: dq of every pixel, or None
+    :return: sums of q, I, squared error and dq (None without dq_data),
+        and the pixel counts, per bin
+    """
+    def bin_sum(weights=None):
+        return np.bincount(i_bin, weights=weights,
+                           minlength=nbins).astype(float)
+    data = data2D.data[pixels]
+    err_data = None
+    if data2D.err_data is not None:
+        err_data = data2D.err_data[pixels]
+    err_x = None
+    if dq_data is not None:
+        # To be consistent with dq calculation in 1d reduction,
+        # we need just the averages (not quadratures) because
+        # it should not depend on the number of the q points
+        # in the qr bins.
+        err_x = bin_sum(dq_data[pixels])
+    return (bin_sum(data2D.q_data[pixels]), bin_sum(data),
+            bin_sum(_err_squared(data, err_data)), err_x, bin_sum())
+
 ################################################################################
 
 def reader2D_converter(data2d=None):
@@ -300,6 +344,22 @@ class Binning(object):
         # Bin index calulation
         return int(math.floor(temp_x / temp_y))
 
+    def get_bin_indices(self, values):
+        '''
+        Bin indices of an array of values, as get_bin_index
+        '''
+        values = np.asarray(values, dtype=float)
+        if self.base:
+            if np.any(values <= 0):
+                raise ValueError("math domain error")
+            temp_x = self.n_bins * (np.log(values) / math.log(self.base)
+                                    - math.log(self.min, self.base))
+            temp_y = math.log(self.max, self.base) - math.log(self.min, self.base)
+        else:
+            temp_x = self.n_bins * (values - self.min)
+            temp_y = self.max - self.min
+        return np.floor(temp_x / temp_y).astype(int)
+
 
 ################################################################################
 
@@ -592,94 +652,73 @@ class CircularAverage(object):
         :return: Data1D object
         """
         # Get data W/ finite values
-        data = data2D.data[np.isfinite(data2D.data)]
-        q_data = data2D.q_data[np.isfinite(data2D.data)]
-        err_data = data2D.err_data[np.isfinite(data2D.data)]
-        mask_data = data2D.mask[np.isfinite(data2D.data)]
+        is_finite = np.isfinite(data2D.data)
 
         dq_data = None
         if data2D.dqx_data is not None and data2D.dqy_data is not None:
-            dq_data = get_dq_data(data2D)
+            dq_data = _get_dq(data2D)
 
-        if len(q_data) == 0:
+        if not is_finite.any():
             msg = "Circular averaging: invalid q_data: %g" % data2D.q_data
             raise RuntimeError(msg)
 
-        # Build array of Q intervals
-        nbins = int(math.ceil((self.r_max - self.r_min) / self.bin_width))
-
-        x = np.zeros(nbins)
-        y = np.zeros(nbins)
-        err_y = np.zeros(nbins)
-        err_x = np.zeros(nbins)
-        y_counts = np.zeros(nbins)
-
-        for npt in range(len(data)):
-
-            if ismask and not mask_data[npt]:
-                continue
-
-            frac = 0
+        # Pixels to average
+        is_used = is_finite
+        if ismask:
+            is_used = is_used & data2D.mask.astype(bool)
+        nbins, pixels, i_q = self._bin_pixels(data2D, is_used)
+        return self._average(*_bin_sums(nbins, pixels, i_q, data2D, dq_data))
 
-            # q-value at the pixel (j,i)
-            q_value = q_data[npt]
-            data_n = data[npt]
-
-            # No need to calculate the frac when all data are within range
-            if self.r_min >= self.r_max:
-                raise ValueError("Limit Error: min > max")
+    def _bin_pixels(self, data2D, is_used, run=None):
+        """
+        Find the bin of the pixels in the ROI
 
-            if self.r_min <= q_value and q_value <= self.r_max:
-                frac = 1
-            if frac == 0:
-                continue
-            i_q = int(math.floor((q_value - self.r_min) / self.bin_width))
+        :param is_used: boolean array of the pixels to consider
+        :return: number of bins, indices of the pixels in the ROI
+            and their bin indices
+        """
+        q_data = data2D.q_data
 
-            # Take care of the edge case at phi = 2pi.
-            if i_q == nbins:
-                i_q = nbins - 1
-            y[i_q] += frac * data_n
-            # Take dqs from data to get the q_average
-            x[i_q] += frac * q_value
-            if err_data is None or err_data[npt] == 0.0:
-                if data_n < 0:
-                    data_n = -data_n
-                err_y[i_q] += frac * frac * data_n
-            else:
-                err_y[i_q] += frac * frac * err_data[npt] * err_data[npt]
-            if dq_data is not None:
-                # To be consistent with dq calculation in 1d reduction,
-                # we need just the averages (not quadratures) because
-                # it should not depend on the number of the q points
-                # in the qr bins.
-                err_x[i_q] += frac * dq_data[npt]
-            else:
-                err_x = None
-            y_counts[i_q] += frac
+        # Build array of Q intervals
+        nbins = int(math.ceil((self.r_max - self.r_min) / self.bin_width))
+        if nbins < 0:
+            raise ValueError("negative dimensions are not allowed")
+
+        # No need to calculate the frac when all data are within range
+        if is_used.any() and self.r_min >= self.r_max:
+            raise ValueError("Limit Error: min > max")
+        pixels = np.flatnonzero(is_used & (self.r_min <= q_data)
+                                & (q_data <= self.r_max))
+        i_q = np.floor((q_data[pixels] - self.r_min)
+                       / self.bin_width).astype(int)
+
+        # Take care of the edge case at phi = 2pi.
+        i_q[i_q == nbins] = nbins - 1
+        return nbins, pixels, i_q
+
+    def _average(self, x, y, err_y, err_x, y_counts, run=None):
+        """
+        Average the sums over the bins (see _bin_sums)
 
+        :return: Data1D object
+        """
         # Average the sums
-        for n in range(nbins):
-            if err_y[n] < 0:
-                err_y[n] = -err_y[n]
-            err_y[n] = math.sqrt(err_y[n])
-            # if err_x is not None:
-            #    err_x[n] = math.sqrt(err_x[n])
-
+        err_y = np.sqrt(np.fabs(err_y))
         err_y = err_y / y_counts
         err_y[err_y == 0] = np.average(err_y)
         y = y / y_counts
         x = x / y_counts
         idx = (np.isfinite(y)) & (np.isfinite(x))
 
+        if not idx.any():
+            msg = "Average Error: No points inside ROI to average..."
+            raise ValueError(msg)
+
         if err_x is not None:
             d_x = err_x[idx] / y_counts[idx]
         else:
             d_x = None
 
-        if not idx.any():
-            msg = "Average Error: No points inside ROI to average..."
-            raise ValueError(msg)
-
         return Data1D(x=x[idx], y=y[idx], dy=err_y[idx], dx=d_x)
 
 ################################################################################
@@ -722,59 +761,49 @@ class Ring(object):
         if data2D.__class__.__name__ not in ["Data2D", "plottable_2D"]:
             raise RuntimeError("Ring averaging only take plottable_2D objects")
 
-        Pi = math.pi
-
         # Get data
-        data = data2D.data[np.isfinite(data2D.data)]
-        q_data = data2D.q_data[np.isfinite(data2D.data)]
-        err_data = data2D.err_data[np.isfinite(data2D.data)]
-        qx_data = data2D.qx_data[np.isfinite(data2D.data)]
-        qy_data = data2D.qy_data[np.isfinite(data2D.data)]
+        is_finite = np.isfinite(data2D.data)
+        nbins, pixels, i_phi = self._bin_pixels(data2D, is_finite)
+        return self._average(*_bin_sums(nbins, pixels, i_phi, data2D))
+
+    def _bin_pixels(self, data2D, is_used, run=None):
+        """
+        Find the bin of the pixels in the ROI
 
-        # Set space for 1d outputs
-        phi_bins = np.zeros(self.nbins_phi)
-        phi_counts = np.zeros(self.nbins_phi)
-        phi_values = np.zeros(self.nbins_phi)
-        phi_err = np.zeros(self.nbins_phi)
+        :param is_used: boolean array of the pixels to consider
+        :return: number of bins, indices of the pixels in the ROI
+            and their bin indices
+        """
+        Pi = math.pi
+        q_data = data2D.q_data
 
         # Shift to apply to calculated phi values in order
         # to center first bin at zero
         phi_shift = Pi / self.nbins_phi
 
-        for npt in range(len(data)):
-            frac = 0
-            # q-value at the point (npt)
-            q_value = q_data[npt]
-            data_n = data[npt]
+        pixels = np.flatnonzero(is_used & (self.r_min <= q_data)
+                                & (q_data <= self.r_max))
+        # phi-value at the points
+        phi_value = np.arctan2(data2D.qy_data[pixels],
+                               data2D.qx_data[pixels]) + Pi
+        # binning
+        i_phi = np.floor((self.nbins_phi) *
+                         (phi_value + phi_shift) / (2 * Pi)).astype(int)
 
-            # phi-value at the point (npt)
-            phi_value = math.atan2(qy_data[npt], qx_data[npt]) + Pi
+        # Take care of the edge case at phi = 2pi.
+        i_phi[i_phi >= self.nbins_phi] = 0
+        return self.nbins_phi, pixels, i_phi
 
-            if self.r_min <= q_value and q_value <= self.r_max:
-                frac = 1
-            if frac == 0:
-                continue
-            # binning
-            i_phi = int(math.floor((self.nbins_phi) *
-                                   (phi_value + phi_shift) / (2 * Pi)))
-
-            # Take care of the edge case at phi = 2pi.
-            if i_phi >= self.nbins_phi:
-                i_phi = 0
-            phi_bins[i_phi] += frac * data[npt]
-
-            if err_data is None or err_data[npt] == 0.0:
-                if data_n < 0:
-                    data_n = -data_n
-                phi_err[i_phi] += frac * frac * math.fabs(data_n)
-            else:
-                phi_err[i_phi] += frac * frac * err_data[npt] * err_data[npt]
-            phi_counts[i_phi] += frac
+    def _average(self, x, y, err_y, err_x, y_counts, run=None):
+        """
+        Average the sums over the bins (see _bin_sums)
 
-        for i in range(self.nbins_phi):
-            phi_bins[i] = phi_bins[i] / phi_counts[i]
-            phi_err[i] = math.sqrt(phi_err[i]) / phi_counts[i]
-            phi_values[i] = 2.0 * math.pi / self.nbins_phi * (1.0 * i)
+        :return: Data1D object
+        """
+        phi_bins = y / y_counts
+        phi_err = np.sqrt(err_y) / y_counts
+        phi_values = (2.0 * math.pi / self.nbins_phi *
+                      (1.0 * np.arange(self.nbins_phi)))
 
         idx = (np.isfinite(phi_bins))
 
@@ -799,6 +828,8 @@ class _Sector(object):
     Phi is defined between 0 and 2*pi in anti-clockwise
     starting from the x- axis on the left-hand side
     """
+    ## Varying parameter of the average ('phi' , 'q' , or 'q2')
+    _run = 'phi'
 
     def __init__(self, r_min, r_max, phi_min=0, phi_max=2 * math.pi, nbins=20,
                  base=None):
@@ -826,22 +857,26 @@ class _Sector(object):
             raise RuntimeError("Ring averaging only take plottable_2D objects")
 
         # Get the all data & info
-        data = data2D.data[np.isfinite(data2D.data)]
-        q_data = data2D.q_data[np.isfinite(data2D.data)]
-        err_data = data2D.err_data[np.isfinite(data2D.data)]
-        qx_data = data2D.qx_data[np.isfinite(data2D.data)]
-        qy_data = data2D.qy_data[np.isfinite(data2D.data)]
+        is_finite = np.isfinite(data2D.data)
 
         dq_data = None
         if data2D.dqx_data is not None and data2D.dqy_data is not None:
-            dq_data = get_dq_data(data2D)
+            dq_data = _get_dq(data2D)
 
-        # set space for 1d outputs
-        x = np.zeros(self.nbins)
-        y = np.zeros(self.nbins)
-        y_err = np.zeros(self.nbins)
-        x_err = np.zeros(self.nbins)
-        y_counts = np.zeros(self.nbins)  # Cycle counts (for the mean)
+        nbins, pixels, i_bin = self._bin_pixels(data2D, is_finite, run)
+        sums = _bin_sums(nbins, pixels, i_bin, data2D, dq_data)
+        return self._average(*sums, run=run)
+
+    def _bin_pixels(self, data2D, is_used, run='phi'):
+        """
+        Find the bin of the pixels in the ROI
+
+        :param is_used: boolean array of the pixels to consider
+        :param run:  define the varying parameter ('phi' , 'q' , or 'q2')
+        :return: number of bins, indices of the pixels in the ROI
+            and their bin indices
+        """
+        q_data = data2D.q_data
 
         # Get the min and max into the region: 0 <= phi < 2Pi
         phi_min = flip_phi(self.phi_min)
@@ -853,106 +888,84 @@ class _Sector(object):
         else:
             binning = Binning(self.r_min, self.r_max, self.nbins, self.base)
 
-        for n in range(len(data)):
-
-            # q-value at the pixel (j,i)
-            q_value = q_data[n]
-            data_n = data[n]
-
-            # Is pixel within range?
-            is_in = False
-
-            # phi-value of the pixel (j,i)
-            phi_value = math.atan2(qy_data[n], qx_data[n]) + math.pi
-
-            # No need to calculate: data outside of the radius
-            if self.r_min > q_value or q_value > self.r_max:
-                continue
-
-            # In case of two ROIs (symmetric major and minor regions)(for 'q2')
-            if run.lower() == 'q2':
-                # For minor sector wing
-                # Calculate the minor wing phis
-                phi_min_minor = flip_phi(phi_min - math.pi)
-                phi_max_minor = flip_phi(phi_max - math.pi)
-                # Check if phis of the minor ring is within 0 to 2pi
-                if phi_min_minor > phi_max_minor:
-                    is_in = (phi_value > phi_min_minor or
-                             phi_value < phi_max_minor)
-                else:
-                    is_in = (phi_value > phi_min_minor and
-                             phi_value < phi_max_minor)
-
-            # For all cases(i.e.,for 'q', 'q2', and 'phi')
-            # Find pixels within ROI
-            if phi_min > phi_max:
-                is_in = is_in or (phi_value > phi_min or
-                                  phi_value < phi_max)
+        # phi-value of the pixels
+        phi_value = np.arctan2(data2D.qy_data, data2D.qx_data) + math.pi
+
+        # In case of two ROIs (symmetric major and minor regions)(for 'q2')
+        is_in = np.zeros(len(q_data), dtype=bool)
+        if run.lower() == 'q2':
+            # For minor sector wing
+            # Calculate the minor wing phis
+            phi_min_minor = flip_phi(phi_min - math.pi)
+            phi_max_minor = flip_phi(phi_max - math.pi)
+            # Check if phis of the minor ring is within 0 to 2pi
+            if phi_min_minor > phi_max_minor:
+                is_in = ((phi_value > phi_min_minor) |
+                         (phi_value < phi_max_minor))
             else:
-                is_in = is_in or (phi_value >= phi_min and
-                                  phi_value < phi_max)
+                is_in = ((phi_value > phi_min_minor) &
+                         (phi_value < phi_max_minor))
 
-            # data oustide of the phi range
-            if not is_in:
-                continue
+        # For all cases(i.e.,for 'q', 'q2', and 'phi')
+        # Find pixels within ROI
+        if phi_min > phi_max:
+            is_in |= (phi_value > phi_min) | (phi_value < phi_max)
+        else:
+            is_in |= (phi_value >= phi_min) & (phi_value < phi_max)
 
-            # Get the binning index
-            if run.lower() == 'phi':
-                i_bin = binning.get_bin_index(phi_value)
-            else:
-                i_bin = binning.get_bin_index(q_value)
-
-            # Take care of the edge case at phi = 2pi.
-            if i_bin == self.nbins:
-                i_bin = self.nbins - 1
-
-            # Get the total y
-            y[i_bin] += data_n
-            x[i_bin] += q_value
-            if err_data[n] is None or err_data[n] == 0.0:
-                if data_n < 0:
-                    data_n = -data_n
-                y_err[i_bin] += data_n
-            else:
-                y_err[i_bin] += err_data[n]**2
-
-            if dq_data is not None:
-                # To be consistent with dq calculation in 1d reduction,
-                # we need just the averages (not quadratures) because
-                # it should not depend on the number of the q points
-                # in the qr bins.
-                x_err[i_bin] += dq_data[n]
-            else:
-                x_err = None
-            y_counts[i_bin] += 1
+        # No need to calculate: data outside of the radius
+        is_in &= is_used & (self.r_min <= q_data) & (q_data <= self.r_max)
+        pixels = np.flatnonzero(is_in)
 
+        # Get the binning index
+        if run.lower() == 'phi':
+            i_bin = binning.get_bin_indices(phi_value[pixels])
+        else:
+            i_bin = binning.get_bin_indices(q_data[pixels])
+
+        # Take care of the edge case at phi = 2pi.
+        i_bin[i_bin == self.nbins] = self.nbins - 1
+        # Bins outside the range count from the end, as negative indices
+        is_out = (i_bin >= self.nbins) | (i_bin < -self.nbins)
+        if is_out.any():
+            msg = "index %d is out of bounds for axis 0 with size %d"
+            raise IndexError(msg % (i_bin[is_out][0], self.nbins))
+        i_bin[i_bin < 0] += self.nbins
+        return self.nbins, pixels, i_bin
+
+    def _average(self, x, y, y_err, x_err, y_counts, run='phi'):
+        """
+        Average the sums over the bins (see _bin_sums)
+
+        :param run:  define the varying parameter ('phi' , 'q' , or 'q2')
+        :return: Data1D object
+        """
         # Organize the results
-        for i in range(self.nbins):
-            y[i] = y[i] / y_counts[i]
-            y_err[i] = math.sqrt(y_err[i]) / y_counts[i]
-
-            # The type of averaging: phi,q2, or q
-            # Calculate x[i]should be at the center of the bin
-            if run.lower() == 'phi':
-                x[i] = (self.phi_max - self.phi_min) / self.nbins * \
-                    (1.0 * i + 0.5) + self.phi_min
-            else:
-                # We take the center of ring area, not radius.
-                # This is more accurate than taking the radial center of ring.
-                # delta_r = (self.r_max - self.r_min) / self.nbins
-                # r_inner = self.r_min + delta_r * i
-                # r_outer = r_inner + delta_r
-                # x[i] = math.sqrt((r_inner * r_inner + r_outer * r_outer) / 2)
-                x[i] = x[i] / y_counts[i]
+        y = y / y_counts
+        y_err = np.sqrt(y_err) / y_counts
+
+        # The type of averaging: phi,q2, or q
+        # Calculate x[i]should be at the center of the bin
+        if run.lower() == 'phi':
+            x = (self.phi_max - self.phi_min) / self.nbins * \
+                (1.0 * np.arange(self.nbins) + 0.5) + self.phi_min
+        else:
+            # We take the center of ring area, not radius.
+            # This is more accurate than taking the radial center of ring.
+            # delta_r = (self.r_max - self.r_min) / self.nbins
+            # r_inner = self.r_min + delta_r * i
+            # r_outer = r_inner + delta_r
+            # x[i] = math.sqrt((r_inner * r_inner + r_outer * r_outer) / 2)
+            x = x / y_counts
         y_err[y_err == 0] = np.average(y_err)
         idx = (np.isfinite(y) & np.isfinite(y_err))
+        if not idx.any():
+            msg = "Average Error: No points inside sector of ROI to average..."
+            raise ValueError(msg)
         if x_err is not None:
             d_x = x_err[idx] / y_counts[idx]
         else:
             d_x = None
-        if not idx.any():
-            msg = "Average Error: No points inside sector of ROI to average..."
-            raise ValueError(msg)
         # elif len(y[idx])!= self.nbins:
         #    print "resulted",self.nbins- len(y[idx]),
         # "empty bin(s) due to tight binning..."
@@ -967,6 +980,7 @@ class SectorPhi(_Sector):
     A sector is defined by r_min, r_max, phi_min, phi_max.
     The number of bin in phi also has to be defined.
     """
+    _run = 'phi'
 
     def __call__(self, data2D):
         """
@@ -987,6 +1001,7 @@ class SectorQ(_Sector):
     r_min, r_max, phi_min, phi_max >0.
     The number of bin in Q also has to be defined.
     """
+    _run = 'q2'
 
     def __call__(self, data2D):
         """
@@ -1000,6 +1015,88 @@ class SectorQ(_Sector):
 
 ################################################################################
 
+class BinningPlan(object):
+    """
+    Precomputed binning of a CircularAverage, Ring, SectorQ or SectorPhi
+    on a fixed detector geometry.
+
+    The plan is built once from the qx/qy grid (and mask) of a Data2D and
+    stores the pixel to bin map as a sparse matrix. Averaging a frame, or a
+    stack of frames, on the same grid is then a sparse matrix product,
+    giving the same results as calling the averager on each frame.
+    Non-finite intensities are left out frame by frame, as the averagers do.
+    """
+
+    def __init__(self, averager, data2D, ismask=False):
+        """
+        :param averager: CircularAverage, Ring, SectorQ or SectorPhi object
+        :param data2D: Data2D object giving the detector geometry
+        :param ismask: leave out the pixels masked in data2D
+        """
+        if not hasattr(averager, '_bin_pixels'):
+            msg = "No binning plan for %s" % averager.__class__.__name__
+            raise ValueError(msg)
+        self.averager = averager
+        self.run = getattr(averager, '_run', None)
+        self.n_pixels = len(data2D.q_data)
+        is_used = np.ones(self.n_pixels, dtype=bool)
+        if ismask:
+            is_used &= data2D.mask.astype(bool)
+        nbins, pixels, i_bin = averager._bin_pixels(data2D, is_used, self.run)
+        self.nbins = nbins
+        self.matrix = sparse.csr_matrix(
+            (np.ones(len(pixels)), (i_bin, pixels)),
+            shape=(nbins, self.n_pixels))
+        self.q_data = data2D.q_data
+        self.dq_data = None
+        if data2D.dqx_data is not None and data2D.dqy_data is not None:
+            self.dq_data = _get_dq(data2D)
+
+    def __call__(self, data2D):
+        """
+        Average a data set on the geometry of the plan
+
+        :param data2D: Data2D object
+        :return: Data1D object
+        """
+        return self.apply(data2D.data, data2D.err_data)
+
+    def apply(self, data, err_data=None):
+        """
+        Average one frame or a stack of frames
+
+        :param data: intensities of a frame, or array of frames with one
+            frame per row, each ordered as Data2D.data
+        :param err_data: errors, shaped as data; abs(data) is used for the
+            squared error where None or 0
+        :return: Data1D object, or list of Data1D objects for a stack
+        """
+        data = np.asarray(data)
+        is_stack = data.ndim > 1
+        frames = data.reshape(-1, self.n_pixels).T
+        if err_data is not None:
+            err_data = np.asarray(err_data).reshape(-1, self.n_pixels).T
+        is_finite = np.isfinite(frames)
+
+        def bin_sum(weights):
+            return self.matrix.dot(np.where(is_finite, weights, 0.0))
+
+        x = bin_sum(self.q_data[:, None])
+        y = bin_sum(frames)
+        err_y = bin_sum(_err_squared(frames, err_data))
+        err_x = None
+        if self.dq_data is not None:
+            err_x = bin_sum(self.dq_data[:, None])
+        y_counts = bin_sum(1.0)
+        output = []
+        for n in range(frames.shape[1]):
+            sums = [x[:, n], y[:, n], err_y[:, n],
+                    None if err_x is None else err_x[:, n], y_counts[:, n]]
+            output.append(self.averager._average(*sums, run=self.run))
+        return output if is_stack else output[0]
+
+################################################################################
+
 class Ringcut(object):
     """
     Defines a ring on a 2D data set.
@@ -13,6 +13,8 @@
 #############################################################################
 
 import logging
+from itertools import chain
+import numpy as np
 from sas.sascalc.dataloader.file_reader_base_class import FileReader
 from sas.sascalc.dataloader.data_info import DataInfo, plottable_1D
 from sas.sascalc.dataloader.loader_exceptions import FileContentsException,\
@@ -20,6 +22,69 @@ from sas.sascalc.dataloader.loader_exceptions import FileContentsException,\
 
 logger = logging.getLogger(__name__)
 
+# Number of lines of data converted at once, growing up to _MAX_CHUNK
+_MIN_CHUNK = 64
+_MAX_CHUNK = 16384
+# ASCII characters which str.split() treats as white space
+_WHITESPACE = np.zeros(256, dtype=bool)
+_WHITESPACE[[9, 10, 11, 12, 13, 28, 29, 30, 31, 32]] = True
+
+
+def _split_lines(lines, sep=None):
+    """
+    Split each line as line.split(sep) does
+
+    :param lines: list of lines
+    :param sep: separator, None for white space
+    :return: number of tokens of each line, flat list of all the tokens
+    """
+    text = "\n".join(lines)
+    try:
+        chars = np.frombuffer(text.encode('ascii'), dtype=np.uint8)
+    except UnicodeError:
+        toks = [line.split(sep) for line in lines]
+        counts = np.fromiter(map(len, toks), int, len(toks))
+        return counts, list(chain.from_iterable(toks))
+    # Count the token starts, or the separators, between the line ends
+    line_ends = np.concatenate(([0], np.flatnonzero(chars == ord("\n")),
+                                [len(chars)]))
+    if sep is None:
+        is_space = _WHITESPACE[chars]
+        is_start = ~is_space
+        is_start[1:] &= is_space[:-1]
+        marks = np.flatnonzero(is_start)
+        counts = np.diff(np.searchsorted(marks, line_ends))
+        return counts, text.split()
+    marks = np.flatnonzero(chars == ord(sep))
+    counts = np.diff(np.searchsorted(marks, line_ends)) + 1
+    return counts, text.replace("\n", sep).split(sep)
+
+
+def _to_float(tokens, ncols):
+    """
+    Convert the rows of tokens to floats, up to the first row holding a
+    token that float() does not accept
+
+    :param tokens: flat list of the tokens of the rows
+    :param ncols: number of tokens per row
+    :return: array of shape (n, ncols) of the first n valid rows
+    """
+    try:
+        return np.array(tokens, dtype=float).reshape(-1, ncols)
+    except ValueError:
+        pass
+    # Bisect for the first invalid row
+    good, low, high = [], 0, len(tokens) // ncols
+    while high - low > 1:
+        middle = (low + high) // 2
+        try:
+            good.append(np.array(tokens[low * ncols:middle * ncols],
+                                 dtype=float))
+            low = middle
+        except ValueError:
+            high = middle
+    return np.concatenate(good + [np.zeros(0)]).reshape(-1, ncols)
+
 
 class Reader(FileReader):
     """
@@ -68,7 +133,31 @@ class Reader(FileReader):
         line_no = 0
         # minimum required number of columns of data
         lentoks = 2
-        for line in lines:
+        line_index = 0
+        while line_index < len(lines):
+            if is_data:
+                # Convert the following lines of data in one go
+                nlines, values = self._read_data_block(lines, line_index,
+                                                       lentoks)
+                if nlines > 0:
+                    block = slice(candidate_lines,
+                                  candidate_lines + len(values))
+                    self.current_dataset.x[block] = values[:, 0]
+                    if lentoks > 1:
+                        self.current_dataset.y[block] = values[:, 1]
+                    if lentoks > 2:
+                        self.current_dataset.dy[block] = values[:, 2]
+                        has_error_dy = True
+                    if lentoks > 3:
+                        self.current_dataset.dx[block] = values[:, 3]
+                        has_error_dx = True
+                    candidate_lines += len(values)
+                    line_no += len(values)
+                    line_index += nlines
+                    continue
+
+            line = lines[line_index]
+            line_index += 1
             toks = self.splitline(line.strip())
             # To remember the number of columns in the current line of data
             new_lentoks = len(toks)
@@ -162,3 +251,46 @@ class Reader(FileReader):
         # Store loading process information
         self.current_datainfo.meta_data['loader'] = self.type_name
         self.send_to_output()
+
+    @staticmethod
+    def _read_data_block(lines, start, ncols):
+        """
+        Read the lines of data from lines[start] which split into ncols
+        numbers, as the line by line parser would, in chunks. The first line
+        which does not is left to the line by line parser.
+
+        :param lines: lines of the file
+        :param start: index of the first line to read
+        :param ncols: number of columns of the data
+        :return: number of lines read, array of shape (rows, ncols)
+        """
+        # Lines with a different separator will fail to split into numbers
+        first = lines[start]
+        sep = ',' if ',' in first else ';' if ';' in first else None
+        # Only the first 4 columns are read
+        nvalues = min(ncols, 4)
+        blocks = []
+        index = start
+        chunk = _MIN_CHUNK
+        while index < len(lines):
+            counts, tokens = _split_lines(lines[index:index + chunk], sep)
+            is_valid = counts == ncols
+            # Blank lines are skipped
+            is_skipped = counts == 0
+            is_stop = ~(is_valid | is_skipped)
+            nlines = np.argmax(is_stop) if is_stop.any() else len(counts)
+            tokens = tokens[:np.sum(counts[:nlines])]
+            if ncols > nvalues:
+                tokens = np.array(tokens, dtype=object).reshape(-1, ncols)
+                tokens = tokens[:, :nvalues].ravel().tolist()
+            values = _to_float(tokens, nvalues)
+            valid_lines = np.flatnonzero(is_valid[:nlines])
+            if len(values) < len(valid_lines):
+                # Stop on the line which does not hold numbers
+                nlines = valid_lines[len(values)]
+            blocks.append(values)
+            index += nlines
+            if nlines < len(counts):
+                break
+            chunk = min(4 * chunk, _MAX_CHUNK)
+        return index - start, np.concatenate(blocks)
@@ -15,9 +15,213 @@ from ..data_info import combine_data_info_with_plottable
 from ..loader_exceptions import FileContentsException, DefaultReaderException
 from ..file_reader_base_class import FileReader, decode
 
+# SASdata datasets read lazily, when first accessed through the data object
+LAZY_KEYS = (u'I', u'Idev', u'Q', u'Qdev', u'dQw', u'dQl', u'Qx', u'Qy',
+             u'Qxdev', u'Qydev', u'Mask')
+
 def h5attr(node, key, default=None):
     return decode(node.attrs.get(key, default))
 
+
+class _PendingValue(object):
+    """
+    Pending value of a field of a lazily read data set, called with the data
+    set to compute the value when the field is first accessed
+    """
+
+    def __call__(self, data):
+        raise NotImplementedError
+
+
+class _DatasetReader(_PendingValue):
+    """
+    Reads the flattened values of an HDF5 dataset, or a part of them
+    """
+
+    def __init__(self, dataset, index=Ellipsis):
+        """
+        :param dataset: h5py Dataset
+        :param index: Selection of the values to read (default all)
+        """
+        self.dataset = dataset
+        self.index = index
+
+    @property
+    def shape(self):
+        return self.dataset.shape
+
+    @property
+    def size(self):
+        return self.dataset.size
+
+    def flatten(self):
+        """
+        The values are always flattened when they are read
+        """
+        return self
+
+    def __call__(self, data):
+        return np.asarray(self.dataset[self.index]).flatten()
+
+
+class _MaskReader(_PendingValue):
+    """
+    Reads the mask of a lazily read 2D data set (see _copy_mask)
+    """
+
+    def __init__(self, size, reader=None):
+        """
+        :param size: Number of points of the data set
+        :param reader: _DatasetReader of the mask, or None if the file has no
+            mask
+        """
+        self.size = size
+        self.reader = reader
+
+    def __call__(self, data):
+        mask = self.reader(data) if self.reader is not None else None
+        return _copy_mask(self.size, mask)
+
+
+def _copy_mask(size, mask):
+    """
+    Boolean mask of a data set, in which the points beyond the mask read from
+    the file are kept
+
+    :param size: Number of points of the data set
+    :param mask: Mask read from the file, or None or a 0-d array if there is
+        none
+    :return: Array of size booleans
+    """
+    zeros = np.ones(size, dtype=bool)
+    if mask is not None and np.ndim(mask) > 0:
+        zeros[:np.size(mask)] = np.ravel(mask)
+    return zeros
+
+
+class _QModulus(_PendingValue):
+    """
+    Computes the modulus of Q of a lazily read 2D data set
+    """
+
+    def __call__(self, data):
+        return np.sqrt(data.qx_data * data.qx_data
+                       + data.qy_data * data.qy_data)
+
+
+def _bins_reader(reader, n_cols, along_x):
+    """
+    Read the x or y bins of a 2D data set from its Qx or Qy dataset, which
+    is either the 2D grid or its flattened values
+
+    :param reader: _DatasetReader of the Qx (along_x) or Qy dataset
+    :param n_cols: Number of columns of the grid
+    :param along_x: Whether to read the x bins (first row of Qx) or the y
+        bins (first column of Qy)
+    :return: A _DatasetReader of the bins
+    """
+    if reader.dataset.ndim == 2:
+        index = (0, slice(None)) if along_x else (slice(None), 0)
+    else:
+        index = slice(0, n_cols) if along_x else slice(0, None, n_cols)
+    return _DatasetReader(reader.dataset, index)
+
+
+def _selection(selection):
+    """
+    Normalize a selection of groups to a list of names and indices, or None
+    for all the groups
+    """
+    if selection is None or isinstance(selection, list):
+        return selection
+    if isinstance(selection, (tuple, set, frozenset)):
+        return list(selection)
+    return [selection]
+
+
+def _is_selected(name, index, selection):
+    """
+    Whether the group of the given name and index is in the selection
+    """
+    return selection is None or name in selection or index in selection
+
+
+class _LazyField(object):
+    """
+    Field of a lazy data set, which holds the function reading its value until
+    it is first accessed
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, data, owner=None):
+        if data is None:
+            return self
+        value = data.__dict__.get(self.name)
+        if isinstance(value, _PendingValue):
+            value = value(data)
+            data.__dict__[self.name] = value
+        return value
+
+    def __set__(self, data, value):
+        data.__dict__[self.name] = value
+
+
+def _lazy_fields(cls):
+    """
+    Class decorator turning the fields listed in cls.lazy_fields into
+    _LazyField
+    """
+    for name in cls.lazy_fields:
+        setattr(cls, name, _LazyField(name))
+    return cls
+
+
+class _LazyData(object):
+    """
+    Methods shared by LazyData1D and LazyData2D
+    """
+    lazy_fields = ()
+
+    def is_loaded(self, name):
+        """
+        Whether a field has been read from the file
+
+        :param name: Name of the field, e.g. 'data' or 'x'
+        """
+        return not isinstance(self.__dict__.get(name), _PendingValue)
+
+    def load(self):
+        """
+        Read all the fields that have not been accessed yet. The HDF5 file is
+        closed once no data set needs it anymore.
+        """
+        for name in self.lazy_fields:
+            getattr(self, name)
+
+
+@_lazy_fields
+class LazyData1D(_LazyData, Data1D):
+    """
+    Data1D read by Reader.read(..., lazy=True), whose arrays are read from
+    the HDF5 file when they are first accessed. Call load() before copying or
+    pickling the object.
+    """
+    lazy_fields = ('x', 'y', 'dx', 'dy', 'dxl', 'dxw')
+
+
+@_lazy_fields
+class LazyData2D(_LazyData, Data2D):
+    """
+    Data2D read by Reader.read(..., lazy=True), whose arrays are read from
+    the HDF5 file when they are first accessed. Call load() before copying or
+    pickling the object.
+    """
+    lazy_fields = ('data', 'err_data', 'qx_data', 'qy_data', 'q_data', 'mask',
+                   'dqx_data', 'dqy_data', 'x_bins', 'y_bins')
+
+
 class Reader(FileReader):
     """
     A class for reading in CanSAS v2.0 data files. The existing iteration opens
@@ -55,6 +259,38 @@ class Reader(FileReader):
     ext = ['.h5', '.H5']
     # Flag to bypass extension check
     allow_all = True
+    # Read the data arrays only when they are first accessed
+    lazy = False
+    # Names and/or indices of the SASentry groups to read, None for all
+    entries = None
+    # Names and/or indices of the SASdata groups to read in each SASentry
+    sasdata = None
+
+    def read(self, filepath, lazy=False, entries=None, sasdata=None):
+        """
+        Read the data sets of an HDF5 file.
+
+        Lazily read data sets are LazyData1D and LazyData2D objects, which
+        read their arrays from the file when they are first accessed. Their
+        points are then neither sorted nor cleared of NaN values.
+
+        :param filepath: The full or relative path to a file to be loaded
+        :param lazy: Whether to read the data arrays only when accessed
+        :param entries: Name or index, or list of names and indices, of the
+            SASentry groups to read (default all)
+        :param sasdata: Name or index, or list of names and indices, of the
+            SASdata groups to read in each selected SASentry (default all)
+        :return: List of Data1D/2D objects
+        """
+        self.lazy = lazy
+        self.entries = _selection(entries)
+        self.sasdata = _selection(sasdata)
+        try:
+            return super(Reader, self).read(filepath)
+        finally:
+            self.lazy = False
+            self.entries = None
+            self.sasdata = None
 
     def get_file_contents(self):
         """
@@ -83,16 +319,20 @@ class Reader(FileReader):
                         msg = "CanSAS2.0 HDF5 Reader could not load file {}".format(basename + extension)
                         raise DefaultReaderException(msg)
                     raise FileContentsException(e.message)
+                close = not self.lazy
                 try:
                     # Read in all child elements of top level SASroot
                     self.read_children(self.raw_data, [])
                     # Add the last data set to the list of outputs
                     self.add_data_set()
                 except Exception as exc:
+                    close = True
                     raise FileContentsException(exc.message)
                 finally:
-                    # Close the data file
-                    self.raw_data.close()
+                    # Close the data file, unless lazily read data sets need
+                    # it: it is then closed once they have been read
+                    if close:
+                        self.raw_data.close()
 
                 for dataset in self.output:
                     if isinstance(dataset, Data1D):
@@ -111,6 +351,8 @@ class Reader(FileReader):
         self.errors = set()
         self.logging = []
         self.parent_class = u''
+        self.n_entries = 0
+        self.n_sasdata = 0
         self.detector = Detector()
         self.collimation = Collimation()
         self.aperture = Aperture()
@@ -138,6 +380,18 @@ class Reader(FileReader):
                 class_prog = re.compile(value.name)
 
             if isinstance(value, h5py.Group):
+                # Skip the SASentry and SASdata groups not selected
+                if class_prog.match(u'SASentry'):
+                    self.n_entries += 1
+                    if not _is_selected(key, self.n_entries - 1,
+                                        self.entries):
+                        continue
+                    self.n_sasdata = 0
+                elif class_prog.match(u'SASdata'):
+                    self.n_sasdata += 1
+                    if not _is_selected(key, self.n_sasdata - 1,
+                                        self.sasdata):
+                        continue
                 # Set parent class before recursion
                 self.parent_class = class_name
                 parent_list.append(key)
@@ -156,7 +410,14 @@ class Reader(FileReader):
 
             elif isinstance(value, h5py.Dataset):
                 # If this is a dataset, store the data appropriately
-                data_set = data[key][:]
+                if (isinstance(self.current_dataset, _LazyData)
+                        and self.parent_class == u'SASdata'
+                        and key in LAZY_KEYS
+                        and not (key == u'Q' and isinstance(
+                            self.current_dataset, plottable_2D))):
+                    data_set = _DatasetReader(value)
+                else:
+                    data_set = data[key][:]
                 unit = self._get_unit(value)
 
                 # I and Q Data
@@ -470,13 +731,16 @@ class Reader(FileReader):
         # Combine all plottables with datainfo and append each to output
         # Type cast data arrays to float64 and find min/max as appropriate
         for dataset in self.data2d:
-            zeros = np.ones(dataset.data.size, dtype=bool)
+            if isinstance(dataset, _LazyData):
+                self._lazy_2d_cleanup(dataset)
+                self.current_dataset = dataset
+                self.send_to_output()
+                continue
             try:
-                for i in range(0, dataset.mask.size - 1):
-                    zeros[i] = dataset.mask[i]
-            except:
-                self.errors.add(sys.exc_value)
-            dataset.mask = zeros
+                dataset.mask = _copy_mask(dataset.data.size, dataset.mask)
+            except Exception:
+                self.errors.add(sys.exc_info()[1])
+                dataset.mask = np.ones(dataset.data.size, dtype=bool)
             # Calculate the actual Q matrix
             try:
                 if dataset.q_data.size <= 1:
@@ -499,6 +763,57 @@ class Reader(FileReader):
             self.current_dataset = dataset
             self.send_to_output()
 
+    def _lazy_2d_cleanup(self, dataset):
+        """
+        The cleanup of final_data_cleanup for a LazyData2D, which sets up the
+        mask, Q and bins to be computed from the file when accessed
+
+        :param dataset: LazyData2D with unread fields
+        """
+        data = dataset.__dict__.get('data')
+        if not isinstance(data, _DatasetReader):
+            # Without intensities, load everything the usual way
+            dataset.load()
+            return
+        mask = dataset.__dict__.get('mask')
+        if not isinstance(mask, _DatasetReader):
+            mask = None
+        dataset.mask = _MaskReader(data.size, mask)
+        dataset.q_data = _QModulus()
+        qx_data = dataset.__dict__.get('qx_data')
+        qy_data = dataset.__dict__.get('qy_data')
+        if len(data.shape) == 2 and isinstance(qx_data, _DatasetReader) \
+                and isinstance(qy_data, _DatasetReader):
+            n_cols = data.shape[1]
+            dataset.x_bins = _bins_reader(qx_data, n_cols, True)
+            dataset.y_bins = _bins_reader(qy_data, n_cols, False)
+
+    def sort_one_d_data(self):
+        """
+        Sort 1D data along the X axis, unless it is read lazily: only its
+        units are then normalized
+        """
+        if not self.lazy:
+            super(Reader, self).sort_one_d_data()
+            return
+        for data in self.output:
+            if isinstance(data, Data1D):
+                data.x_unit = self.format_unit(data.x_unit)
+                data.y_unit = self.format_unit(data.y_unit)
+
+    def sort_two_d_data(self):
+        """
+        Format 2D data, unless it is read lazily: only its units are then
+        normalized
+        """
+        if not self.lazy:
+            super(Reader, self).sort_two_d_data()
+            return
+        for dataset in self.output:
+            if isinstance(dataset, Data2D):
+                dataset.x_unit = self.format_unit(dataset.Q_unit)
+                dataset.y_unit = self.format_unit(dataset.I_unit)
+
     def add_data_set(self, key=""):
         """
         Adds the current_dataset to the list of outputs after preforming final
@@ -527,11 +842,17 @@ class Reader(FileReader):
         if parent_list is None:
             parent_list = []
         if self._find_intermediate(parent_list, "Qx"):
-            self.current_dataset = plottable_2D()
+            if self.lazy:
+                self.current_dataset = LazyData2D()
+            else:
+                self.current_dataset = plottable_2D()
         else:
             x = np.array(0)
             y = np.array(0)
-            self.current_dataset = plottable_1D(x, y)
+            if self.lazy:
+                self.current_dataset = LazyData1D(x, y)
+            else:
+                self.current_dataset = plottable_1D(x, y)
         self.current_datainfo.filename = self.raw_data.filename
 
     def _find_intermediate(self, parent_list, basename=""):
@@ -11,6 +11,7 @@
 import os
 import math
 import time
+import warnings
 
 import numpy as np
 
@@ -32,6 +33,44 @@ def check_point(x_point):
         return 0
 
 
+def parse_data_block(text, row_num, col_num):
+    """
+    Parse the whitespace separated numbers of the data block in one pass
+
+    :param text: The data lines of the file
+    :param row_num: Number of data lines
+    :param col_num: Number of columns of each line
+    :return: (row_num, col_num) array, or None if the block has tokens that
+        are not numbers or the wrong number of them
+    """
+    with warnings.catch_warnings():
+        # numpy warns when it stops at a token which is not a number
+        warnings.simplefilter("ignore")
+        try:
+            values = np.fromstring(text, dtype=np.float64, sep=' ')
+        except ValueError:
+            return None
+    if values.size != row_num * col_num:
+        return None
+    return values.reshape(row_num, col_num)
+
+
+def format_data_block(fd, columns, fmt, chunk_rows=10000):
+    """
+    Write columns of numbers as lines of text, formatting chunk_rows lines at
+    a time
+
+    :param fd: File open for writing
+    :param columns: Sequence of arrays of the same length
+    :param fmt: Format of one line, e.g. "%g  %g  %g\\n"
+    :param chunk_rows: Number of lines formatted together
+    """
+    block = np.column_stack(columns)
+    for start in range(0, len(block), chunk_rows):
+        rows = block[start:start + chunk_rows]
+        fd.write((fmt * len(rows)) % tuple(rows.ravel().tolist()))
+
+
 class Reader(FileReader):
     """ Simple data reader for Igor data files """
     ## File type
@@ -59,10 +98,8 @@ class Reader(FileReader):
             # simple 2D header
             fd.write(header_str)
             # write qx qy I values
-            for i in range(len(data.data)):
-                fd.write("%g  %g  %g\n" % (data.qx_data[i],
-                                            data.qy_data[i],
-                                           data.data[i]))
+            format_data_block(fd, (data.qx_data, data.qy_data, data.data),
+                              "%g  %g  %g\n")
         finally:
             fd.close()
 
@@ -169,42 +206,15 @@ class Reader(FileReader):
                 col_num = len(line_toks)
                 break
 
-        # Make numpy array to remove header lines using index
-        lines_array = np.array(lines)
-
-        # index for lines_array
-        lines_index = np.arange(len(lines))
-
-        # get the data lines
-        data_lines = lines_array[lines_index >= (line_num - 1)]
         # Now we get the total number of rows (i.e., # of data points)
-        row_num = len(data_lines)
-        # make it as list again to control the separators
-        data_list = " ".join(data_lines.tolist())
-        # split all data to one big list w/" "separator
-        data_list = data_list.split()
-
-        # Check if the size is consistent with data, otherwise
-        #try the tab(\t) separator
-        # (this may be removed once get the confidence
-        #the former working all cases).
-        if len(data_list) != (len(data_lines)) * col_num:
-            data_list = "\t".join(data_lines.tolist())
-            data_list = data_list.split()
-
-        # Change it(string) into float
-        #data_list = map(float,data_list)
-        data_list1 = list(map(check_point, data_list))
-
-        # numpy array form
-        data_array = np.array(data_list1)
-        # Redimesion based on the row_num and col_num,
-        #otherwise raise an error.
-        try:
-            data_point = data_array.reshape(row_num, col_num).transpose()
-        except Exception:
-            msg = "red2d_reader can't read this file: Incorrect number of data points provided."
-            raise FileContentsException(msg)
+        row_num = len(lines) - (line_num - 1)
+        # Parse the data lines straight from the buffer
+        data_start = sum(len(line) + 1 for line in lines[:line_num - 1])
+        data_array = parse_data_block(buf[data_start:], row_num, col_num)
+        if data_array is not None:
+            data_point = data_array.transpose()
+        else:
+            data_point = self._parse_data_lines(lines[line_num - 1:], col_num)
         ## Get the all data: Let's HARDcoding; Todo find better way
         # Defaults
         dqx_data = np.zeros(0)
@@ -324,3 +334,35 @@ class Reader(FileReader):
         self.current_datainfo.meta_data['loader'] = self.type_name
 
         self.send_to_output()
+
+    @staticmethod
+    def _parse_data_lines(data_lines, col_num):
+        """
+        Parse the data lines token by token, setting the tokens which are not
+        numbers to zero. This is the fallback of parse_data_block for
+        malformed files.
+
+        :param data_lines: List of the data lines
+        :param col_num: Number of columns of each line
+        :return: (col_num, len(data_lines)) array
+        """
+        row_num = len(data_lines)
+        # split all data to one big list w/" "separator
+        data_list = " ".join(data_lines).split()
+
+        # Check if the size is consistent with data, otherwise
+        #try the tab(\t) separator
+        # (this may be removed once get the confidence
+        #the former working all cases).
+        if len(data_list) != row_num * col_num:
+            data_list = "\t".join(data_lines).split()
+
+        # Change it(string) into float
+        data_array = np.array(list(map(check_point, data_list)))
+        # Redimesion based on the row_num and col_num,
+        #otherwise raise an error.
+        try:
+            return data_array.reshape(row_num, col_num).transpose()
+        except Exception:
+            msg = "red2d_reader can't read this file: Incorrect number of data points provided."
+            raise FileContentsException(msg)
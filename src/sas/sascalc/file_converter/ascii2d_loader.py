@@ -142,9 +142,13 @@ class ASCII2DLoader(object):
                 raise ValueError(err_msg)
 
             # Format data for use with Data2D
+            x_bins = list(qx)
+            y_bins = list(qy)
             qx = list(qx) * height
             qy = np.array([[y] * width for y in qy]).flatten()
 
             data = Data2D(qx_data=qx, qy_data=qy, data=I, err_data=dI)
+            data.x_bins = x_bins
+            data.y_bins = y_bins
 
         return data
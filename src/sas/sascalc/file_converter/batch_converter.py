@@ -0,0 +1,170 @@
+"""
+Batch conversion of whole OTOKO, BSL or ASCII 2D frame stacks into a single
+NXcanSAS file, without going through the file converter GUI.
+"""
+from multiprocessing import Pool
+
+import numpy as np
+
+from sas.sascalc.dataloader.data_info import Data1D
+from sas.sascalc.file_converter.otoko_loader import OTOKOLoader
+from sas.sascalc.file_converter.bsl_loader import BSLLoader
+from sas.sascalc.file_converter.ascii2d_loader import ASCII2DLoader
+from sas.sascalc.file_converter.nxcansas_writer import NXcanSASWriter
+
+
+class BatchConverter(object):
+    """
+    Converts a stack of frames into one NXcanSAS file, in which all the
+    frames are stored in a single SASdata element (see
+    NXcanSASWriter.write_frames).
+
+    The binary OTOKO and BSL files are memory-mapped, so the frames are read
+    straight from disk while they are written. The text ASCII 2D files are
+    parsed in a pool of worker processes when nproc > 1.
+    """
+
+    def __init__(self, metadata=None, compression=None, chunk_frames=None,
+                 nproc=1):
+        """
+        :param metadata: Dictionary of DataInfo attributes (title, run,
+            run_name, instrument, detector, sample, source) to write with the
+            frames (optional)
+        :param compression: h5py compression filter ('gzip', 'lzf' or a gzip
+            level) for the frame datasets, or None
+        :param chunk_frames: Number of frames per HDF5 chunk (optional)
+        :param nproc: Number of processes used to parse text files
+        """
+        self.metadata = metadata if metadata is not None else {}
+        self.compression = compression
+        self.chunk_frames = chunk_frames
+        self.nproc = nproc
+        self.writer = NXcanSASWriter()
+
+    def convert_otoko(self, q_path, data_path, output, frames=None):
+        """
+        Convert the frames of an OTOKO file pair
+
+        :param q_path: Path to the OTOKO header of the Q axis
+        :param data_path: Path to the OTOKO header of the intensity axis
+        :param output: Path of the NXcanSAS file to write
+        :param frames: Frame numbers to convert (optional, default all)
+        :return: The list of converted frame numbers
+        """
+        otoko_data = OTOKOLoader(q_path, data_path).load_otoko_data()
+        qdata = otoko_data.q_axis.data
+        if len(qdata) > 1:
+            raise ValueError("Q-Axis file has multiple frames. Only 1 frame "
+                             "is allowed for the Q-Axis")
+        qdata = qdata[0]
+        stack = otoko_data.data_axis.data
+        frames = self._select_frames(frames, len(stack))
+
+        data_info = Data1D(x=qdata, y=np.zeros(len(qdata)))
+        self._write(data_info, ((stack[i], None) for i in frames), output,
+                    frames)
+        return frames
+
+    def convert_bsl(self, header_path, output, frames=None):
+        """
+        Convert the frames of a BSL file
+
+        :param header_path: Path to the BSL header file
+        :param output: Path of the NXcanSAS file to write
+        :param frames: Frame numbers to convert (optional, default all)
+        :return: The list of converted frame numbers
+        """
+        loader = BSLLoader(header_path)
+        stack = loader.get_frames()
+        frames = self._select_frames(frames, len(stack))
+
+        # A loaded frame carries the axes shared by all the frames
+        data_info = loader.load_frames(frames[:1])[0]
+        self._write(data_info, ((stack[i], None) for i in frames), output,
+                    frames)
+        return frames
+
+    def convert_ascii2d(self, paths, output):
+        """
+        Convert ASCII 2D files holding one frame each, which must all share
+        the same q axes
+
+        :param paths: Paths to the ASCII 2D files, in frame order
+        :param output: Path of the NXcanSAS file to write
+        """
+        paths = list(paths)
+        if not paths:
+            raise ValueError("No files to convert")
+        if self.nproc > 1 and len(paths) > 1:
+            pool = Pool(min(self.nproc, len(paths)))
+            try:
+                chunksize = max(1, len(paths) // (4 * self.nproc))
+                self._write_ascii2d(
+                    pool.imap(_load_ascii2d, paths, chunksize), paths,
+                    output)
+            finally:
+                pool.terminate()
+                pool.join()
+        else:
+            self._write_ascii2d((_load_ascii2d(path) for path in paths),
+                                paths, output)
+
+    def _write_ascii2d(self, loaded, paths, output):
+        """
+        Write the Data2D objects loaded from ASCII 2D files as frames
+
+        :param loaded: An iterator of Data2D objects, one per path
+        :param paths: Paths the objects were loaded from
+        :param output: Path of the NXcanSAS file to write
+        """
+        data_info = next(loaded)
+
+        def _frames():
+            yield data_info.data, data_info.err_data
+            for path, data in zip(paths[1:], loaded):
+                if not (np.array_equal(data.qx_data, data_info.qx_data) and
+                        np.array_equal(data.qy_data, data_info.qy_data)):
+                    raise ValueError("The q axes of {} differ from those of "
+                                     "{}".format(path, paths[0]))
+                yield data.data, data.err_data
+
+        self._write(data_info, _frames(), output, list(range(len(paths))))
+
+    def _write(self, data_info, frames, output, frame_numbers):
+        """
+        Apply the metadata to data_info and write the frames
+        """
+        for key, value in self.metadata.items():
+            setattr(data_info, key, value)
+        self.writer.write_frames(data_info, frames, output,
+                                 n_frames=len(frame_numbers),
+                                 frame_numbers=frame_numbers,
+                                 compression=self.compression,
+                                 chunk_frames=self.chunk_frames)
+
+    @staticmethod
+    def _select_frames(frames, n_frames):
+        """
+        Check the frame numbers to convert
+
+        :param frames: Frame numbers, or None for all the frames
+        :param n_frames: Number of frames in the file
+        :return: List of frame numbers
+        """
+        if frames is None:
+            return list(range(n_frames))
+        frames = [int(frame) for frame in frames]
+        for frame in frames:
+            if frame < 0 or frame >= n_frames:
+                raise ValueError("Frame {} is not one of the {} frames of the "
+                                 "file".format(frame, n_frames))
+        if not frames:
+            raise ValueError("No frames to convert")
+        return frames
+
+
+def _load_ascii2d(path):
+    """
+    Load an ASCII 2D file; module level so that worker processes can run it
+    """
+    return ASCII2DLoader(path).load()
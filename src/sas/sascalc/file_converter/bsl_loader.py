@@ -7,10 +7,19 @@ import numpy as np
 class BSLParsingError(Exception):
     pass
 
+def _read_frame(frame_stack, frame):
+    """
+    Copy one frame of a mapped BSL file into a native float32 array
+    """
+    if not 0 <= frame < len(frame_stack):
+        raise RuntimeError("Error reading file or EOF reached.")
+    return np.array(frame_stack[frame], dtype=np.float32)
+
 class BSLLoader(CLoader):
     """
     Loads 2D SAS data from a BSL file.
-    CLoader is a C extension (found in c_ext/bsl_loader.c)
+    CLoader is a C extension (found in c_ext/bsl_loader.c) holding the
+    parameters read from the header; the data file itself is memory-mapped.
 
     See http://www.diamond.ac.uk/Beamlines/Soft-Condensed-Matter/small-angle/SAXS-Software/CCP13/BSL.html
     for more info on the BSL file format.
@@ -79,18 +88,50 @@ class BSLLoader(CLoader):
         CLoader.__init__(self, data_info['filename'], data_info['frames'],
             data_info['pixels'], data_info['rasters'], data_info['swap_bytes'])
 
+    def get_frames(self):
+        """
+        Map the frames of the data file into memory, without reading them
+
+        :return: Read-only array of shape (frames, rasters, pixels) holding the
+            complete frames found in the data file
+        """
+        if not os.path.isfile(self.filename):
+            raise RuntimeError("Unable to open file: {}".format(
+                os.path.basename(self.filename)))
+        # Floats are big endian when the header asks for their bytes to
+        # be swapped
+        dtype = np.dtype('>f4' if self.swap_bytes == 0 else '<f4')
+        frame_size = self.n_rasters * self.n_pixels
+        n_frames = self.n_frames
+        if frame_size > 0:
+            file_size = os.path.getsize(self.filename)
+            n_frames = min(n_frames, file_size // (dtype.itemsize*frame_size))
+        shape = (n_frames, self.n_rasters, self.n_pixels)
+        if n_frames*frame_size == 0:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(self.filename, dtype=dtype, mode='r', shape=shape)
+
+    def load_data(self):
+        """
+        Load the current frame (self.frame) of the data file
+
+        :return: Float32 array of shape (rasters, pixels)
+        """
+        return _read_frame(self.get_frames(), self.frame)
+
     def load_frames(self, frames):
         frame_data = []
         # Prepare axis values (arbitrary scale)
-        x = self.n_rasters * range(1, self.n_pixels+1)
+        x = self.n_rasters * list(range(1, self.n_pixels+1))
         y = [self.n_pixels * [i] for i in range(1, self.n_rasters+1)]
         y = np.reshape(y, (1, self.n_pixels*self.n_rasters))[0]
         x_bins = x[:self.n_pixels]
         y_bins = y[0::self.n_pixels]
 
+        frame_stack = self.get_frames()
         for frame in frames:
             self.frame = frame
-            raw_frame_data = self.load_data()
+            raw_frame_data = _read_frame(frame_stack, frame)
             data2d = Data2D(data=raw_frame_data, qx_data=x, qy_data=y)
             data2d.x_bins = x_bins
             data2d.y_bins = y_bins
@@ -139,78 +139,6 @@ static PyObject *set_swap_bytes(CLoader *self, PyObject *args) {
     return Py_BuildValue("i", self->params.swap_bytes);
 }
 
-/*                        ----- Instance Methods -----                       */
-
-float reverse_float(const float in_float) {
-    // Reverse the order of the bytes of a float
-    float retval;
-    char *to_convert = (char *)&in_float;
-    char *return_float = (char *)&retval;
-
-    return_float[0] = to_convert[3];
-    return_float[1] = to_convert[2];
-    return_float[2] = to_convert[1];
-    return_float[3] = to_convert[0];
-
-    return retval;
-}
-
-static PyObject *load_data(CLoader *self, PyObject *args) {
-    int raster;
-    int pixel;
-    int frame_pos;
-    npy_intp size[2] = {self->params.n_rasters, self->params.n_pixels};
-    float cur_val;
-    FILE *input_file;
-    PyArrayObject *data;
-
-    // Create a new numpy array to store the data in
-    data = (PyArrayObject *)PyArray_SimpleNew(2, size, NPY_FLOAT);
-
-    // Attempt to open the file specified
-    input_file = fopen(self->params.filename, "rb");
-    if (!input_file) {
-        // BSL filenames are 10 characters long
-        // Filename validity checked in bsl_loader.py
-        size_t filename_start = strlen(self->params.filename) - 10;
-        char *filename = self->params.filename + filename_start;
-        char *err_msg = (char *)malloc(sizeof(char) * 32);
-
-        sprintf(err_msg, "Unable to open file: %s", filename);
-
-        PyErr_SetString(PyExc_RuntimeError, err_msg);
-        free(err_msg);
-        return NULL;
-    }
-
-    // Move the file cursor the the position where the data we're interested
-    // in begins
-    frame_pos = self->params.n_pixels * self->params.n_rasters * self->params.frame;
-    fseek(input_file, frame_pos*sizeof(float), SEEK_SET);
-
-    for (raster = 0; raster < self->params.n_rasters; raster++) {
-        for (pixel = 0; pixel < self->params.n_pixels; pixel++) {
-            // Try reading the file
-            if (fread(&cur_val, sizeof(float), 1, input_file) == 0) {
-                PyErr_SetString(PyExc_RuntimeError, "Error reading file or EOF reached.");
-                return NULL;
-            }
-
-            // Swap the order of the bytes read, if specified that we should do
-            // so in the header file
-            if (self->params.swap_bytes == 0)
-                cur_val = reverse_float(cur_val);
-
-            // Add the read value to the numpy array
-            PyArray_SETITEM(data, PyArray_GETPTR2(data, raster, pixel), PyFloat_FromDouble(cur_val));
-        }
-    }
-
-    fclose(input_file);
-
-    return Py_BuildValue("N", data);
-}
-
 /*                           ----- Class Registration -----                  */
 
 static PyMethodDef CLoader_methods[] = {
@@ -227,7 +155,6 @@ static PyMethodDef CLoader_methods[] = {
     { "set_n_rasters", (PyCFunction)set_n_rasters, METH_VARARGS, "Set n_rasters" },
     { "get_swap_bytes", (PyCFunction)get_swap_bytes, METH_VARARGS, "Get swap_bytes" },
     { "set_swap_bytes", (PyCFunction)set_swap_bytes, METH_VARARGS, "Set swap_bytes" },
-    { "load_data", (PyCFunction)load_data, METH_VARARGS, "Load the data into a numpy array" },
     {NULL}
 };
 
@@ -2,6 +2,8 @@
     NXcanSAS 1/2D data reader for writing HDF5 formatted NXcanSAS files.
 """
 
+import itertools
+
 import h5py
 import numpy as np
 import re
@@ -10,6 +12,66 @@ import os
 from sas.sascalc.dataloader.readers.cansas_reader_HDF5 import Reader as Cansas2Reader
 from sas.sascalc.dataloader.data_info import Data1D, Data2D
 
+
+def _h5_string(string):
+    """
+    Convert a string to a numpy string in a numpy array. This way it is
+    written to the HDF5 file as a fixed length ASCII string and is
+    compatible with the Reader read() method.
+    """
+    if isinstance(string, np.ndarray):
+        return string
+    elif not isinstance(string, str):
+        string = str(string)
+
+    return np.array([np.string_(string)])
+
+
+def _write_h5_string(entry, value, key):
+    entry[key] = _h5_string(value)
+
+
+def _h5_float(x):
+    if not (isinstance(x, list)):
+        x = [x]
+    return np.array(x, dtype=np.float32)
+
+
+def _write_h5_float(entry, value, key):
+    entry.create_dataset(key, data=_h5_float(value))
+
+
+def _write_h5_vector(entry, vector, names=['x_position', 'y_position'],
+    units=None, write_fn=_write_h5_string):
+    """
+    Write a vector to an h5 entry
+
+    :param entry: The H5Py entry to write to
+    :param vector: The Vector to write
+    :param names: What to call the x,y and z components of the vector
+        when writing to the H5Py entry
+    :param units: The units of the vector (optional)
+    :param write_fn: A function to convert the value to the required
+        format and write it to the H5Py entry, of the form
+        f(entry, value, name) (optional)
+    """
+    if len(names) < 2:
+        raise ValueError("Length of names must be >= 2.")
+
+    if vector.x is not None:
+        write_fn(entry, vector.x, names[0])
+        if units is not None:
+            entry[names[0]].attrs['units'] = units
+    if vector.y is not None:
+        write_fn(entry, vector.y, names[1])
+        if units is not None:
+            entry[names[1]].attrs['units'] = units
+    if len(names) == 3 and vector.z is not None:
+        write_fn(entry, vector.z, names[2])
+        if units is not None:
+            entry[names[2]].attrs['units'] = units
+
+
 class NXcanSASWriter(Cansas2Reader):
     """
     A class for writing in NXcanSAS data files. Any number of data sets may be
@@ -32,66 +94,170 @@ class NXcanSASWriter(Cansas2Reader):
         :param filename: Where to write the NXcanSAS file
         """
 
-        def _h5_string(string):
-            """
-            Convert a string to a numpy string in a numpy array. This way it is
-            written to the HDF5 file as a fixed length ASCII string and is
-            compatible with the Reader read() method.
-            """
-            if isinstance(string, np.ndarray):
-                return string
-            elif not isinstance(string, str):
-                string = str(string)
-
-            return np.array([np.string_(string)])
-
-        def _write_h5_string(entry, value, key):
-            entry[key] = _h5_string(value)
-
-        def _h5_float(x):
-            if not (isinstance(x, list)):
-                x = [x]
-            return np.array(x, dtype=np.float32)
-
-        def _write_h5_float(entry, value, key):
-            entry.create_dataset(key, data=_h5_float(value))
-
-        def _write_h5_vector(entry, vector, names=['x_position', 'y_position'],
-            units=None, write_fn=_write_h5_string):
-            """
-            Write a vector to an h5 entry
-
-            :param entry: The H5Py entry to write to
-            :param vector: The Vector to write
-            :param names: What to call the x,y and z components of the vector
-                when writing to the H5Py entry
-            :param units: The units of the vector (optional)
-            :param write_fn: A function to convert the value to the required
-                format and write it to the H5Py entry, of the form
-                f(entry, value, name) (optional)
-            """
-            if len(names) < 2:
-                raise ValueError("Length of names must be >= 2.")
-
-            if vector.x is not None:
-                write_fn(entry, vector.x, names[0])
-                if units is not None:
-                    entry[names[0]].attrs['units'] = units
-            if vector.y is not None:
-                write_fn(entry, vector.y, names[1])
-                if units is not None:
-                    entry[names[1]].attrs['units'] = units
-            if len(names) == 3 and vector.z is not None:
-                write_fn(entry, vector.z, names[2])
-                if units is not None:
-                    entry[names[2]].attrs['units'] = units
-
         valid_data = all([issubclass(d.__class__, (Data1D, Data2D)) for d in dataset])
         if not valid_data:
             raise ValueError("All entries of dataset must be Data1D or Data2D objects")
 
+        f = h5py.File(filename, 'w')
         # Get run name and number from first Data object
-        data_info = dataset[0]
+        sasentry = self._create_entry(f, dataset[0])
+
+        i = 1
+
+        for data_obj in dataset:
+            data_entry = sasentry.create_group("sasdata{0:0=2d}".format(i))
+            data_entry.attrs['canSAS_class'] = 'SASdata'
+            if isinstance(data_obj, Data1D):
+                self._write_1d_data(data_obj, data_entry)
+            elif isinstance(data_obj, Data2D):
+                self._write_2d_data(data_obj, data_entry)
+            i += 1
+
+        self._write_metadata(sasentry, dataset[0])
+        f.close()
+
+    def write_frames(self, data_info, frames, filename, n_frames=None,
+                     frame_numbers=None, compression=None, chunk_frames=None):
+        """
+        Write a stack of frames sharing the q axes of data_info to an NXcanSAS
+        file, as one SASentry with a single SASdata element. The I and Idev
+        datasets of that element are indexed by frame first, so the stack is
+        written in blocks of whole frames rather than one data set at a time.
+
+        :param data_info: A Data1D or Data2D object giving the q axes, units
+            and metadata (detector, instrument, sample, etc) of every frame.
+            Its own intensities are not written.
+        :param frames: An iterable of (intensity, uncertainty) pairs, one per
+            frame. The uncertainty may be None, in which case Idev is zero.
+        :param filename: Where to write the NXcanSAS file
+        :param n_frames: Number of frames, required when frames has no len()
+        :param frame_numbers: Frame number of each frame in its source file,
+            written as the 'frame_number' dataset (optional)
+        :param compression: h5py compression filter ('gzip', 'lzf' or a
+            gzip level) used for the I and Idev datasets, or None
+        :param chunk_frames: Number of frames per HDF5 chunk (optional, by
+            default chunks hold about 1 MB)
+        """
+        if not issubclass(data_info.__class__, (Data1D, Data2D)):
+            raise ValueError("data_info must be a Data1D or Data2D object")
+        if n_frames is None:
+            n_frames = len(frames)
+        if n_frames < 1:
+            raise ValueError("No frames to write")
+
+        f = h5py.File(filename, 'w')
+        try:
+            sasentry = self._create_entry(f, data_info)
+            data_entry = sasentry.create_group("sasdata01")
+            data_entry.attrs['canSAS_class'] = 'SASdata'
+            data_entry.attrs['signal'] = 'I'
+            data_entry.attrs['I_uncertainties'] = 'Idev'
+            # The frame index has no axis dataset ('.' in NeXus)
+            if isinstance(data_info, Data2D):
+                (n_rows, n_cols) = self._get_2d_shape(data_info)
+                frame_shape = (n_rows, n_cols)
+                data_entry.attrs['I_axes'] = '.,Q,Q'
+                data_entry.attrs['Q_indicies'] = [1, 2]
+                qx = np.reshape(data_info.qx_data, frame_shape)
+                qy = np.reshape(data_info.qy_data, frame_shape)
+                Qx_entry = data_entry.create_dataset('Qx', data=qx)
+                Qx_entry.attrs['units'] = data_info.Q_unit
+                Qy_entry = data_entry.create_dataset('Qy', data=qy)
+                Qy_entry.attrs['units'] = data_info.Q_unit
+            else:
+                frame_shape = (len(data_info.x),)
+                data_entry.attrs['I_axes'] = '.,Q'
+                data_entry.attrs['Q_indicies'] = 1
+                data_entry.create_dataset('Q', data=data_info.x)
+            if frame_numbers is not None:
+                data_entry.create_dataset('frame_number',
+                                          data=np.asarray(frame_numbers))
+
+            self._write_frame_stack(data_entry, iter(frames), n_frames,
+                                    frame_shape, compression, chunk_frames)
+            if isinstance(data_info, Data2D):
+                data_entry['I'].attrs['units'] = data_info.I_unit
+                data_entry['Idev'].attrs['units'] = data_info.I_unit
+
+            self._write_metadata(sasentry, data_info)
+        finally:
+            f.close()
+
+    def _write_frame_stack(self, data_entry, frames, n_frames, frame_shape,
+                           compression, chunk_frames):
+        """
+        Write the I and Idev datasets of a frame stack, one chunk of frames
+        at a time. Idev is only written for the chunks which have
+        uncertainties, the others keep the zero fill value.
+
+        :param data_entry: A h5py Group object representing the SASdata
+        :param frames: An iterator of (intensity, uncertainty) pairs
+        :param n_frames: Number of frames in the stack
+        :param frame_shape: Shape of the datasets for one frame
+        :param compression: h5py compression filter, or None
+        :param chunk_frames: Number of frames per chunk, or None
+        """
+        try:
+            intensity, uncertainty = next(frames)
+        except StopIteration:
+            raise ValueError("Expected {} frames, got 0".format(n_frames))
+        dtype = np.result_type(np.asarray(intensity).dtype, np.float32)
+        dtype = dtype.newbyteorder('=')
+        if chunk_frames is None:
+            frame_bytes = dtype.itemsize * int(np.prod(frame_shape))
+            chunk_frames = max(1, (1 << 20) // max(frame_bytes, 1))
+        chunk_frames = int(min(chunk_frames, n_frames))
+        shape = (n_frames,) + tuple(frame_shape)
+        chunks = (chunk_frames,) + tuple(frame_shape)
+        I_entry = data_entry.create_dataset('I', shape=shape, dtype=dtype,
+                                            chunks=chunks,
+                                            compression=compression)
+        Idev_entry = data_entry.create_dataset('Idev', shape=shape,
+                                               dtype=dtype, chunks=chunks,
+                                               compression=compression,
+                                               fillvalue=0)
+
+        block = np.empty(chunks, dtype=dtype)
+        dev_block = np.zeros(chunks, dtype=dtype)
+        has_dev = False
+        start = 0
+        count = 0
+        for intensity, uncertainty in itertools.chain(
+                [(intensity, uncertainty)], frames):
+            if start + count == n_frames:
+                raise ValueError("Expected {} frames, got more".format(
+                    n_frames))
+            block[count] = np.reshape(intensity, frame_shape)
+            if uncertainty is not None:
+                dev_block[count] = np.reshape(uncertainty, frame_shape)
+                has_dev = True
+            else:
+                dev_block[count] = 0
+            count += 1
+            if count == chunk_frames:
+                I_entry[start:start + count] = block
+                if has_dev:
+                    Idev_entry[start:start + count] = dev_block
+                start += count
+                count = 0
+                has_dev = False
+        if count > 0:
+            I_entry[start:start + count] = block[:count]
+            if has_dev:
+                Idev_entry[start:start + count] = dev_block[:count]
+            start += count
+        if start != n_frames:
+            raise ValueError("Expected {} frames, got {}".format(n_frames,
+                                                                 start))
+
+    def _create_entry(self, f, data_info):
+        """
+        Create the SASentry group, with the run and title of data_info
+
+        :param f: The h5py File to write to
+        :param data_info: A Data1D or Data2D object
+        :return: The SASentry h5py Group
+        """
         run_number = ''
         run_name = ''
         if len(data_info.run) > 0:
@@ -99,7 +265,6 @@ class NXcanSASWriter(Cansas2Reader):
             if len(data_info.run_name) > 0:
                 run_name = data_info.run_name[run_number]
 
-        f = h5py.File(filename, 'w')
         sasentry = f.create_group('sasentry01')
         sasentry['definition'] = _h5_string('NXcanSAS')
         sasentry['run'] = _h5_string(run_number)
@@ -107,19 +272,16 @@ class NXcanSASWriter(Cansas2Reader):
         sasentry['title'] = _h5_string(data_info.title)
         sasentry.attrs['canSAS_class'] = 'SASentry'
         sasentry.attrs['version'] = '1.0'
+        return sasentry
 
-        i = 1
-
-        for data_obj in dataset:
-            data_entry = sasentry.create_group("sasdata{0:0=2d}".format(i))
-            data_entry.attrs['canSAS_class'] = 'SASdata'
-            if isinstance(data_obj, Data1D):
-                self._write_1d_data(data_obj, data_entry)
-            elif isinstance(data_obj, Data2D):
-                self._write_2d_data(data_obj, data_entry)
-            i += 1
+    def _write_metadata(self, sasentry, data_info):
+        """
+        Write the sample, instrument and note metadata of data_info
 
-        data_info = dataset[0]
+        :param sasentry: The SASentry h5py Group to write to
+        :param data_info: A Data1D or Data2D object
+        """
+        i = 1
         # Sample metadata
         sample_entry = sasentry.create_group('sassample')
         sample_entry.attrs['canSAS_class'] = 'SASsample'
@@ -242,8 +404,6 @@ class NXcanSASWriter(Cansas2Reader):
         if notes is not None:
             note_entry.create_dataset('SASnote', data=notes)
 
-        f.close()
-
     def _write_1d_data(self, data_obj, data_entry):
         """
         Writes the contents of a Data1D object to a SASdata h5py Group
@@ -276,16 +436,7 @@ class NXcanSASWriter(Cansas2Reader):
         data_entry.attrs['I_uncertainties'] = 'Idev'
         data_entry.attrs['Q_indicies'] = [0,1]
 
-        (n_rows, n_cols) = (len(data.y_bins), len(data.x_bins))
-
-        if n_rows == 0 and n_cols == 0:
-            # Calculate rows and columns, assuming detector is square
-            # Same logic as used in PlotPanel.py _get_bins
-            n_cols = int(np.floor(np.sqrt(len(data.qy_data))))
-            n_rows = int(np.floor(len(data.qy_data) / n_cols))
-
-            if n_rows * n_cols != len(data.qy_data):
-                raise ValueError("Unable to calculate dimensions of 2D data")
+        (n_rows, n_cols) = self._get_2d_shape(data)
 
         I = np.reshape(data.data, (n_rows, n_cols))
         dI = np.zeros((n_rows, n_cols))
@@ -302,3 +453,22 @@ class NXcanSASWriter(Cansas2Reader):
         Qy_entry.attrs['units'] = data.Q_unit
         Idev_entry = data_entry.create_dataset('Idev', data=dI)
         Idev_entry.attrs['units'] = data.I_unit
+
+    def _get_2d_shape(self, data):
+        """
+        Get the detector shape of a Data2D object
+
+        :param data: A Data2D object
+        :return: (n_rows, n_cols)
+        """
+        (n_rows, n_cols) = (len(data.y_bins), len(data.x_bins))
+
+        if n_rows == 0 and n_cols == 0:
+            # Calculate rows and columns, assuming detector is square
+            # Same logic as used in PlotPanel.py _get_bins
+            n_cols = int(np.floor(np.sqrt(len(data.qy_data))))
+            n_rows = int(np.floor(len(data.qy_data) / n_cols))
+
+            if n_rows * n_cols != len(data.qy_data):
+                raise ValueError("Unable to calculate dimensions of 2D data")
+        return (n_rows, n_cols)
@@ -4,9 +4,7 @@ the comment in load_otoko_data).  Given the paths of header and data files, we
 aim to load the data into numpy arrays for use later.
 """
 
-import itertools
 import os
-import struct
 import numpy as np
 
 class CStyleStruct:
@@ -22,6 +20,50 @@ class OTOKOData:
         self.q_axis = q_axis
         self.data_axis = data_axis
 
+class OTOKOFrames(object):
+    """
+    Frames of an OTOKO axis, backed by memory-mapped binary files.
+
+    The stack behaves like a read-only 2D array of shape (frames, channels):
+    indexing it with a frame number, a slice or a list of frames only reads
+    those frames from disk, and returns them as float64 arrays.
+    """
+    def __init__(self, maps, n_channels):
+        """
+        :param maps: one (frames, channels) memmap per binary file
+        :param n_channels: number of channels in each frame
+        """
+        self.maps = maps
+        self.offsets = np.cumsum([0] + [len(m) for m in maps])
+        self.shape = (int(self.offsets[-1]), n_channels)
+        self.ndim = 2
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        rows = np.arange(self.shape[0])[key]
+        if np.ndim(rows) == 0:
+            index = np.searchsorted(self.offsets, rows, side='right') - 1
+            return np.array(self.maps[index][rows - self.offsets[index]],
+                            dtype=np.float64)
+        frames = np.empty((len(rows), self.shape[1]))
+        owner = np.searchsorted(self.offsets, rows, side='right') - 1
+        for index, binary_map in enumerate(self.maps):
+            selected = (owner == index)
+            if selected.any():
+                frames[selected] = \
+                    binary_map[rows[selected] - self.offsets[index]]
+        return frames
+
+    def __iter__(self):
+        for frame in range(len(self)):
+            yield self[frame]
+
+    def __array__(self, dtype=None):
+        frames = self[:]
+        return frames if dtype is None else frames.astype(dtype)
+
 class OTOKOLoader(object):
 
     def __init__(self, qaxis_path, data_path):
@@ -36,7 +78,9 @@ class OTOKOLoader(object):
 
         Given the paths of two header files, this function will load each axis in
         turn.  If loading is successful then an instance of the OTOKOData class
-        will be returned, else an exception will be raised.
+        will be returned, else an exception will be raised.  The data of each
+        axis is an OTOKOFrames stack, so frames are only read from the binary
+        files when they are accessed.
 
         For more information on the OTOKO file format, please see:
         http://www.diamond.ac.uk/Home/Beamlines/small-angle/SAXS-Software/CCP13/
@@ -58,7 +102,6 @@ class OTOKOLoader(object):
             raise OTOKOParsingError("The header file %s does not exist." % header_path)
 
         binary_file_info_list = []
-        total_frames = 0
         header_dir = os.path.dirname(os.path.abspath(header_path))
 
         with open(header_path, "r") as header_file:
@@ -74,7 +117,7 @@ class OTOKOLoader(object):
                 From http://stackoverflow.com/a/5389547/778572
                 """
                 a = iter(iterable)
-                return itertools.izip(a, a)
+                return zip(a, a)
 
             for indicators, filename in pairwise(lines[2:]):
                 indicators = indicators.split()
@@ -109,8 +152,6 @@ class OTOKOLoader(object):
 
                 binary_file_info_list.append(binary_file_info)
 
-                total_frames += binary_file_info.n_frames
-
         # Check that all binary files are listed in the header as having the same
         # number of channels, since I don't think CorFunc can handle ragged data.
         all_n_channels = [info.n_channels for info in binary_file_info_list]
@@ -118,29 +159,26 @@ class OTOKOLoader(object):
             raise OTOKOParsingError(
                 "Expected all binary files listed in %s to have the same number of channels." % header_path)
 
-        data = np.zeros(shape=(total_frames, all_n_channels[0]))
-        frames_so_far = 0
-
+        maps = []
         for info in binary_file_info_list:
             if not os.path.exists(info.file_path):
                 raise OTOKOParsingError(
                     "The data file %s does not exist." % info.file_path)
 
-            with open(info.file_path, "rb") as binary_file:
-                # Ideally we'd like to use numpy's fromfile() to read in binary
-                # data, but we are forced to roll our own float-by-float file
-                # reader because of the rules imposed on us by the file format;
-                # namely, if the swap indicator flag has been raised then the bytes
-                # of each float occur in reverse order.
-                for frame in range(info.n_frames):
-                    for channel in range(info.n_channels):
-                        b = bytes(binary_file.read(4))
-                        if info.swap_bytes:
-                            b = b[::-1] # "Extended slice" syntax, used to reverse.
-                        value = struct.unpack('f', b)[0]
-                        data[frames_so_far + frame][channel] = value
-
-                frames_so_far += info.n_frames
+            # The format stores 4 byte floats, whose bytes occur in reverse
+            # order (big endian) when the swap indicator flag has been raised.
+            dtype = np.dtype('>f4' if info.swap_bytes else '<f4')
+            shape = (info.n_frames, info.n_channels)
+            if os.path.getsize(info.file_path) < dtype.itemsize * np.prod(shape):
+                raise OTOKOParsingError(
+                    "The data file %s holds fewer than the %d frames listed "
+                    "in %s." % (info.file_path, info.n_frames, header_path))
+            if info.n_frames * info.n_channels == 0:
+                maps.append(np.empty(shape, dtype=dtype))
+            else:
+                maps.append(np.memmap(info.file_path, dtype=dtype, mode='r',
+                                      shape=shape))
+        data = OTOKOFrames(maps, all_n_channels[0])
 
         return CStyleStruct(
             header_path = header_path,
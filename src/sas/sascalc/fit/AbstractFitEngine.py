@@ -8,6 +8,7 @@ import numpy as np
 
 from sas.sascalc.dataloader.data_info import Data1D
 from sas.sascalc.dataloader.data_info import Data2D
+from sas.sascalc.fit.symmetry import SymmetricEvaluator, is_centrosymmetric
 _SMALLVALUE = 1.0e-10
 
 class FitHandler(object):
@@ -278,6 +279,9 @@ class FitData2D(Data2D):
         self.radius = 0
         self.res_err_data = []
         self.sas_data = sas_data2d
+        # Evaluator of centrosymmetric models and the idx it was made for
+        self._evaluator = None
+        self._evaluator_idx = None
         self.set_data(sas_data2d)
 
     def set_data(self, sas_data2d, qmin=None, qmax=None):
@@ -289,6 +293,7 @@ class FitData2D(Data2D):
         self.qx_data = sas_data2d.qx_data
         self.qy_data = sas_data2d.qy_data
         self.mask = sas_data2d.mask
+        self._evaluator = None
 
         x_max = max(math.fabs(sas_data2d.xmin), math.fabs(sas_data2d.xmax))
         y_max = max(math.fabs(sas_data2d.ymin), math.fabs(sas_data2d.ymax))
@@ -361,13 +366,28 @@ class FitData2D(Data2D):
             fn.set_index(self.idx)
             gn = fn.get_value()
         else:
-            gn = fn([self.qx_data[self.idx],
-                     self.qy_data[self.idx]])
+            gn = self._evaluate(fn)
         # use only the data point within ROI range
         res = (self.data[self.idx] - gn) / self.res_err_data[self.idx]
 
         return res, gn
 
+    def _evaluate(self, fn):
+        """
+        Evaluate fn on the points in the fit range, computing only one point
+        of each pair of mirrored points if the model is centrosymmetric
+        """
+        # fn is the evalDistribution method of the model
+        model = getattr(fn, '__self__', None)
+        if model is None or not is_centrosymmetric(model):
+            return fn([self.qx_data[self.idx], self.qy_data[self.idx]])
+        if (self._evaluator is None
+                or not np.array_equal(self.idx, self._evaluator_idx)):
+            self._evaluator = SymmetricEvaluator(self.qx_data[self.idx],
+                                                 self.qy_data[self.idx])
+            self._evaluator_idx = np.array(self.idx, copy=True)
+        return self._evaluator.evaluate(fn)
+
     def residuals_deriv(self, model, pars=[]):
         """
         :return: residuals derivatives .
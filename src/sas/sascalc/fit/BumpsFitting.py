@@ -2,6 +2,7 @@
 BumpsFitting module runs the bumps optimizer.
 """
 import os
+import multiprocessing
 from datetime import timedelta, datetime
 import traceback
 
@@ -9,19 +10,40 @@ import numpy as np
 
 from bumps import fitters
 try:
-    from bumps.options import FIT_CONFIG
+    from bumps.options import FIT_CONFIG, FIT_FIELDS
     # Default bumps to use the Levenberg-Marquardt optimizer
     FIT_CONFIG.selected_id = fitters.LevenbergMarquardtFit.id
-    def get_fitter():
-        return FIT_CONFIG.selected_fitter, FIT_CONFIG.selected_values
+    def get_fitter(fitter_id=None, options=None):
+        """
+        Return the fitter class and settings of the optimizer selected in the
+        bumps configuration, or of *fitter_id* with its settings updated by
+        *options*, leaving the configuration unchanged.
+        """
+        if fitter_id is None:
+            fitter_id = FIT_CONFIG.selected_id
+        values = dict(FIT_CONFIG.values[fitter_id])
+        for key, value in (options or {}).items():
+            values[key] = FIT_FIELDS[key][1](value)
+        return FIT_CONFIG.fitters[fitter_id], values
+    def get_fitter_settings():
+        """
+        Return {id: [setting names]} of the available optimizers
+        """
+        return dict((fitter_id, [key for key, _ in FIT_CONFIG.settings[fitter_id]])
+                    for fitter_id in FIT_CONFIG.ids)
 except ImportError:
     # CRUFT: Bumps changed its handling of fit options around 0.7.5.6
     # Default bumps to use the Levenberg-Marquardt optimizer
     fitters.FIT_DEFAULT = 'lm'
-    def get_fitter():
-        fitopts = fitters.FIT_OPTIONS[fitters.FIT_DEFAULT]
-        return fitopts.fitclass, fitopts.options.copy()
-
+    def get_fitter(fitter_id=None, options=None):
+        fitopts = fitters.FIT_OPTIONS[fitter_id or fitters.FIT_DEFAULT]
+        values = fitopts.options.copy()
+        for key, value in (options or {}).items():
+            values[key] = type(values[key])(value)
+        return fitopts.fitclass, values
+    def get_fitter_settings():
+        return dict((fitter_id, list(fitopts.options))
+                    for fitter_id, fitopts in fitters.FIT_OPTIONS.items())
 
 from bumps.mapper import SerialMapper, MPMapper
 from bumps import parameter
@@ -105,8 +127,10 @@ class ConvergenceMonitor(object):
 
 # Note: currently using bumps parameters for each parameter object so that
 # a SasFitness can be used directly in bumps with the usual semantics.
-# The disadvantage of this technique is that we need to copy every parameter
-# back into the model each time the function is evaluated.  We could instead
+# The disadvantage of this technique is that we need to copy the parameters
+# back into the model each time the function is evaluated; SasFitness keeps
+# the values last copied so that only those which changed are set, and the
+# model is not evaluated again when none changed.  We could instead
 # define reference parameters for each sas parameter, but then we would not
 # be able to express constraints using python expressions in the usual way
 # from bumps, and would instead need to use string expressions.
@@ -121,6 +145,14 @@ class SasFitness(object):
         self.data = data
         if self.data.smearer is not None:
             self.data.smearer.model = self.model
+        # Parameter values last set in the model
+        self._model_values = {}
+        self._dirty = True
+        # Counts of update calls, of values set in the model and of
+        # evaluations of the model, for benchmarking
+        self.update_count = 0
+        self.setparam_count = 0
+        self.eval_count = 0
         self._define_pars()
         self._init_pars(kw)
         if initial_values is not None:
@@ -185,16 +217,25 @@ class SasFitness(object):
         return self._pars
 
     def update(self):
+        """
+        Set the parameter values which changed since the last update in the
+        model; the theory is recalculated only if some value changed.
+        """
+        self.update_count += 1
         for k, v in self._pars.items():
-            #print "updating",k,v,v.value
-            self.model.setParam(k, v.value)
-        self._dirty = True
+            value = v.value
+            if k not in self._model_values or self._model_values[k] != value:
+                self.model.setParam(k, value)
+                self._model_values[k] = value
+                self.setparam_count += 1
+                self._dirty = True
 
     def _recalculate(self):
         if self._dirty:
             self._residuals, self._theory \
                 = self.data.residuals(self.model.evalDistribution)
             self._dirty = False
+            self.eval_count += 1
 
     def numpoints(self):
         return np.sum(self.data.idx) # number of fitted points
@@ -252,6 +293,10 @@ class BumpsFit(FitEngine):
         """
         FitEngine.__init__(self)
         self.curr_thread = None
+        # Optimizer id and settings of this fit; by default the optimizer
+        # selected in the bumps configuration is used
+        self.optimizer = None
+        self.options = {}
 
     def fit(self, msg_q=None,
             q=None, handler=None, curr_thread=None,
@@ -276,7 +321,8 @@ class BumpsFit(FitEngine):
         problem.setp_hook = ParameterExpressions(models)
 
         # Run the fit
-        result = run_bumps(problem, handler, curr_thread)
+        result = run_bumps(problem, handler, curr_thread,
+                           fitter_id=self.optimizer, options=self.options)
         if handler is not None:
             handler.update_fit(last=True)
 
@@ -294,6 +340,7 @@ class BumpsFit(FitEngine):
             R.residuals = fitness.residuals()
             R.index = fitness.data.idx
             R.fitter_id = self.fitter_id
+            R.calls = fitness.eval_count
             # TODO: should scale stderr by sqrt(chisq/DOF) if dy is unknown
             R.success = result['success']
             if R.success:
@@ -321,7 +368,7 @@ class BumpsFit(FitEngine):
         else:
             return all_results
 
-def run_bumps(problem, handler, curr_thread):
+def run_bumps(problem, handler, curr_thread, fitter_id=None, options=None):
     def abort_test():
         if curr_thread is None: return False
         try: curr_thread.isquit()
@@ -331,7 +378,7 @@ def run_bumps(problem, handler, curr_thread):
             return True
         return False
 
-    fitclass, options = get_fitter()
+    fitclass, options = get_fitter(fitter_id, options)
     steps = options.get('steps', 0)
     if steps == 0:
         pop = options.get('pop', 0)*len(problem._parameters)
@@ -347,7 +394,10 @@ def run_bumps(problem, handler, curr_thread):
     fitdriver = fitters.FitDriver(fitclass, problem=problem,
                                   abort_test=abort_test, **options)
     omp_threads = int(os.environ.get('OMP_NUM_THREADS', '0'))
-    mapper = MPMapper if omp_threads == 1 else SerialMapper
+    # The workers of a FitPool are daemons, which cannot start the pool of
+    # MPMapper
+    in_pool = multiprocessing.current_process().daemon
+    mapper = MPMapper if omp_threads == 1 and not in_pool else SerialMapper
     fitdriver.mapper = mapper.start_mapper(problem, None)
     #import time; T0 = time.time()
     try:
@@ -0,0 +1,453 @@
+"""
+Batch fitting without the GUI: fit the same model to each data set of a list
+of files with bumps, and write a table of the results.
+
+From the command line::
+
+    sasview-batchfit -m sphere -p radius=40 -p scale=0.01 -f radius,scale \\
+        --qmin 0.005 --qmax 0.3 -o results.csv data/*.xml
+
+From python::
+
+    batch = BatchFit('sphere', pars={'radius': 40}, fitted=['radius'])
+    results = batch.fit(batch.load(paths))
+    batch.write('results.h5', results)
+"""
+from __future__ import print_function
+
+import argparse
+import csv
+import logging
+import os
+import re
+import sys
+
+import h5py
+import numpy as np
+
+from bumps.fitters import LevenbergMarquardtFit
+from sasmodels.core import load_model_info
+from sasmodels.sasview_model import load_custom_model, make_model_from_info
+
+from sas.sascalc.dataloader.loader import Loader
+from sas.sascalc.fit.AbstractFitEngine import FitHandler, FResult
+from sas.sascalc.fit.BumpsFitting import BumpsFit, get_fitter_settings
+from sas.sascalc.fit.fit_pool import FitPool
+from sas.sascalc.fit.qsmearing import smear_selection
+
+logger = logging.getLogger(__name__)
+
+try:
+    text_type = unicode # CRUFT: python 2 support
+except NameError:
+    text_type = str
+
+# Default optimizer, as in the fitting perspective
+DEFAULT_OPTIMIZER = LevenbergMarquardtFit.id
+
+# Name given to the model, by which the constraints refer to its parameters
+MODEL_NAME = 'M1'
+
+# Columns of the result table before the parameters
+COLUMNS = ('File', 'Entry', 'Title', 'Success', 'Chi2', 'Npts')
+
+_symbol_pattern = re.compile('([a-zA-Z_][a-zA-Z_0-9.]*)')
+
+
+class BatchFit(object):
+    """
+    Fits one model, with the same starting values, constraints and fit range,
+    to each of a list of data sets.
+
+    Each data set is an independent fit problem run by BumpsFit, so the fits
+    can run in a pool of processes (see FitPool).
+    """
+    def __init__(self, model, pars=None, fitted=None, constraints=None,
+                 bounds=None, optimizer=DEFAULT_OPTIMIZER, options=None,
+                 qmin=None, qmax=None, smearing=True, nproc=1, seed=None):
+        """
+        :param model: Name of a sasmodels model or model expression (such as
+            'sphere' or 'sphere@hardsphere'), or path to a custom model file
+        :param pars: Dictionary of the starting parameter values
+        :param fitted: Names of the fitted parameters
+        :param constraints: Dictionary of parameter expressions, such as
+            {'length': '2*radius'}; a constrained parameter is computed from
+            the fitted ones
+        :param bounds: Dictionary of the (min, max) bounds of the parameters
+        :param optimizer: Id of the bumps optimizer (Levenberg-Marquardt by
+            default, 'amoeba', 'de', 'dream', 'newton', ...)
+        :param options: Dictionary of bumps optimizer settings, such as
+            {'steps': 1000}
+        :param qmin: Low end of the fit range (optional)
+        :param qmax: High end of the fit range (optional)
+        :param smearing: Smear 1D models with the resolution of the data
+        :param nproc: Number of processes running the fits, None for one
+            per core
+        :param seed: Seed of the random numbers of the stochastic optimizers
+        """
+        self.model = model
+        self.pars = dict(pars) if pars is not None else {}
+        self.constraints = dict(constraints) if constraints is not None else {}
+        self.fitted = [name for name in (fitted if fitted is not None else [])
+                       if name not in self.constraints]
+        self.bounds = dict(bounds) if bounds is not None else {}
+        settings = get_fitter_settings()
+        if optimizer not in settings:
+            raise ValueError("unknown optimizer %r: use one of %s"
+                             % (optimizer, ", ".join(sorted(settings))))
+        self.optimizer = optimizer
+        self.options = dict(options) if options is not None else {}
+        for key in self.options:
+            if key not in settings[optimizer]:
+                raise ValueError("optimizer %s has no setting %r"
+                                 % (optimizer, key))
+        self.qmin = qmin
+        self.qmax = qmax
+        self.smearing = smearing
+        self.nproc = nproc
+        self.seed = seed
+        # (path, message) of the files which load could not read
+        self.load_errors = []
+        self._model_class = _load_model(model)
+        # Check the parameters and build the constraint expressions
+        self.make_model()
+
+    def make_model(self):
+        """
+        Return a new model set with the starting values and bounds
+        """
+        model = self._model_class()
+        model.name = MODEL_NAME
+        names = model.getParamList()
+        for name in (list(self.pars) + list(self.bounds) + self.fitted
+                     + list(self.constraints)):
+            if name not in names:
+                raise ValueError("parameter %s not available in model %s; "
+                                 "use one of [%s] instead"
+                                 % (name, self.model, ", ".join(names)))
+        for name, value in self.pars.items():
+            model.setParam(name, value)
+        for name, (low, high) in self.bounds.items():
+            details = list(model.details.get(name, ["", None, None]))
+            details[1:3] = [low, high]
+            model.details[name] = details
+        return model
+
+    def load(self, paths):
+        """
+        Load the data sets of the files
+
+        :param paths: Paths to the data files
+        :return: List of (path, entry, data) of the data sets of the files,
+            entry being the index of the data set in its file
+
+        A file which cannot be read is logged and skipped, so that it does
+        not stop the batch; the errors are listed in self.load_errors.
+        """
+        loader = Loader()
+        datasets = []
+        self.load_errors = []
+        for path in paths:
+            try:
+                loaded = loader.load(path)
+                if loaded is None:
+                    raise ValueError("no data found")
+            except Exception as exc:
+                logger.error("could not load %s: %s", path, exc)
+                self.load_errors.append((path, str(exc)))
+                continue
+            if not isinstance(loaded, list):
+                loaded = [loaded]
+            datasets.extend((path, entry, data)
+                            for entry, data in enumerate(loaded))
+        return datasets
+
+    def make_fitter(self, data, index=0):
+        """
+        Return a BumpsFit holding the fit problem of a data set
+        """
+        model = self.make_model()
+        # The parameters are referenced as M1.name in the expressions
+        names = model.getParamList()
+        constraints = [(name, _qualify(expr, names))
+                       for name, expr in sorted(self.constraints.items())]
+        pars = self.fitted + sorted(self.constraints)
+        smearer = None
+        if self.smearing and data.__class__.__name__ != 'Data2D':
+            smearer = smear_selection(data, model)
+        fitter = BumpsFit()
+        fitter.fitter_id = index
+        fitter.optimizer = self.optimizer
+        fitter.options = self.options
+        fitter.set_model(model, index, pars, data=data,
+                         constraints=constraints)
+        fitter.set_data(data=data, id=index, smearer=smearer,
+                        qmin=self.qmin, qmax=self.qmax)
+        fitter.select_problem_for_fit(id=index, value=1)
+        return fitter
+
+    def fit(self, datasets, handler=None):
+        """
+        Fit each data set
+
+        :param datasets: List of (path, entry, data) as returned by load
+        :param handler: FitHandler notified of the progress of the fits
+        :return: List of (path, entry, data, result) with the FResult of the
+            fit of each data set
+
+        A data set with no more points in the fit range than fitted
+        parameters cannot be fitted; it is not fitted and its result is
+        marked as failed, with the starting values and a chi2 and errors of
+        NaN.
+        """
+        if not self.fitted:
+            raise ValueError("no fitting parameters")
+        fitters = [self.make_fitter(data, index)
+                   for index, (_, _, data) in enumerate(datasets)]
+        results = [None]*len(fitters)
+        fitted = []
+        for index, fitter in enumerate(fitters):
+            arrange = fitter.fit_arrange_dict[index]
+            npts = int(np.sum(arrange.get_data().idx))
+            if npts > len(self.fitted):
+                fitted.append(index)
+                continue
+            path = datasets[index][0]
+            logger.error("could not fit %s: %d points in the fit range for "
+                         "%d parameters", path, npts, len(self.fitted))
+            results[index] = [_failed_result(arrange)]
+        handler = handler if handler is not None else FitHandler()
+        pool = FitPool(nproc=self.nproc, seed=self.seed)
+        for index, result in zip(fitted, pool.map(
+                [fitters[index] for index in fitted], handler=handler)):
+            results[index] = result
+        return [(path, entry, data, result[0])
+                for (path, entry, data), result in zip(datasets, results)]
+
+    def table(self, results):
+        """
+        Tabulate the results of the fits
+
+        :param results: List returned by fit
+        :return: (names, rows) with the column names and one row per fit;
+            the parameter values are followed by their uncertainty
+        """
+        par_names = self.fitted + sorted(self.constraints)
+        names = list(COLUMNS)
+        for name in par_names:
+            names.extend([name, "error on %s" % name])
+        rows = []
+        for path, entry, data, result in results:
+            title = getattr(data, 'title', '') or ''
+            row = [path, entry, title, bool(result.success),
+                   result.fitness, int(np.sum(result.index))]
+            for name in par_names:
+                index = result.param_list.index(name)
+                row.extend([result.pvec[index], result.stderr[index]])
+            rows.append(row)
+        return names, rows
+
+    def write(self, path, results):
+        """
+        Write the table of the results of the fits, as HDF5 if the file name
+        ends in .h5 or .hdf5 and as CSV otherwise
+        """
+        names, rows = self.table(results)
+        if os.path.splitext(path)[1].lower() in ('.h5', '.hdf5'):
+            write_hdf5(path, names, rows, model=self.model,
+                       optimizer=self.optimizer)
+        else:
+            write_csv(path, names, rows)
+
+
+def _failed_result(arrange):
+    """
+    Return the result of a fit problem which could not be fitted
+    """
+    model = arrange.get_model().model
+    data = arrange.get_data()
+    result = FResult(model=model, data=data, param_list=list(arrange.pars))
+    result.success = False
+    result.fitness = np.nan
+    result.pvec = np.array([model.getParam(name) for name in arrange.pars])
+    result.stderr = np.nan*np.ones(len(arrange.pars))
+    result.index = data.idx
+    result.calls = 0
+    return result
+
+
+def write_csv(path, names, rows):
+    """
+    Write a result table as CSV
+
+    :param path: Path of the file to write
+    :param names: Column names
+    :param rows: List of rows of values
+    """
+    # CRUFT: the csv module writes utf-8 encoded bytes in python 2
+    if sys.version_info[0] < 3:
+        csv_file = open(path, 'wb')
+        encode = lambda value: _to_text(value).encode('utf-8')
+    else:
+        csv_file = open(path, 'w', newline='', encoding='utf-8')
+        encode = _to_text
+    with csv_file:
+        writer = csv.writer(csv_file, lineterminator='\n')
+        writer.writerow([encode(name) for name in names])
+        for row in rows:
+            writer.writerow([repr(float(value)) if isinstance(value, float)
+                             else encode(value) for value in row])
+
+
+def write_hdf5(path, names, rows, **attrs):
+    """
+    Write a result table as a compound HDF5 dataset named 'results'
+
+    :param path: Path of the file to write
+    :param names: Column names
+    :param rows: List of rows of values
+    :param attrs: Attributes of the dataset
+    """
+    columns = list(zip(*rows)) if rows else [[] for _ in names]
+    dtypes = []
+    for name, column in zip(names, columns):
+        if name in ('File', 'Title'):
+            dtypes.append((name, h5py.special_dtype(vlen=text_type)))
+        elif name == 'Success':
+            dtypes.append((name, '?'))
+        elif name in ('Entry', 'Npts'):
+            dtypes.append((name, 'i8'))
+        else:
+            dtypes.append((name, 'f8'))
+    table = np.empty(len(rows), dtype=dtypes)
+    for (name, _), column in zip(dtypes, columns):
+        if name in ('File', 'Title'):
+            column = [_to_text(value) for value in column]
+        table[name] = column
+    with h5py.File(path, 'w') as h5_file:
+        dataset = h5_file.create_dataset('results', data=table)
+        for key, value in attrs.items():
+            dataset.attrs[key] = value
+
+
+def _to_text(value):
+    """
+    Convert a value to unicode text, decoding byte strings as utf-8
+    """
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'replace')
+    return text_type(value)
+
+
+def _load_model(name):
+    """
+    Return the model class of a model name, expression or file
+    """
+    if name.endswith('.py'):
+        return load_custom_model(name)
+    return make_model_from_info(load_model_info(name))
+
+
+def _qualify(expr, names):
+    """
+    Prefix the parameter names of an expression with the model name
+    """
+    return _symbol_pattern.sub(
+        lambda match: (MODEL_NAME + "." + match.group(1)
+                       if match.group(1) in names else match.group(1)),
+        expr)
+
+
+def _parse_assignments(items, parse=float):
+    """
+    Parse name=value command line arguments into a dictionary
+    """
+    assignments = {}
+    for item in items or []:
+        if '=' not in item:
+            raise ValueError("expected name=value, not %r" % item)
+        name, value = item.split('=', 1)
+        assignments[name.strip()] = parse(value.strip())
+    return assignments
+
+
+def _parse_value(value):
+    """
+    Parse a parameter value, which is a number unless it is a name
+    """
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _parse_bounds(value):
+    """
+    Parse min:max bounds
+    """
+    low, high = value.split(':')
+    return (float(low) if low else -np.inf, float(high) if high else np.inf)
+
+
+def main(argv=None):
+    """
+    Run a batch fit from the command line
+    """
+    parser = argparse.ArgumentParser(
+        description="Fit a model to each data set of a list of files.")
+    parser.add_argument('files', nargs='+', help="data files")
+    parser.add_argument('-m', '--model', required=True,
+                        help="model name, expression or custom model file")
+    parser.add_argument('-p', '--par', action='append', metavar='NAME=VALUE',
+                        help="starting value of a parameter")
+    parser.add_argument('-f', '--fit', required=True, metavar='NAMES',
+                        help="comma separated names of the fitted parameters")
+    parser.add_argument('-c', '--constraint', action='append',
+                        metavar='NAME=EXPR',
+                        help="expression of a parameter in terms of others")
+    parser.add_argument('-b', '--bounds', action='append',
+                        metavar='NAME=MIN:MAX', help="bounds of a parameter")
+    parser.add_argument('--optimizer', default=DEFAULT_OPTIMIZER,
+                        choices=sorted(get_fitter_settings()),
+                        help="bumps optimizer")
+    parser.add_argument('--option', action='append', metavar='NAME=VALUE',
+                        help="optimizer setting, such as steps=1000")
+    parser.add_argument('--qmin', type=float, help="low end of the fit range")
+    parser.add_argument('--qmax', type=float, help="high end of the fit range")
+    parser.add_argument('--no-smearing', action='store_true',
+                        help="ignore the resolution of 1D data")
+    parser.add_argument('-n', '--nproc', type=int, default=1,
+                        help="number of processes, 0 for one per core")
+    parser.add_argument('--seed', type=int,
+                        help="seed of the random numbers of the fits")
+    parser.add_argument('-o', '--output', default='batch_fit.csv',
+                        help="result table, .csv or .h5")
+    opts = parser.parse_args(argv)
+
+    try:
+        batch = BatchFit(
+            opts.model,
+            pars=_parse_assignments(opts.par, _parse_value),
+            fitted=[name.strip() for name in opts.fit.split(',')
+                    if name.strip()],
+            constraints=_parse_assignments(opts.constraint, str),
+            bounds=_parse_assignments(opts.bounds, _parse_bounds),
+            optimizer=opts.optimizer,
+            options=_parse_assignments(opts.option, str),
+            qmin=opts.qmin, qmax=opts.qmax,
+            smearing=not opts.no_smearing,
+            nproc=opts.nproc if opts.nproc > 0 else None,
+            seed=opts.seed)
+        datasets = batch.load(opts.files)
+    except Exception as exc:
+        parser.error(str(exc))
+    results = batch.fit(datasets)
+    batch.write(opts.output, results)
+    failed = sum(1 for result in results if not result[3].success)
+    print("%d fits written to %s, %d failed, %d files not loaded"
+          % (len(results), opts.output, failed, len(batch.load_errors)))
+    return 1 if failed or batch.load_errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -209,7 +209,8 @@ def eval_expressions():
 """%("\n    ".join(assignments),"\n    ".join(code))
 
     #print("Function: "+functiondef)
-    exec functiondef in globals,locals
+    # CRUFT: tuple form of exec for python 2 and 3
+    exec(functiondef, globals, locals)
     retfn = locals['eval_expressions']
 
     # Remove garbage added to globals by exec
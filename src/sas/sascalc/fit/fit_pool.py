@@ -0,0 +1,278 @@
+"""
+Run independent fit problems, such as the data sets of a batch fit, in a
+pool of worker processes.
+"""
+from __future__ import print_function
+
+import io
+import logging
+import multiprocessing
+import pickle
+import sys
+try:
+    import queue
+except ImportError: # CRUFT: python 2 support
+    import Queue as queue
+
+import numpy as np
+
+from sas.sascalc.fit.AbstractFitEngine import FitHandler
+
+logger = logging.getLogger(__name__)
+
+# Handler methods which are forwarded from the workers to the parent handler
+_HANDLER_CALLS = ('improvement', 'error', 'progress', 'finalize', 'abort',
+                  'stop', 'update_fit', 'set_result')
+
+# Queue of handler calls and fitters, set in each worker by _init_worker
+_messages = None
+_fitters = None
+
+
+class FitPool(object):
+    """
+    Runs the fit of each fitter (a FitEngine such as BumpsFit) and returns
+    the results in the order of the fitters.
+
+    With nproc > 1 the fits run in worker processes. The calls the fitters
+    make to their handler are sent back to the handler of the parent, and
+    the calling thread is polled for cancellation while the workers run;
+    when it is interrupted the workers are terminated. With nproc = 1 the
+    fits run one after the other in the calling thread, exactly as a single
+    fit does.
+
+    The models of the fit problems cannot always be pickled, so the workers
+    are forked with the fitters, and the models and data in the results are
+    replaced by those of the parent, set to the fitted parameter values.
+    Forking is only done on Linux, since forking a process which has
+    started other threads or a Cocoa application is unsafe on macOS; on
+    other platforms the fits run in the calling thread.
+
+    If a seed is given, the random number generator is seeded with
+    seed + index before the fit of fitters[index], so that the results of
+    the stochastic optimizers do not depend on the number of processes or
+    on the order in which the workers pick the fits.
+    """
+    def __init__(self, nproc=None, seed=None, poll_time=0.05):
+        """
+        :param nproc: Number of worker processes, or None for one per core
+        :param seed: Seed of the random numbers of the fits (optional)
+        :param poll_time: Seconds between checks for cancellation
+        """
+        if nproc is None:
+            nproc = multiprocessing.cpu_count()
+        self.nproc = max(1, int(nproc))
+        self.seed = seed
+        self.poll_time = poll_time
+
+    def map(self, fitters, handler=None, curr_thread=None, reset_flag=False):
+        """
+        Fit each of the fitters
+
+        :param fitters: List of fit engines, each holding its fit problem
+        :param handler: FitHandler notified of the progress of the fits
+        :param curr_thread: CalcThread running the fits; its isquit method
+            raises KeyboardInterrupt to cancel them
+        :param reset_flag: Restart each fit from its initial values
+        :return: List of the results of fitter.fit, one per fitter
+        """
+        fitters = list(fitters)
+        nproc = min(self.nproc, len(fitters))
+        context = _fork_context() if nproc > 1 else None
+        if context is None:
+            if nproc > 1:
+                logger.warning("fitting in one process: fork is not supported")
+            return [_fit(fitter, self._task_seed(index), handler, curr_thread,
+                         reset_flag)
+                    for index, fitter in enumerate(fitters)]
+
+        # The calls of a manager queue return once the message is stored,
+        # so the messages of a fit are all queued before its result arrives
+        manager = context.Manager()
+        messages = manager.Queue()
+        tasks = [(index, self._task_seed(index), reset_flag)
+                 for index in range(len(fitters))]
+        results = [None]*len(fitters)
+        # The forked workers inherit the fitters rather than unpickling them
+        pool = context.Pool(nproc, _init_worker, (messages, fitters))
+        try:
+            fits = pool.imap_unordered(_fit_task, tasks)
+            for _ in range(len(tasks)):
+                while True:
+                    try:
+                        index, result = fits.next(self.poll_time)
+                        break
+                    except multiprocessing.TimeoutError:
+                        _relay(messages, handler)
+                        if curr_thread is not None:
+                            curr_thread.isquit()
+                _relay(messages, handler)
+                results[index] = _SharedUnpickler(
+                    io.BytesIO(result), _shared_objects(fitters[index])).load()
+                if curr_thread is not None:
+                    curr_thread.update()
+        finally:
+            pool.terminate()
+            pool.join()
+            manager.shutdown()
+        return results
+
+    def _task_seed(self, index):
+        """
+        Seed of the random numbers of the fit of fitters[index]
+        """
+        return None if self.seed is None else self.seed + index
+
+
+class _RelayHandler(FitHandler):
+    """
+    Handler of a fit in a worker process, which queues its calls for the
+    handler of the parent process.
+    """
+    def __init__(self, index, messages):
+        self.index = index
+        self.messages = messages
+
+    def _send(self, name, *args, **kw):
+        self.messages.put((self.index, name, args, kw))
+
+    def improvement(self):
+        self._send('improvement')
+
+    def error(self, msg):
+        self._send('error', msg)
+
+    def progress(self, current, expected):
+        self._send('progress', current, expected)
+
+    def finalize(self):
+        self._send('finalize')
+
+    def abort(self):
+        self._send('abort')
+
+    def stop(self, msg):
+        self._send('stop', msg)
+
+    def update_fit(self, last=False):
+        self._send('update_fit', last=last)
+
+    def set_result(self, result=None):
+        self.result = result
+        self._send('set_result', result)
+
+
+def _relay(messages, handler):
+    """
+    Make the handler calls queued by the workers
+    """
+    while True:
+        try:
+            _, name, args, kw = messages.get_nowait()
+        except queue.Empty:
+            return
+        method = getattr(handler, name, None) if name in _HANDLER_CALLS else None
+        if method is not None:
+            method(*args, **kw)
+
+
+def _fit(fitter, seed, handler, curr_thread, reset_flag):
+    """
+    Run the fit of one fitter
+    """
+    if seed is not None:
+        np.random.seed(seed)
+    return fitter.fit(handler=handler, curr_thread=curr_thread,
+                      reset_flag=reset_flag)
+
+
+def _fork_context():
+    """
+    Return the multiprocessing context forking the worker processes, or None
+    if the platform cannot fork safely
+    """
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        return multiprocessing.get_context('fork')
+    except AttributeError: # CRUFT: python 2 always forks on linux
+        return multiprocessing
+    except ValueError:
+        return None
+
+
+def _shared_objects(fitter):
+    """
+    Return the objects which a forked worker shares with its parent: the
+    models and data of the fit problems of a fit engine, by their id, which
+    is the same in both processes.
+    """
+    objects = []
+    arranges = getattr(fitter, 'fit_arrange_dict', {})
+    for arrange in arranges.values():
+        model = arrange.get_model()
+        objects.extend([model, getattr(model, 'model', None)])
+        for data in arrange.data_list:
+            objects.extend([data, getattr(data, 'smearer', None),
+                            getattr(data, 'sas_data', None)])
+    return dict((id(obj), obj) for obj in objects if obj is not None)
+
+
+class _SharedPickler(pickle.Pickler):
+    """
+    Pickler of the result of a fit in a worker, which refers to the shared
+    objects by their id, with the parameter values of the models
+    """
+    def __init__(self, output, shared):
+        pickle.Pickler.__init__(self, output, pickle.HIGHEST_PROTOCOL)
+        self.shared = shared
+
+    def persistent_id(self, obj):
+        if id(obj) not in self.shared or self.shared[id(obj)] is not obj:
+            return None
+        if hasattr(obj, 'getParamList') and hasattr(obj, 'getParam'):
+            return id(obj), [(name, obj.getParam(name))
+                             for name in obj.getParamList()]
+        return id(obj), None
+
+
+class _SharedUnpickler(pickle.Unpickler):
+    """
+    Unpickler of the result of a fit in the parent, which replaces the
+    shared objects by those of the parent, set to the values of the worker
+    """
+    def __init__(self, data, shared):
+        pickle.Unpickler.__init__(self, data)
+        self.shared = shared
+
+    def persistent_load(self, pid):
+        key, pars = pid
+        obj = self.shared[key]
+        for name, value in (pars or []):
+            obj.setParam(name, value)
+        return obj
+
+
+def _init_worker(messages, fitters):
+    """
+    Set the queue of handler calls and the fitters of a worker process
+    """
+    global _messages, _fitters
+    _messages = messages
+    _fitters = fitters
+
+
+def _fit_task(task):
+    """
+    Run the fit of a task in a worker process; module level so that the
+    workers can run it
+
+    :return: the index of the task and its pickled result
+    """
+    index, seed, reset_flag = task
+    fitter = _fitters[index]
+    handler = _RelayHandler(index, _messages)
+    result = _fit(fitter, seed, handler, None, reset_flag)
+    output = io.BytesIO()
+    _SharedPickler(output, _shared_objects(fitter)).dump(result)
+    return index, output.getvalue()
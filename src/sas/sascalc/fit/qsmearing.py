@@ -181,6 +181,10 @@ def pinhole_smear(data, model=None):
 class PySmear2D(object):
     """
     Q smearing class for SAS 2d pinhole data
+
+    The resolution, with its grid of q points to calculate, is built on the
+    first evaluation and reused until the data, the accuracy or the index of
+    the points to smear (the mask and q range) change.
     """
 
     def __init__(self, data=None, model=None):
@@ -191,6 +195,10 @@ class PySmear2D(object):
         self.index = None
         self.coords = 'polar'
         self.smearer = True
+        # Cached resolution, normalized weights and the index they are for
+        self._resolution = None
+        self._weights = None
+        self._resolution_index = None
 
     def set_accuracy(self, accuracy='Low'):
         """
@@ -198,6 +206,8 @@ class PySmear2D(object):
 
         :param accuracy:  string
         """
+        if accuracy != self.accuracy:
+            self._resolution = None
         self.accuracy = accuracy
 
     def set_smearer(self, smearer=True):
@@ -215,6 +225,8 @@ class PySmear2D(object):
 
         :param data: DataLoader.Data_info type
         """
+        if data is not self.data:
+            self._resolution = None
         self.data = data
 
     def set_model(self, model=None):
@@ -233,17 +245,46 @@ class PySmear2D(object):
         """
         self.index = index
 
+    def get_resolution(self):
+        """
+        Return the Pinhole2D resolution of the data over the index, building
+        it only if the data, accuracy or index changed since the last call
+        """
+        if self._resolution is None or not self._same_index():
+            res = Pinhole2D(data=self.data, index=self.index,
+                            nsigma=3.0, accuracy=self.accuracy,
+                            coords=self.coords)
+            if res.q_calc_weights is not None:
+                # Normalized once so that smearing is a single dot product
+                self._weights = (res.q_calc_weights
+                                 / np.sum(res.q_calc_weights))
+            else:
+                self._weights = None
+            self._resolution = res
+            self._resolution_index = (np.array(self.index, copy=True)
+                                      if self.index is not None else None)
+        return self._resolution
+
+    def _same_index(self):
+        """
+        Check whether the index is the one of the cached resolution
+        """
+        if self.index is None or self._resolution_index is None:
+            return self.index is None and self._resolution_index is None
+        return np.array_equal(self.index, self._resolution_index)
+
     def get_value(self):
         """
         Over sampling of r_nbins times phi_nbins, calculate Gaussian weights,
         then find smeared intensity
         """
         if self.smearer:
-            res = Pinhole2D(data=self.data, index=self.index,
-                            nsigma=3.0, accuracy=self.accuracy,
-                            coords=self.coords)
+            res = self.get_resolution()
             val = self.model.evalDistribution(res.q_calc)
-            return res.apply(val)
+            if self._weights is None:
+                return val
+            return np.dot(self._weights,
+                          np.reshape(val, (len(self._weights), -1)))
         else:
             index = self.index if self.index is not None else slice(None)
             qx_data = self.data.qx_data[index]
@@ -251,4 +292,3 @@ class PySmear2D(object):
             q_calc = [qx_data, qy_data]
             val = self.model.evalDistribution(q_calc)
             return val
-
@@ -0,0 +1,134 @@
+"""
+Evaluate 2D models on one half of the detector, using I(qx, qy) = I(-qx, -qy)
+for the other half.
+"""
+import numpy as np
+
+from sas.sascalc.fit.MultiplicationModel import MultiplicationModel
+
+# Two points are mirrors of each other when their coordinates agree to this
+# fraction of the largest |qx| or |qy|
+MIRROR_RTOL = 1e-9
+
+
+def is_centrosymmetric(model):
+    """
+    Check whether I(qx, qy) = I(-qx, -qy) holds for the model at its current
+    parameters.
+
+    This is the case of the sasmodels models without magnetism (Friedel's
+    law), unless the model defines its own oriented intensity in python.
+    Models of unknown kind, such as the old style plugin models, are assumed
+    not to be symmetric.
+
+    :param model: sas model
+    :return: True if the model is centrosymmetric
+    """
+    if isinstance(model, MultiplicationModel):
+        return (is_centrosymmetric(model.p_model)
+                and is_centrosymmetric(model.s_model))
+    model_info = getattr(model, '_model_info', None)
+    if model_info is None:
+        return False
+    for name in getattr(model, 'magnetic_params', ()):
+        if name.endswith('_M0') and model.getParam(name) != 0.:
+            return False
+    return _is_info_centrosymmetric(model_info)
+
+
+def _is_info_centrosymmetric(model_info):
+    """
+    Check that neither the model nor its parts compute the oriented
+    intensity with a python function, which may be of any symmetry.
+    """
+    if model_info.composition:
+        return all(_is_info_centrosymmetric(part)
+                   for part in model_info.composition[1])
+    return not any(callable(getattr(model_info, name, None))
+                   for name in ('Iqxy', 'Iqac', 'Iqabc'))
+
+
+class SymmetricEvaluator(object):
+    """
+    Evaluates a 2D model on a set of (qx, qy) points, computing only one
+    point of each pair of points mirrored through q = 0 and copying its value
+    to the other.
+
+    The pairs are found once, when the evaluator is created, so the
+    evaluator can be reused for every evaluation on the same points.
+    """
+    def __init__(self, qx, qy, rtol=MIRROR_RTOL):
+        """
+        :param qx: array of qx values
+        :param qy: array of qy values, of the same length
+        :param rtol: tolerance on the coordinates of mirrored points,
+            relative to the largest coordinate
+        """
+        self.qx = np.asarray(qx, 'd')
+        self.qy = np.asarray(qy, 'd')
+        if self.qx.shape != self.qy.shape or self.qx.ndim != 1:
+            raise ValueError("qx and qy must be 1D arrays of the same length")
+        self.partner = _mirror_partners(self.qx, self.qy, rtol)
+        points = np.arange(len(self.qx))
+        # Compute unpaired points, and the first point of each pair
+        self.index = np.flatnonzero((self.partner < 0)
+                                    | (points <= self.partner))
+        self.mirrored = np.flatnonzero(self.partner > points)
+        self.qx_calc = self.qx[self.index]
+        self.qy_calc = self.qy[self.index]
+
+    @property
+    def fraction(self):
+        """
+        Fraction of the points which are evaluated
+        """
+        return len(self.index)/float(max(len(self.qx), 1))
+
+    def evaluate(self, fn):
+        """
+        Evaluate the model on all the points
+
+        :param fn: function of [qx, qy], such as model.evalDistribution
+        :return: array of the values of fn at (qx, qy)
+        """
+        values = np.asarray(fn([self.qx_calc, self.qy_calc]))
+        result = np.empty(len(self.qx), dtype=values.dtype)
+        result[self.index] = values
+        result[self.partner[self.mirrored]] = result[self.mirrored]
+        return result
+    __call__ = evaluate
+
+
+def _mirror_partners(qx, qy, rtol):
+    """
+    Find the point mirrored through q = 0 of each point
+
+    :return: array of the index of the partner of each point, -1 if none
+    """
+    partner = -np.ones(len(qx), dtype=int)
+    if len(qx) == 0:
+        return partner
+    scale = rtol*max(np.max(np.abs(qx)), np.max(np.abs(qy)))
+    if scale == 0. or not np.isfinite(scale):
+        return partner
+    kx = np.round(qx/scale).astype(np.int64)
+    ky = np.round(qy/scale).astype(np.int64)
+    # Sort the points together with their mirror images; a point and the
+    # image of its partner have the same key, and are alone with it
+    n = len(qx)
+    keys_x = np.hstack((kx, -kx))
+    keys_y = np.hstack((ky, -ky))
+    order = np.lexsort((keys_y, keys_x))
+    keys_x, keys_y = keys_x[order], keys_y[order]
+    new_key = np.ones(2*n + 1, dtype=bool)
+    new_key[1:-1] = (keys_x[1:] != keys_x[:-1]) | (keys_y[1:] != keys_y[:-1])
+    starts = np.flatnonzero(new_key[:-1])
+    sizes = np.diff(np.flatnonzero(new_key))
+    first = order[starts[sizes == 2]]
+    second = order[starts[sizes == 2] + 1]
+    # Each group holds one point and one image, the image of the other point
+    pair = (first < n) != (second < n)
+    point = np.where(first < n, first, second)[pair]
+    image = np.where(first < n, second, first)[pair] - n
+    partner[point] = image
+    return partner
@@ -29,6 +29,41 @@ Q_MAXIMUM = 10
 # Number of steps in the extrapolation
 INTEGRATION_NSTEPS = 1000
 
+def _integration_steps(x):
+    """
+    Widths of the integration steps of the invariant sums: ::
+
+        dx0 = (x1 - x0)/2
+        dxi = (xi+1 - xi-1)/2
+        dxn = (xn - xn-1)/2
+
+    :param x: q values, or 2D array of q values with one data set per row
+    :return: array of the shape of x
+    """
+    x = np.asarray(x, dtype=float)
+    dx = np.empty_like(x)
+    dx[..., 0] = (x[..., 1] - x[..., 0]) / 2
+    dx[..., -1] = (x[..., -1] - x[..., -2]) / 2
+    dx[..., 1:-1] = (x[..., 2:] - x[..., :-2]) / 2
+    return dx
+
+def _segment_steps(x, starts):
+    """
+    Widths of the integration steps (see _integration_steps) of data sets
+    concatenated in one array
+
+    :param x: concatenated q values
+    :param starts: index of the first point of each data set, which must all
+        have at least two points
+    :return: array of the shape of x
+    """
+    dx = np.empty_like(x)
+    dx[1:-1] = (x[2:] - x[:-2]) / 2
+    ends = np.append(starts[1:], len(x)) - 1
+    dx[starts] = (x[starts + 1] - x[starts]) / 2
+    dx[ends] = (x[ends] - x[ends - 1]) / 2
+    return dx
+
 class Transform(object):
     """
     Define interface that need to compute a function or an inverse
@@ -157,12 +192,12 @@ class Guinier(Transform):
 
         :param x: array of q-values
         """
-        p1 = np.array([self.dscale * math.exp(-((self.radius * q) ** 2 / 3)) \
-                          for q in x])
-        p2 = np.array([self.scale * math.exp(-((self.radius * q) ** 2 / 3))\
-                     * (-(q ** 2 / 3)) * 2 * self.radius * self.dradius for q in x])
-        diq2 = p1 * p1 + p2 * p2
-        return np.array([math.sqrt(err) for err in diq2])
+        x = np.asarray(x, dtype=float)
+        exp_term = np.exp(-((self.radius * x) ** 2 / 3))
+        p1 = self.dscale * exp_term
+        p2 = self.scale * exp_term * (-(x ** 2 / 3)) * 2 * self.radius \
+             * self.dradius
+        return np.sqrt(p1 * p1 + p2 * p2)
 
     def _guinier(self, x):
         """
@@ -181,7 +216,7 @@ class Guinier(Transform):
         if self.radius <= 0:
             msg = "Rg expected positive value, but got %s" % self.radius
             raise ValueError(msg)
-        value = np.array([math.exp(-((self.radius * i) ** 2 / 3)) for i in x])
+        value = np.exp(-((self.radius * np.asarray(x, dtype=float)) ** 2 / 3))
         return self.scale * value
 
 class PowerLaw(Transform):
@@ -231,11 +266,11 @@ class PowerLaw(Transform):
         Returns the error on I(q) for the given array of q-values
         :param x: array of q-values
         """
-        p1 = np.array([self.dscale * math.pow(q, -self.power) for q in x])
-        p2 = np.array([self.scale * self.power * math.pow(q, -self.power - 1)\
-                           * self.dpower for q in x])
-        diq2 = p1 * p1 + p2 * p2
-        return np.array([math.sqrt(err) for err in diq2])
+        x = np.asarray(x, dtype=float)
+        p1 = self.dscale * np.power(x, -self.power)
+        p2 = self.scale * self.power * np.power(x, -self.power - 1) \
+             * self.dpower
+        return np.sqrt(p1 * p1 + p2 * p2)
 
     def _power_law(self, x):
         """
@@ -258,7 +293,7 @@ class PowerLaw(Transform):
             msg = "scale expected positive value, but got %s" % self.scale
             raise ValueError(msg)
 
-        value = np.array([math.pow(i, -self.power) for i in x])
+        value = np.power(np.asarray(x, dtype=float), -self.power)
         return self.scale * value
 
 class Extrapolator(object):
@@ -279,13 +314,12 @@ class Extrapolator(object):
         self.data = data
         self.model = model
 
-        # Set qmin as the lowest non-zero value
+        # Set qmin as the first positive value
         self.qmin = Q_MINIMUM
-        for q_value in self.data.x:
-            if q_value > 0:
-                self.qmin = q_value
-                break
-        self.qmax = max(self.data.x)
+        positive = np.flatnonzero(np.asarray(self.data.x) > 0)
+        if len(positive) > 0:
+            self.qmin = self.data.x[positive[0]]
+        self.qmax = np.max(self.data.x)
 
     def fit(self, power=None, qmin=None, qmax=None):
         """
@@ -492,24 +526,7 @@ class InvariantCalculator(object):
             else:
                 gx = data.dxl * data.x
 
-            n = len(data.x) - 1
-            #compute the first delta q
-            dx0 = (data.x[1] - data.x[0]) / 2
-            #compute the last delta q
-            dxn = (data.x[n] - data.x[n - 1]) / 2
-            total = 0
-            total += gx[0] * data.y[0] * dx0
-            total += gx[n] * data.y[n] * dxn
-
-            if len(data.x) == 2:
-                return total
-            else:
-                #iterate between for element different
-                #from the first and the last
-                for i in range(1, n - 1):
-                    dxi = (data.x[i + 1] - data.x[i - 1]) / 2
-                    total += gx[i] * data.y[i] * dxi
-                return total
+            return np.sum(gx * data.y * _integration_steps(data.x))
 
     def _get_qstar_uncertainty(self, data):
         """
@@ -536,7 +553,7 @@ class InvariantCalculator(object):
         else:
             #Create error for data without dy error
             if data.dy is None:
-                dy = math.sqrt(data.y)
+                dy = np.sqrt(data.y)
             else:
                 dy = data.dy
             # Take care of smeared data
@@ -546,23 +563,8 @@ class InvariantCalculator(object):
             else:
                 gx = data.dxl * data.x
 
-            n = len(data.x) - 1
-            #compute the first delta
-            dx0 = (data.x[1] - data.x[0]) / 2
-            #compute the last delta
-            dxn = (data.x[n] - data.x[n - 1]) / 2
-            total = 0
-            total += (gx[0] * dy[0] * dx0) ** 2
-            total += (gx[n] * dy[n] * dxn) ** 2
-            if len(data.x) == 2:
-                return math.sqrt(total)
-            else:
-                #iterate between for element different
-                #from the first and the last
-                for i in range(1, n - 1):
-                    dxi = (data.x[i + 1] - data.x[i - 1]) / 2
-                    total += (gx[i] * dy[i] * dxi) ** 2
-                return math.sqrt(total)
+            terms = gx * dy * _integration_steps(data.x)
+            return math.sqrt(np.sum(terms * terms))
 
     def _get_extrapolated_data(self, model, npts=INTEGRATION_NSTEPS,
                                q_start=Q_MINIMUM, q_end=Q_MAXIMUM):
@@ -960,3 +962,163 @@ class InvariantCalculator(object):
                  + self._qstar_err * (v - v ** 2))
 
         return s, ds
+
+
+class BatchInvariantCalculator(object):
+    """
+    Compute the invariant, volume fraction and specific surface of many data
+    sets at once, over the q range of each data set.
+
+    The data sets are either a list of Data1D, which may have different
+    lengths, or a 2D array of intensities sharing one q grid. The results
+    are arrays with one value per data set; the volume fraction and surface
+    are NaN for the data sets where InvariantCalculator raises an error.
+
+    :note: Extrapolation is not supported: use InvariantCalculator for the
+        extrapolated invariant of a data set.
+    """
+    def __init__(self, data, background=0, scale=1, q=None, dy=None):
+        """
+        :param data: list of Data1D, or 2D array of intensities with one data
+            set per row
+        :param background: Background value, or one value per data set
+        :param scale: Scaling factor for I(q), or one value per data set
+        :param q: q values shared by the rows of a 2D data array
+        :param dy: Uncertainties of a 2D data array (optional)
+        """
+        if q is None:
+            x, y, dy, gx, starts = self._stack_data(data)
+        else:
+            x, y, dy, gx, starts = self._stack_array(q, data, dy)
+        n_sets = len(starts)
+        # Correct the data as InvariantCalculator does
+        lengths = np.diff(np.append(starts, len(x)))
+        scale = np.repeat(np.broadcast_to(scale, n_sets), lengths)
+        background = np.repeat(np.broadcast_to(background, n_sets), lengths)
+        y = scale * y - background
+        dy = np.fabs(scale) * dy
+        # Data sets without uncertainties get unit ones
+        no_errors = np.logical_and.reduceat(dy == 0, starts)
+        dy[np.repeat(no_errors, lengths)] = 1.0
+
+        steps = gx * _segment_steps(x, starts)
+        self._qstar = np.add.reduceat(steps * y, starts)
+        self._qstar_err = np.sqrt(np.add.reduceat((steps * dy) ** 2, starts))
+
+    @staticmethod
+    def _stack_data(data):
+        """
+        Concatenate the arrays of a list of Data1D
+
+        :return: x, y, dy, gx, starts: the concatenated x, y and dy, the
+            factor gx of y in the invariant sum, and the index of the first
+            point of each data set
+        """
+        if len(data) == 0:
+            raise ValueError("No data to compute the invariant of")
+        x, y, dy, gx = [], [], [], []
+        for item in data:
+            if not issubclass(item.__class__, LoaderData1D):
+                raise ValueError("Data must be of type DataLoader.Data1D")
+            n = len(item.x)
+            if n <= 1 or len(item.y) != n:
+                msg = "Length x and y must be equal"
+                msg += " and greater than 1; got x=%s, y=%s" % (n, len(item.y))
+                raise ValueError(msg)
+            item_x = np.asarray(item.x, dtype=float)
+            x.append(item_x)
+            y.append(np.asarray(item.y, dtype=float))
+            if item.dy is None or len(item.dy) != n:
+                dy.append(np.zeros(n))
+            else:
+                dy.append(np.asarray(item.dy, dtype=float))
+            # Take care of smeared data
+            if item.dxl is not None and item.dxl.all() > 0:
+                gx.append(item.dxl * item_x)
+            else:
+                gx.append(item_x * item_x)
+        starts = np.cumsum([0] + [len(item_x) for item_x in x[:-1]])
+        return (np.concatenate(x), np.concatenate(y), np.concatenate(dy),
+                np.concatenate(gx), starts)
+
+    @staticmethod
+    def _stack_array(q, data, dy=None):
+        """
+        Flatten a 2D array of data sets sharing the q values q
+
+        :return: x, y, dy, gx, starts as returned by _stack_data
+        """
+        q = np.asarray(q, dtype=float)
+        data = np.asarray(data, dtype=float)
+        if data.ndim != 2 or data.shape[1] != len(q) or len(q) <= 1:
+            msg = "The data must be a 2D array with one row per data set "
+            msg += "and %d > 1 columns; got shape %s" % (len(q), data.shape)
+            raise ValueError(msg)
+        n_sets = data.shape[0]
+        if dy is None:
+            dy = np.zeros(data.shape)
+        else:
+            dy = np.array(np.broadcast_to(dy, data.shape), dtype=float)
+        x = np.tile(q, n_sets)
+        starts = np.arange(n_sets) * len(q)
+        return x, data.ravel(), dy.ravel(), x * x, starts
+
+    def get_qstar(self):
+        """
+        :return: the invariant of each data set
+        """
+        return self._qstar.copy()
+
+    def get_qstar_with_error(self):
+        """
+        :return: the invariant of each data set, and its uncertainty
+        """
+        return self._qstar.copy(), self._qstar_err.copy()
+
+    def get_volume_fraction_with_error(self, contrast):
+        """
+        Compute the volume fraction of each data set and its uncertainty,
+        as InvariantCalculator.get_volume_fraction_with_error does.
+        The uncertainty is -1 where it can't be computed.
+
+        :param contrast: contrast value, or one value per data set
+        :return: V, dV = volume fractions, errors on the volume fractions
+        """
+        contrast = np.asarray(contrast, dtype=float)
+        if np.any(contrast <= 0):
+            raise ValueError("The contrast parameter must be greater than zero")
+        qstar = self._qstar
+        k = 1.e-8 * qstar / (2 * (math.pi * contrast) ** 2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            root = np.sqrt(1 - 4 * k)
+            volume1 = 0.5 * (1 - root)
+            volume2 = 0.5 * (1 + root)
+            volume = np.where((volume1 >= 0) & (volume1 <= 1), volume1,
+                              np.where((volume2 >= 0) & (volume2 <= 1),
+                                       volume2, np.nan))
+            # Invalid invariant or negative discriminant
+            volume[(qstar <= 0) | ~np.isfinite(root)] = np.nan
+
+            value = 1 - k * qstar
+            uncertainty = np.where(
+                value > 0,
+                np.fabs(0.5 * 4 * k * self._qstar_err / (2 * np.sqrt(value))),
+                -1.0)
+            uncertainty[np.isnan(volume)] = np.nan
+        return volume, uncertainty
+
+    def get_surface_with_error(self, contrast, porod_const):
+        """
+        Compute the specific surface of each data set and its uncertainty,
+        as InvariantCalculator.get_surface_with_error does.
+
+        :param contrast: contrast value, or one value per data set
+        :param porod_const: Porod constant, or one value per data set
+        :return: S, dS = specific surfaces, their uncertainties
+        """
+        v, dv = self.get_volume_fraction_with_error(contrast)
+        porod_const = np.asarray(porod_const, dtype=float)
+        s = 2 * math.pi * v * (1 - v) * porod_const / self._qstar
+        ds = porod_const * 2 * math.pi * ((dv - 2 * v * dv) / self._qstar
+                                          + self._qstar_err * (v - v ** 2))
+        return s, ds
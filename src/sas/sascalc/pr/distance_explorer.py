@@ -15,7 +15,15 @@ of D_max value. User picks a number of points and a range of
 distances, then get a series of outputs as a function of D_max
 over that range.
 """
-import sys
+import math
+import logging
+from multiprocessing import Pool
+
+import numpy as np
+
+from sas.sascalc.pr.invertor import _PI
+
+logger = logging.getLogger(__name__)
 
 
 class Results(object):
@@ -57,13 +65,18 @@ class DistExplorer(object):
         self._default_min = 0.8 * self.pr_state.d_max
         self._default_max = 1.2 * self.pr_state.d_max
 
-    def __call__(self, dmin=None, dmax=None, npts=10):
+    def __call__(self, dmin=None, dmax=None, npts=10, nproc=1):
         """
         Compute the outputs as a function of D_max.
 
+        The inversions for all the D_max values are done together (see
+        Invertor.invert_batch); if that fails, each D_max is inverted in
+        turn so that the failing values can be reported.
+
         :param dmin: minimum value for D_max
         :param dmax: maximum value for D_max
         :param npts: number of points for D_max
+        :param nproc: number of processes to share the D_max values between
 
         """
         # Take care of the defaults if needed
@@ -73,12 +86,46 @@ class DistExplorer(object):
         if dmax is None:
             dmax = self._default_max
 
+        d_values = [dmin + i * (dmax - dmin) / (npts - 1.0)
+                    for i in range(npts)]
+        try:
+            if nproc > 1 and npts > 1:
+                chunks = np.array_split(np.asarray(d_values),
+                                        min(nproc, npts))
+                pool = Pool(len(chunks))
+                try:
+                    outputs = pool.map(_explore,
+                                       [(self.pr_state, chunk)
+                                        for chunk in chunks])
+                finally:
+                    pool.close()
+                    pool.join()
+                output = dict((key, np.concatenate([part[key]
+                                                    for part in outputs]))
+                              for key in outputs[0])
+            else:
+                output = _explore((self.pr_state, d_values))
+        except Exception as exc:
+            logger.info("DistExplorer: batch inversion failed, "
+                        "inverting each D_max in turn\n %s", exc)
+            return self._explore_serial(d_values)
+
+        # Results object to store the computation outputs.
+        results = Results()
+        for key in ('d_max', 'bck', 'chi2', 'iq0', 'rg', 'pos', 'pos_err',
+                    'osc'):
+            getattr(results, key).extend(output[key].tolist())
+        return results
+
+    def _explore_serial(self, d_values):
+        """
+        Compute the outputs by inverting for each D_max in turn
+        """
         # Results object to store the computation outputs.
         results = Results()
 
         # Loop over d_max values
-        for i in range(npts):
-            d = dmin + i * (dmax - dmin) / (npts - 1.0)
+        for d in d_values:
             self.pr_state.d_max = d
             try:
                 out, cov = self.pr_state.invert(self.pr_state.nfunc)
@@ -98,10 +145,82 @@ class DistExplorer(object):
                 results.pos.append(pos)
                 results.pos_err.append(pos_err)
                 results.osc.append(osc)
-            except:
+            except Exception as exc:
                 # This inversion failed, skip this D_max value
                 msg = "ExploreDialog: inversion failed for "
-                msg += "D_max=%s\n %s" % (str(d), sys.exc_value)
+                msg += "D_max=%s\n %s" % (str(d), exc)
                 results.errors.append(msg)
 
         return results
+
+
+def _explore(args):
+    """
+    Invert for an array of D_max values and compute the outputs
+
+    :param args: (Invertor object, D_max values)
+    :return: dictionary of output arrays, keyed as the Results attributes
+    """
+    pr_state, d_max = args
+    d_max = np.asarray(d_max, dtype=float)
+    out, cov, chi2, bck = pr_state.invert_batch(d_max, pr_state.nfunc)
+    output = _pr_outputs(out, cov, d_max)
+    output.update(d_max=d_max, bck=bck, chi2=chi2)
+    return output
+
+def _pr_basis(d_max, nfunc, nslice):
+    """
+    Base functions on the nslice points r = d_max/nslice*i of each d_max.
+    On these points the argument pi*n*r/d_max of the base functions does
+    not depend on d_max, so they are scaled from a single table.
+
+    :return: r, basis, d_basis - arrays of shape (len(d_max), nslice) for r,
+        (len(d_max), nslice, nfunc) for the base functions and
+        (nslice, nfunc) for their derivatives d/dr
+    """
+    r = d_max[:, None] / (1.0 * nslice) * np.arange(nslice)
+    arg = _PI * np.arange(1, nfunc + 1) * np.arange(nslice)[:, None] \
+        / (1.0 * nslice)
+    sin_arg = np.sin(arg)
+    basis = 2.0 * r[:, :, None] * sin_arg
+    d_basis = 2.0 * (sin_arg + arg * np.cos(arg))
+    return r, basis, d_basis
+
+def _pr_outputs(out, cov, d_max):
+    """
+    I(q=0), Rg, positive fractions and oscillations of the P(r) of each
+    D_max, as computed by the Invertor methods of the same names
+
+    :param out: coefficients, one row per D_max
+    :param cov: covariance matrices of the coefficients
+    :param d_max: D_max values
+    :return: dictionary of output arrays
+    """
+    nfunc = out.shape[1]
+    coeffs = out[:, :, None]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # iq0 and rg are integrated over 101 slices
+        r, basis, _ = _pr_basis(d_max, nfunc, 101)
+        pr = np.matmul(basis, coeffs)[:, :, 0]
+        sum_pr = np.sum(pr, axis=1)
+        iq0 = 4.0 * math.pi * sum_pr / 101.0 * d_max
+        rg = np.sqrt(np.sum(r * r * pr, axis=1) / (2.0 * sum_pr))
+
+        # positive fraction and oscillations over 100 slices
+        r, basis, d_basis = _pr_basis(d_max, nfunc, 100)
+        pr = np.matmul(basis, coeffs)[:, :, 0]
+        pos = np.sum(np.where(pr > 0.0, pr, 0.0), axis=1) \
+            / np.sum(np.fabs(pr), axis=1)
+        dprdr = np.dot(out, d_basis.T)
+        osc = np.sqrt(np.sum(dprdr**2, axis=1) / np.sum(pr**2, axis=1)) \
+            / math.pi * d_max
+
+        # fraction one sigma above zero over 51 slices
+        r, basis, _ = _pr_basis(d_max, nfunc, 51)
+        pr = np.matmul(basis, coeffs)[:, :, 0]
+        variance = np.diagonal(cov, axis1=1, axis2=2)[:, :, None]
+        pr_var = np.matmul(basis**2, variance)[:, :, 0]
+        pr_err = np.where(pr_var > 0.0, np.sqrt(np.fabs(pr_var)), pr)
+        pos_err = np.sum(np.where(pr > pr_err, pr, 0.0), axis=1) \
+            / np.sum(np.fabs(pr), axis=1)
+    return dict(iq0=iq0, rg=rg, pos=pos, pos_err=pos_err, osc=osc)
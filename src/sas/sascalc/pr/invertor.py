@@ -55,6 +55,278 @@ def help():
 
     return info_txt
 
+## Value of pi used for the base functions by the C library
+_PI = 3.1416
+
+def _ortho(d_max, n, r):
+    """
+    Base functions B(r) = 2r sin(pi*nr/d), evaluated on arrays
+
+    :param d_max: maximum distance(s)
+    :param n: base function number(s), starting at 1
+    :param r: distance(s) to evaluate the base functions at
+    """
+    return 2.0 * r * np.sin(_PI * n * r / d_max)
+
+def _ortho_transformed(d_max, n, q):
+    """
+    Fourier transform of the nth base function, evaluated on arrays
+    """
+    q_d = q * d_max
+    return (8.0 * _PI**2 / q * d_max * np.sin(q_d)) * (n * (-1.0)**(n + 1)) \
+        / ((_PI * n)**2 - q_d**2)
+
+def _ortho_transformed_smeared(d_max, n, height, width, q, npts=21):
+    """
+    Slit-smeared Fourier transform of the nth base function, evaluated
+    for a single d_max on an array of q values and base function numbers.
+    Smearing follows Lake, Acta Cryst. (1967) 23, 191.
+
+    :return: array of shape (len(q), len(n))
+    """
+    fnpts = float(npts) - 1.0
+    z = height / fnpts * np.arange(npts) if height > 0 else np.zeros(1)
+    y = -width / 2.0 + width / fnpts * np.arange(npts) if width > 0 \
+        else np.zeros(1)
+    q = np.asarray(q)[:, None]
+    q_sq = ((q - y[None, :])**2)[:, None, :] + (z * z)[None, :, None]
+    q_sq = q_sq.reshape(len(q), -1)
+    is_used = q_sq > 0.0
+    q_smeared = np.sqrt(np.where(is_used, q_sq, 1.0))
+    # _ortho_transformed, with the n-independent factor computed once
+    q_d = q_smeared * d_max
+    factor = np.where(is_used, 8.0 * _PI**2 / q_smeared * d_max * np.sin(q_d),
+                      0.0)
+    n = np.asarray(n, dtype=float)
+    values = np.einsum('ij,ijn->in', factor,
+                       1.0 / ((_PI * n)**2 - (q_d**2)[:, :, None]))
+    return values * (n * (-1.0)**(n + 1)) / is_used.sum(axis=1)[:, None]
+
+def _pinv_batch(matrix, rcond=1e-15):
+    """
+    Pseudo-inverses of a stack of symmetric matrices, as given by
+    numpy.linalg.pinv; the well conditioned matrices are inverted directly
+
+    :return: pseudo-inverses, and estimates of the condition numbers
+        (inf for the matrices which are not full rank)
+    """
+    cond = np.full(len(matrix), np.inf)
+    inverse = np.empty_like(matrix)
+    try:
+        inverse[:] = np.linalg.inv(matrix)
+        # 1-norm condition number estimate
+        cond = np.abs(matrix).sum(axis=1).max(axis=1) \
+            * np.abs(inverse).sum(axis=1).max(axis=1)
+    except np.linalg.LinAlgError:
+        pass
+    is_bad = ~(cond * rcond < 1e-3)
+    if is_bad.any():
+        eig, vec = np.linalg.eigh(matrix[is_bad])
+        is_kept = eig > rcond * eig[:, -1:]
+        eig_inv = np.where(is_kept, 1.0 / np.where(is_kept, eig, 1.0), 0.0)
+        inverse[is_bad] = np.matmul(vec * eig_inv[:, None, :],
+                                    np.swapaxes(vec, 1, 2))
+        cond[is_bad] = np.where(is_kept.all(axis=1),
+                                eig[:, -1] / eig[:, 0], np.inf)
+    return inverse, cond
+
+def _lstsq_batch(a, b, max_cond=1e8):
+    """
+    Least square solutions of a stack of problems a[k] x = b[k].
+
+    The problems are solved through the normal equations, with the
+    pseudo-inverse of a_transposed * a, which is also the (unscaled)
+    covariance matrix of the solution. The problems for which
+    a_transposed * a is badly conditioned are solved by SVD of a,
+    as numpy.linalg.lstsq does with rcond=-1.
+
+    :param a: array of shape (K, M, N)
+    :param b: array of shape (K, M)
+    :param max_cond: largest condition number of a_transposed * a for
+        which the normal equations are used
+    :return: x, chi2, cov - solutions of shape (K, N), sums of the squared
+        residuals, -1 where the problem is rank deficient or M <= N, and
+        the pseudo-inverses of a_transposed * a
+    """
+    n_rows, n_cols = a.shape[1:]
+    a_t = np.swapaxes(a, 1, 2)
+    cov, cond = _pinv_batch(np.matmul(a_t, a))
+    x = np.matmul(cov, np.matmul(a_t, b[:, :, None]))[:, :, 0]
+    is_full = np.isfinite(cond)
+    is_bad = ~(cond < max_cond)
+    if is_bad.any():
+        u, s, vt = np.linalg.svd(a[is_bad], full_matrices=False)
+        is_kept = s > np.finfo(float).eps * s[:, :1]
+        s_inv = np.where(is_kept, 1.0 / np.where(is_kept, s, 1.0), 0.0)
+        x[is_bad] = np.einsum('knm,kn->km', vt, s_inv *
+                              np.einsum('kmn,km->kn', u, b[is_bad]))
+        is_full[is_bad] = is_kept.all(axis=1)
+    residuals = b - np.matmul(a, x[:, :, None])[:, :, 0]
+    is_full &= n_rows > n_cols
+    chi2 = np.where(is_full, np.sum(residuals**2, axis=1), -1.0)
+    return x, chi2, cov
+
+
+class RegularizationPath(object):
+    """
+    Least square solutions of the P(r) inversion of one data set and D_max
+    for any regularization constant alpha and any number of terms.
+
+    The data block of the A matrix of Invertor.lstsq does not depend on
+    alpha, and the matrix for n base functions is made of its first n
+    columns. It is factored once as Q R for the largest number of terms;
+    the problem for a given alpha and number of terms is then the small
+    least square problem ::
+
+        [R[:, :n]; sqrt(alpha) L[:, :n]] x = [Q^T b; 0]
+
+    where L is the regularization block for alpha=1. It has the same
+    solution as the full problem, whose chi^2 only differs by the part of
+    b out of the range of Q.
+
+    The solutions are for the state of the invertor when the path is
+    created.
+    """
+    def __init__(self, invertor, nfunc=10, nr=20):
+        """
+        :param invertor: Invertor object holding the data and D_max
+        :param nfunc: largest number of base functions
+        :param nr: number of r points to evaluate the 2nd derivative at for the reg. term.
+        """
+        t_0 = time.time()
+        if invertor.d_max <= 0:
+            msg = "Invertor: d_max must be greater than zero."
+            msg += "Correct that entry before proceeding"
+            raise ValueError(msg)
+        if invertor.is_valid() < 0:
+            msg = "Invertor: invalid data; incompatible data lengths."
+            raise RuntimeError(msg)
+        # Invertor used for the matrices and for the P(r) outputs,
+        # with unit regularization
+        self._pr = invertor.clone()
+        self._pr.alpha = 1.0
+        self.est_bck = invertor.est_bck
+        self.nfunc = nfunc
+        self.nr = nr
+
+        x, y, err = self._pr.x, self._pr.y, self._pr.err
+        npts = len(x)
+        a, _ = self._pr._get_matrix_batch(np.array([self._pr.d_max]),
+                                          nfunc, nr)
+        data, self._reg = a[0, :npts], a[0, npts:]
+        # Right hand sides for I(q) and for a unit background
+        accept = self._pr._get_accept_q()
+        rhs = np.where(accept, [y / err, 1.0 / err], 0.0).T
+        self._q, self._r = np.linalg.qr(data)
+        self._rhs = np.dot(self._q.T, rhs)
+        self._rhs_perp = rhs - np.dot(self._q, self._rhs)
+        # Size of the data and reg terms for n columns (see _get_reg_size)
+        self._sum_sig = np.cumsum(np.sum(data**2, axis=0))
+        self._sum_reg = np.cumsum(np.sum(self._reg**2, axis=0))
+        self.elapsed = time.time() - t_0
+
+    def solve(self, alpha, nfunc, background=0.0):
+        """
+        Solve the inversion problem, as Invertor.lstsq does for I(q)-background
+
+        :param alpha: regularization constant
+        :param nfunc: number of base functions to use.
+        :param background: background subtracted from I(q)
+
+        :return: out, cov, chi2, suggested_alpha, background - the
+            background is the estimated one if est_bck is set
+        """
+        ncol = nfunc + 1 if self.est_bck else nfunc
+        if ncol > self._r.shape[1]:
+            msg = "RegularizationPath: %d terms requested, " % nfunc
+            msg += "the path has %d" % self.nfunc
+            raise ValueError(msg)
+        npts = len(self._rhs_perp)
+        a = np.concatenate([self._r[:, :ncol],
+                            math.sqrt(math.fabs(alpha)) * self._reg[:, :ncol]])
+        b = np.zeros(len(a))
+        b[:len(self._r)] = self._rhs[:, 0] - background * self._rhs[:, 1]
+        c, chi2, _, _ = lstsq(a, b, rcond=-1)
+        # Sanity check
+        try:
+            perp = self._rhs_perp[:, 0] - background * self._rhs_perp[:, 1]
+            chi2 = float(chi2) + np.dot(perp, perp)
+        except TypeError:
+            chi2 = -1.0
+
+        if math.fabs(alpha) > 0:
+            suggested_alpha = self._sum_sig[ncol - 1] / self._sum_reg[ncol - 1]
+        else:
+            suggested_alpha = 0.0
+
+        cov = np.linalg.pinv(np.dot(a.T, a))
+        err = math.fabs(chi2 / float(npts - ncol)) * cov
+        if self.est_bck:
+            return (c[1:].copy(), err[1:, 1:].copy(), chi2, suggested_alpha,
+                    c[0])
+        return c, err, chi2, suggested_alpha, background
+
+    def estimate_alpha(self, nfunc, alpha):
+        """
+        Returns a reasonable guess for the regularization constant alpha,
+        as Invertor.estimate_alpha
+
+        :param nfunc: number of terms to use in the expansion.
+        :param alpha: current value of alpha
+
+        :return: alpha, message, elapsed
+        """
+        starttime = time.time()
+        background = 0.0 if self.est_bck else self._pr.background
+        # If the current alpha is zero, try another value
+        if alpha <= 0:
+            alpha = 0.0001
+
+        # Perform inversion to find the largest alpha
+        out, _, _, suggested_alpha, _ = self.solve(alpha, nfunc, background)
+        elapsed = self.elapsed + time.time() - starttime
+        initial_alpha = alpha
+        initial_peaks = self._pr.get_peaks(out)
+
+        # Try the inversion with the estimated alpha
+        out = self.solve(suggested_alpha, nfunc, background)[0]
+
+        # if more than one peak to start with
+        # just return the estimate
+        if self._pr.get_peaks(out) > 1:
+            return suggested_alpha, None, elapsed
+
+        # Look at smaller values
+        # We assume that for the suggested alpha, we have 1 peak
+        # if not, send a message to change parameters
+        best_alpha = suggested_alpha
+        found = False
+        for i in range(10):
+            alpha = (0.33) ** (i + 1) * suggested_alpha
+            out = self.solve(alpha, nfunc, background)[0]
+            if self._pr.get_peaks(out) > 1:
+                found = True
+                break
+            best_alpha = alpha
+
+        # If we didn't find a turning point for alpha and
+        # the initial alpha already had only one peak,
+        # just return that
+        if not found and initial_peaks == 1 and initial_alpha < best_alpha:
+            best_alpha = initial_alpha
+
+        # Check whether the size makes sense
+        message = ''
+        if not found:
+            message = None
+        elif best_alpha >= 0.5 * suggested_alpha:
+            # best alpha is too big, return a
+            # reasonable value
+            message = "The estimated alpha for your system is too large. "
+            message += "Try increasing your maximum distance."
+
+        return best_alpha, message, elapsed
+
 
 class Invertor(Cinvertor):
     """
@@ -524,6 +796,111 @@ class Invertor(Cinvertor):
 
         return self.out, self.cov
 
+    def invert_batch(self, d_max, nfunc=10, nr=20):
+        """
+        Perform the inversion for a set of D_max values at once.
+
+        This gives the same output as calling invert for each D_max, but the
+        base function matrices are built and the least square problems are
+        solved for all the D_max values together with numpy. The state of
+        the invertor is left unchanged.
+
+        :param d_max: array of D_max values
+        :param nfunc: number of base functions to use.
+        :param nr: number of r points to evaluate the 2nd derivative at for the reg. term.
+
+        :return: out, cov, chi2, background - the coefficients, their
+            covariance matrices, the chi^2 (-1 where it could not be
+            computed) and the background for each D_max
+        """
+        d_max = np.asarray(d_max, dtype=float)
+        if np.any(d_max <= 0.0):
+            msg = "Invertor: d_max must be greater than zero."
+            msg += "Correct that entry before proceeding"
+            raise ValueError(msg)
+        if self.is_valid() < 0:
+            msg = "Invertor: invalid data; incompatible data lengths."
+            raise RuntimeError(msg)
+        a, b = self._get_matrix_batch(d_max, nfunc, nr)
+
+        # Perform the inversion (least square fit), which also gives the
+        # inverse of inv_cov = a_transposed * a
+        c, chi2, cov = _lstsq_batch(a, b)
+        npts = len(self.x)
+        nfunc = a.shape[2]
+        err = np.fabs(chi2 / float(npts - nfunc))[:, None, None] * cov
+
+        if self.est_bck:
+            return c[:, 1:], err[:, 1:, 1:], chi2, c[:, 0]
+        background = np.ones(len(d_max)) * self.background
+        return c, err, chi2, background
+
+    def _get_matrix_batch(self, d_max, nfunc, nr):
+        """
+        Build the A matrices and b vectors of the least square problems
+        (see lstsq) for an array of D_max values
+
+        :return: a, b - arrays of shape (len(d_max), npts+nr, nfunc[+1])
+            and (len(d_max), npts+nr)
+        """
+        x = self.x
+        err = self.err
+        y = self.y
+        if not self.est_bck:
+            y = y - self.background
+        if np.any(err == 0.0):
+            msg = "Cinvertor.get_matrix: Some I(Q) points have no error."
+            raise RuntimeError("Invertor: could not invert I(Q)\n  %s" % msg)
+
+        # Check q-values against the user-defined range
+        accept = self._get_accept_q()
+
+        npts = len(x)
+        offset = 0 if self.est_bck else 1
+        if self.est_bck:
+            nfunc += 1
+        n = np.arange(nfunc) + offset
+        a = np.zeros([len(d_max), npts + nr, nfunc])
+        b = np.zeros([len(d_max), npts + nr])
+
+        # Fourier transformed base functions
+        if self.slit_width > 0 or self.slit_height > 0:
+            for k, d in enumerate(d_max):
+                a[k, :npts] = _ortho_transformed_smeared(
+                    d, n, self.slit_height, self.slit_width, x, 21)
+        else:
+            a[:, :npts] = _ortho_transformed(d_max[:, None, None],
+                                             n[None, None, :],
+                                             x[None, :, None])
+        a[:, :npts] /= err[:, None]
+        if self.est_bck:
+            a[:, :npts, 0] = 1.0 / err
+        a[:, :npts][:, ~accept] = 0.0
+
+        # Second derivative of P(r) for the regularization term, at
+        # r = d_max/nr*i; the d_max dependence cancels out
+        i_r = np.arange(nr)[:, None] / (1.0 * nr)
+        arg = math.pi * n * i_r
+        a[:, npts:] = np.sqrt(self.alpha) * 1.0 / nr * 2.0 * \
+            (2.0 * math.pi * n * np.cos(arg) +
+             (math.pi * n)**2 * i_r * np.sin(arg))
+        if self.est_bck:
+            a[:, npts:, 0] = 0.0
+
+        b[:, :npts] = np.where(accept, y / err, 0.0)
+        return a, b
+
+    def _get_accept_q(self):
+        """
+        :return: boolean array of the q points within the q range
+        """
+        accept = np.ones(len(self.x), dtype=bool)
+        if self.get_qmin() > 0:
+            accept &= self.x >= self.get_qmin()
+        if self.get_qmax() > 0:
+            accept &= self.x <= self.get_qmax()
+        return accept
+
     def estimate_numterms(self, isquit_func=None):
         """
         Returns a reasonable guess for the
@@ -536,23 +913,25 @@ class Invertor(Cinvertor):
         :return: number of terms, alpha, message
 
         """
-        from num_term import NTermEstimator
+        from .num_term import NTermEstimator
         estimator = NTermEstimator(self.clone())
         try:
             return estimator.num_terms(isquit_func)
-        except:
+        except Exception as exc:
             # If we fail, estimate alpha and return the default
             # number of terms
             best_alpha, _, _ = self.estimate_alpha(self.nfunc)
-            logger.warning("Invertor.estimate_numterms: %s" % sys.exc_value)
+            logger.warning("Invertor.estimate_numterms: %s" % exc)
             return self.nfunc, best_alpha, "Could not estimate number of terms"
 
-    def estimate_alpha(self, nfunc):
+    def estimate_alpha(self, nfunc, path=None):
         """
         Returns a reasonable guess for the
         regularization constant alpha
 
         :param nfunc: number of terms to use in the expansion.
+        :param path: RegularizationPath of this invertor to reuse, with
+            at least nfunc terms
 
         :return: alpha, message, elapsed
 
@@ -560,79 +939,13 @@ class Invertor(Cinvertor):
         message is a message for the user,
         elapsed is the computation time
         """
-        #import time
         try:
-            pr = self.clone()
-
-            # T_0 for computation time
-            starttime = time.time()
-            elapsed = 0
-
-            # If the current alpha is zero, try
-            # another value
-            if pr.alpha <= 0:
-                pr.alpha = 0.0001
-
-            # Perform inversion to find the largest alpha
-            out, _ = pr.invert(nfunc)
-            elapsed = time.time() - starttime
-            initial_alpha = pr.alpha
-            initial_peaks = pr.get_peaks(out)
-
-            # Try the inversion with the estimated alpha
-            pr.alpha = pr.suggested_alpha
-            out, _ = pr.invert(nfunc)
-
-            npeaks = pr.get_peaks(out)
-            # if more than one peak to start with
-            # just return the estimate
-            if npeaks > 1:
-                #message = "Your P(r) is not smooth,
-                #please check your inversion parameters"
-                message = None
-                return pr.suggested_alpha, message, elapsed
-            else:
-
-                # Look at smaller values
-                # We assume that for the suggested alpha, we have 1 peak
-                # if not, send a message to change parameters
-                alpha = pr.suggested_alpha
-                best_alpha = pr.suggested_alpha
-                found = False
-                for i in range(10):
-                    pr.alpha = (0.33) ** (i + 1) * alpha
-                    out, _ = pr.invert(nfunc)
-
-                    peaks = pr.get_peaks(out)
-                    if peaks > 1:
-                        found = True
-                        break
-                    best_alpha = pr.alpha
-
-                # If we didn't find a turning point for alpha and
-                # the initial alpha already had only one peak,
-                # just return that
-                if not found and initial_peaks == 1 and \
-                    initial_alpha < best_alpha:
-                    best_alpha = initial_alpha
-
-                # Check whether the size makes sense
-                message = ''
-
-                if not found:
-                    message = None
-                elif best_alpha >= 0.5 * pr.suggested_alpha:
-                    # best alpha is too big, return a
-                    # reasonable value
-                    message = "The estimated alpha for your system is too "
-                    message += "large. "
-                    message += "Try increasing your maximum distance."
-
-                return best_alpha, message, elapsed
-
-        except:
-            message = "Invertor.estimate_alpha: %s" % sys.exc_value
-            return 0, message, elapsed
+            if path is None:
+                path = RegularizationPath(self, nfunc)
+            return path.estimate_alpha(nfunc, self.alpha)
+        except Exception as exc:
+            message = "Invertor.estimate_alpha: %s" % exc
+            return 0, message, 0
 
     def to_file(self, path, npts=100):
         """
@@ -5,7 +5,7 @@ import numpy as np
 import copy
 import sys
 import logging
-from sas.sascalc.pr.invertor import Invertor
+from sas.sascalc.pr.invertor import Invertor, RegularizationPath
 
 logger = logging.getLogger(__name__)
 
@@ -67,12 +67,15 @@ class NTermEstimator(object):
         self.osc_list = []
         self.err_list = []
         self.alpha_list = []
+        if self.nterm_max > self.nterm_min:
+            # The data are factored once for all the numbers of terms
+            path = RegularizationPath(inver, self.nterm_max - 1)
         for k in range(self.nterm_min, self.nterm_max, 1):
             if self.isquit_func is not None:
                 self.isquit_func()
-            best_alpha, message, _ = inver.estimate_alpha(k)
+            best_alpha, message, _ = inver.estimate_alpha(k, path)
             inver.alpha = best_alpha
-            inver.out, inver.cov = inver.lstsq(k)
+            inver.out, inver.cov = path.solve(best_alpha, k)[:2]
             osc = inver.oscillations(inver.out)
             err = inver.get_pos_err(inver.out, inver.cov)
             if osc > 10.0:
@@ -86,35 +86,12 @@ class Data1D(PlotData1D, LoadData1D):
         else:
             result.dxl = np.zeros(len(self.x))
 
-        for i in range(len(self.x)):
-            result.x[i] = self.x[i]
-            if self.dx is not None and len(self.x) == len(self.dx):
-                result.dx[i] = self.dx[i]
-            if self.dxw is not None and len(self.x) == len(self.dxw):
-                result.dxw[i] = self.dxw[i]
-            if self.dxl is not None and len(self.x) == len(self.dxl):
-                result.dxl[i] = self.dxl[i]
-            
-            a = Uncertainty(self.y[i], dy[i]**2)
-            if isinstance(other, Data1D):
-                b = Uncertainty(other.y[i], dy_other[i]**2)
-                if other.dx is not None:
-                    result.dx[i] *= self.dx[i]
-                    result.dx[i] += (other.dx[i]**2)
-                    result.dx[i] /= 2
-                    result.dx[i] = math.sqrt(result.dx[i])
-                if result.dxl is not None and other.dxl is not None:
-                    result.dxl[i] *= self.dxl[i]
-                    result.dxl[i] += (other.dxl[i]**2)
-                    result.dxl[i] /= 2
-                    result.dxl[i] = math.sqrt(result.dxl[i])
-            else:
-                b = other
-            
-            output = operation(a, b)
-            result.y[i] = output.x
-            result.dy[i] = math.sqrt(math.fabs(output.variance))
-        return result
+        # x, y and dx were copied by copy_from_datainfo
+        if self.dxw is not None and len(self.x) == len(self.dxw):
+            result.dxw[:] = self.dxw
+        if self.dxl is not None and len(self.x) == len(self.dxl):
+            result.dxl[:] = self.dxl
+        return self._apply_operation(result, other, operation, dy, dy_other)
     
     def _perform_union(self, other):
         """
@@ -410,42 +387,10 @@ class Data2D(PlotData2D, LoadData2D):
         else:
             result.dqx_data = np.zeros(len(self.data))
             result.dqy_data = np.zeros(len(self.data))
-        for i in range(np.size(self.data)):
-            result.data[i] = self.data[i]
-            if self.err_data is not None and \
-                            np.size(self.data) == np.size(self.err_data):
-                result.err_data[i] = self.err_data[i]    
-            if self.dqx_data is not None:
-                result.dqx_data[i] = self.dqx_data[i]
-            if self.dqy_data is not None:
-                result.dqy_data[i] = self.dqy_data[i]
-            result.qx_data[i] = self.qx_data[i]
-            result.qy_data[i] = self.qy_data[i]
-            result.q_data[i] = self.q_data[i]
-            result.mask[i] = self.mask[i]
-            
-            a = Uncertainty(self.data[i], dy[i]**2)
-            if isinstance(other, Data2D):
-                b = Uncertainty(other.data[i], dy_other[i]**2)
-                if other.dqx_data is not None and \
-                        result.dqx_data is not None:
-                    result.dqx_data[i] *= self.dqx_data[i]
-                    result.dqx_data[i] += (other.dqx_data[i]**2)
-                    result.dqx_data[i] /= 2
-                    result.dqx_data[i] = math.sqrt(result.dqx_data[i])     
-                if other.dqy_data is not None and \
-                        result.dqy_data is not None:
-                    result.dqy_data[i] *= self.dqy_data[i]
-                    result.dqy_data[i] += (other.dqy_data[i]**2)
-                    result.dqy_data[i] /= 2
-                    result.dqy_data[i] = math.sqrt(result.dqy_data[i])
-            else:
-                b = other
-            
-            output = operation(a, b)
-            result.data[i] = output.x
-            result.err_data[i] = math.sqrt(math.fabs(output.variance))
-        return result
+        if result.dqx_data is not None:
+            result.dqx_data[:] = self.dqx_data
+            result.dqy_data[:] = self.dqy_data
+        return self._apply_operation(result, other, operation, dy, dy_other)
     
     def _perform_union(self, other):
         """
@@ -56,6 +56,8 @@ else:
 _QMAX_DEFAULT = 0.3
 _NPTS_DEFAULT = 50
 _Q1D_MIN = 0.001
+# Number of q points per call to the model in the computation thread
+_Q_BLOCK_SIZE = 256
 
 def add_icon(parent, frame):
     """
@@ -993,22 +995,20 @@ class SasGenPanel(ScrolledPanel, PanelBase):
         """
         out = np.empty(0)
         #s = time.time()
-        for ind in range(len(input[0])):
+        # Pass the q points in blocks so that sld2i can share them
+        # between threads, updating the status between blocks
+        for ind in range(0, len(input[0]), _Q_BLOCK_SIZE):
+            if update is not None:
+                update()
+                time.sleep(0.001)
+            block = slice(ind, ind + _Q_BLOCK_SIZE)
             if self.is_avg:
-                if ind % 1 == 0 and update is not None:
-                    update()
-                    time.sleep(0.1)
-                inputi = [input[0][ind:ind + 1], [], input[2][ind:ind + 1]]
+                inputi = [input[0][block], [], input[2][block]]
                 outi = self.model.run(inputi)
-                out = np.append(out, outi)
             else:
-                if ind % 50 == 0  and update is not None:
-                    update()
-                    time.sleep(0.001)
-                inputi = [input[0][ind:ind + 1], input[1][ind:ind + 1],
-                          input[2][ind:ind + 1]]
+                inputi = [input[0][block], input[1][block], input[2][block]]
                 outi = self.model.runXY(inputi)
-                out = np.append(out, outi)
+            out = np.append(out, outi)
         #print time.time() - s
         if self.is_avg or self.is_avg is None:
             self._draw1D(out)
@@ -2,16 +2,7 @@
 import sys
 import time
 from sas.sascalc.data_util.calcthread import CalcThread
-
-def map_getattr(classInstance, classFunc, *args):
-    """
-    Take an instance of a class and a function name as a string.
-    Execute class.function and return result
-    """
-    return  getattr(classInstance, classFunc)(*args)
-
-def map_apply(arguments):
-    return apply(arguments[0], arguments[1:])
+from sas.sascalc.fit.fit_pool import FitPool
 
 class FitThread(CalcThread):
     """Thread performing the fit """
@@ -27,7 +18,9 @@ class FitThread(CalcThread):
                  updatefn=None,
                  yieldtime=0.03,
                  worktime=0.03,
-                 reset_flag=False):
+                 reset_flag=False,
+                 nproc=1,
+                 seed=None):
         CalcThread.__init__(self, completefn, updatefn, yieldtime, worktime)
         self.handler = handler
         self.fitter = fn
@@ -39,6 +32,10 @@ class FitThread(CalcThread):
         self.updatefn = updatefn
         #Relative error desired in the sum of squares.
         self.reset_flag = reset_flag
+        #Number of processes running the fits, None for one per core
+        self.nproc = nproc
+        #Seed of the random numbers of the stochastic optimizers
+        self.seed = seed
 
     def isquit(self):
         """
@@ -57,25 +54,9 @@ class FitThread(CalcThread):
         """
         msg = ""
         try:
-            import copy
-            list_handler = []
-            list_curr_thread = []
-            list_reset_flag = []
-            list_map_get_attr = []
-            list_fit_function = []
-            list_q = []
-            for i in range(len(self.fitter)):
-                list_handler.append(self.handler)
-                list_q.append(None)
-                list_curr_thread.append(self)
-                list_reset_flag.append(self.reset_flag)
-                list_fit_function.append('fit')
-                list_map_get_attr.append(map_getattr)
-            #from multiprocessing import Pool
-            inputs = zip(list_map_get_attr, self.fitter, list_fit_function,
-                         list_q, list_q, list_handler, list_curr_thread,
-                         list_reset_flag)
-            result = map(map_apply, inputs)
+            pool = FitPool(nproc=self.nproc, seed=self.seed)
+            result = pool.map(self.fitter, handler=self.handler,
+                              curr_thread=self, reset_flag=self.reset_flag)
 
             self.complete(result=result,
                           batch_inputs=self.batch_inputs,
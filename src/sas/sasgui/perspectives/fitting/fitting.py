@@ -102,6 +102,10 @@ class Plugin(PluginBase):
         self.closed_page_dict = {}
         ## Relative error desired in the sum of squares (float)
         self.batch_reset_flag = True
+        ## Number of processes running the fits of a batch; the worker
+        ## processes are forked from the GUI, so this is opt-in (None for
+        ## one per core)
+        self.batch_nproc = 1
         #List of selected data
         self.selected_data_list = []
         ## list of slicer panel created to display slicer parameters and results
@@ -1112,7 +1116,8 @@ class Plugin(PluginBase):
                                  batch_outputs=batch_outputs,
                                  page_id=list_page_id,
                                  completefn=self._batch_fit_complete,
-                                 reset_flag=self.batch_reset_flag)
+                                 reset_flag=self.batch_reset_flag,
+                                 nproc=self.batch_nproc)
         else:
             ## Perform more than 1 fit at the time
             calc_fit = FitThread(handler=handler,
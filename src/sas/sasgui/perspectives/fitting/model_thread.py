@@ -9,13 +9,14 @@ import numpy as np
 
 from sas.sascalc.data_util.calcthread import CalcThread
 from sas.sascalc.fit.MultiplicationModel import MultiplicationModel
+from sas.sascalc.fit.symmetry import SymmetricEvaluator, is_centrosymmetric
 
 class Calc2D(CalcThread):
     """
     Compute 2D model
-    This calculation assumes a 2-fold symmetry of the model
-    where points are computed for one half of the detector
-    and I(qx, qy) = I(-qx, -qy) is assumed.
+    For centrosymmetric models the unsmeared calculation is done for one
+    half of the detector only, and I(qx, qy) = I(-qx, -qy) is used for the
+    points of the other half.
     """
     def __init__(self, data, model, smearer, qmin, qmax, page_id,
                  state=None,
@@ -83,6 +84,11 @@ class Calc2D(CalcThread):
             # Calculate smeared Intensity
             #(by Gaussian averaging): DataLoader/smearing2d/Smearer2D()
             value = fn.get_value()
+        elif is_centrosymmetric(self.model):
+            # calculation w/o smearing, on one half of the detector
+            evaluator = SymmetricEvaluator(self.data.qx_data[index_model],
+                                           self.data.qy_data[index_model])
+            value = evaluator.evaluate(self.model.evalDistribution)
         else:
             # calculation w/o smearing
             value = self.model.evalDistribution([
@@ -20,7 +20,6 @@ their distribution as a function of D_max.
 import wx
 import numpy as np
 import logging
-import sys
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +32,7 @@ from sas.sasgui.plottools.PlotPanel import PlotPanel
 from sas.sasgui.plottools import Data1D as Model1D
 from sas.sasgui.guiframe.gui_style import GUIFRAME_ID
 from sas.sasgui.plottools.plottables import Graph
+from sas.sascalc.pr.distance_explorer import DistExplorer
 
 from pr_widgets import PrTextCtrl
 
@@ -388,38 +388,19 @@ class ExploreDialog(wx.Dialog):
         if content is None:
             return
 
+        # Invert for all the D_max values at once
+        self.pr_state.nfunc = self.nfunc
+        explorer = DistExplorer(self.pr_state)
+        explored = explorer(content.dmin, content.dmax, content.npts)
+        for msg in explored.errors:
+            # These inversions failed, their D_max values are skipped
+            logger.error(msg)
+
         # Results object to store the computation outputs.
         results = Results()
-
-        # Loop over d_max values
-        for i in range(content.npts):
-            temp = (content.dmax - content.dmin) / (content.npts - 1.0)
-            d = content.dmin + i * temp
-
-            self.pr_state.d_max = d
-            try:
-                out, cov = self.pr_state.invert(self.nfunc)
-
-                # Store results
-                iq0 = self.pr_state.iq0(out)
-                rg = self.pr_state.rg(out)
-                pos = self.pr_state.get_positive(out)
-                pos_err = self.pr_state.get_pos_err(out, cov)
-                osc = self.pr_state.oscillations(out)
-
-                results.d_max.append(self.pr_state.d_max)
-                results.bck.append(self.pr_state.background)
-                results.chi2.append(self.pr_state.chi2)
-                results.iq0.append(iq0)
-                results.rg.append(rg)
-                results.pos.append(pos)
-                results.pos_err.append(pos_err)
-                results.osc.append(osc)
-            except:
-                # This inversion failed, skip this D_max value
-                msg = "ExploreDialog: inversion failed "
-                msg += "for D_max=%s\n%s" % (str(d), sys.exc_value)
-                logger.error(msg)
+        for key in ('d_max', 'bck', 'chi2', 'iq0', 'rg', 'pos', 'pos_err',
+                    'osc'):
+            getattr(results, key).extend(getattr(explored, key))
 
         self.results = results
 
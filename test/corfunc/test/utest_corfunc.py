@@ -10,6 +10,8 @@ import time
 import numpy as np
 
 from sas.sascalc.corfunc.corfunc_calculator import CorfuncCalculator
+from sas.sascalc.corfunc.corfunc_calculator import BatchCorfuncCalculator
+from sas.sascalc.corfunc.transform_thread import FourierThread
 from sas.sascalc.dataloader.data_info import Data1D
 
 
@@ -103,6 +105,41 @@ class TestCalculator(unittest.TestCase):
         #self.assertLess(compare(gamma3.y[gamma3.x<=200.], gamma3_out), 1e-10)
         #self.assertLess(compare(idf.y[idf.x<=200.], idf_out), 1e-10)
 
+    def test_porod_tail(self):
+        """
+        Test the transforms computed with an analytic Porod tail against those
+        of the extrapolation to 100*Qmax
+        """
+        params, extrapolation, s2 = self.calculator.compute_extrapolation(
+            padding=2)
+        self.assertAlmostEqual(params['K'], 4.44660e-5, places=10)
+        self.assertEqual(len(extrapolation.x), 286)
+        self.calculator.compute_transform(extrapolation, 'fourier',
+            completefn=self.transform_callback)
+        while (self.calculator.transform_isrunning() or
+               self.transformation is None):
+            time.sleep(0.001)
+
+        x_out = np.loadtxt(find("gamma1_out.txt")).T[1]
+        for transform, y_out in zip(self.transformation, self.results):
+            np.testing.assert_allclose(transform.x, x_out, rtol=1e-5)
+            self.assertLess(max(abs(transform.y - y_out)),
+                            1e-5*max(abs(y_out)))
+        self.extract_params()
+
+    def test_porod_tail_padding(self):
+        """
+        Test the Porod tail cannot start inside the measured q range
+        """
+        for padding in (0, 0.5, -1, float('nan')):
+            self.assertRaises(ValueError,
+                              self.calculator.compute_extrapolation,
+                              padding=padding)
+        # The extrapolated data covers the measured q range
+        dq = self.data.x[1] - self.data.x[0]
+        _, extrapolation, _ = self.calculator.compute_extrapolation(padding=1)
+        self.assertGreaterEqual(len(extrapolation.x)*dq, self.data.x[-1])
+
     # Ensure tests are ran in correct order;
     # Each test depends on the one before it
     def test_calculator(self):
@@ -115,6 +152,64 @@ class TestCalculator(unittest.TestCase):
                 self.fail("{} failed ({}: {})".format(test, type(e), e))
 
 
+class TestBatchCalculator(unittest.TestCase):
+
+    def setUp(self):
+        data = load_data()
+        self.q = data.x
+        rng = np.random.RandomState(0)
+        frames = [data.y*(1 + 0.1*i)*(1 + 0.01*rng.randn(len(data.x)))
+                  for i in range(3)]
+        # A frame with a diffuse interface, fitted with sigma > 0
+        frames[2] = (frames[2] - 0.3)*np.exp(-(20*data.x)**2) + 0.3
+        self.frames = np.array(frames)
+
+    def test_batch(self):
+        batch = BatchCorfuncCalculator(self.q, self.frames, lowerq=0.013,
+            upperq=(0.15, 0.24))
+        params, qs, iqs = batch.compute_extrapolation()
+        xs, gamma1, gamma3, idf = batch.compute_transform(qs, iqs)
+        table = batch.extract_parameters(xs, gamma1)
+        self.assertEqual(table.dtype.names, batch.PARAMETERS)
+        self.assertEqual(len(table), 3)
+        self.assertGreater(params['sigma'][2], 0)
+
+        for i, frame in enumerate(self.frames):
+            calculator = CorfuncCalculator(data=Data1D(x=self.q, y=frame),
+                lowerq=0.013, upperq=(0.15, 0.24))
+            self.assertAlmostEqual(batch.background[i],
+                                   calculator.background, places=8)
+            expected, extrapolation, _ = calculator.compute_extrapolation()
+            for name in ('A', 'B', 'K'):
+                self.assertLess(abs(params[name][i]/expected[name] - 1), 1e-6)
+            np.testing.assert_allclose(iqs[i], extrapolation.y, rtol=1e-6)
+
+            thread = FourierThread(calculator._data, extrapolation,
+                calculator.background, completefn=self.transform_callback)
+            thread.compute()
+            transform1, transform3, _ = self.transformation
+            np.testing.assert_allclose(gamma1[i], transform1.y, atol=1e-6)
+            np.testing.assert_allclose(gamma3[i], transform3.y, atol=1e-6)
+            expected = calculator.extract_parameters(transform1)
+            for name in batch.PARAMETERS:
+                self.assertAlmostEqual(table[name][i], expected[name], places=4)
+
+    def transform_callback(self, transforms):
+        self.transformation = transforms
+
+    def test_no_parameters(self):
+        batch = BatchCorfuncCalculator(self.q, self.frames, lowerq=0.013,
+            upperq=(0.15, 0.24))
+        xs = np.linspace(0, 200, 101)
+        # A monotonic correlation function has no parameters
+        table = batch.extract_parameters(xs, np.array([np.exp(-xs/50),
+            np.cos(xs/10)*np.exp(-xs/50)]))
+        self.assertTrue(np.all(np.isnan(table[0].tolist())))
+        self.assertFalse(np.isnan(table['max'][1]))
+        self.assertRaises(ValueError, BatchCorfuncCalculator, self.q,
+            self.frames[:, 1:], 0.013, (0.15, 0.24))
+
+
 def load_data(filename="98929.txt"):
     data = np.loadtxt(find(filename), dtype=np.float64)
     q = data[:,0]
@@ -0,0 +1,110 @@
+from sas.sascalc.file_converter.batch_converter import BatchConverter
+from sas.sascalc.file_converter.ascii2d_loader import ASCII2DLoader
+
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+
+import h5py
+import numpy as np
+
+
+class batch_converter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.output = os.path.join(self.tmp_dir, "stack.h5")
+        self.rng = np.random.RandomState(0)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _path(self, filename):
+        return os.path.join(self.tmp_dir, filename)
+
+    def _write_otoko(self, header, filename, data):
+        with open(self._path(header), "w") as header_file:
+            header_file.write("header line 1\nheader line 2\n")
+            header_file.write("%d %d 1 0 0 0 0 0 0 0\n%s\n"
+                              % (data.shape[1], data.shape[0], filename))
+        data.astype('>f4').tofile(self._path(filename))
+        return self._path(header)
+
+    def _write_ascii2d(self, filename, intensity, error):
+        # ISIS 2D ASCII: 3 qx points, 2 qy points, intensity and error data
+        lines = ["header", "qx", "qy", "I", "0", "3", "0.1 0.2 0.3", "2",
+                 "0.5 0.6", "3 2 1", "3"]
+        lines.append(" ".join("%.6g" % v for v in intensity))
+        lines.append(" ".join("%.6g" % v for v in error))
+        with open(self._path(filename), "w") as ascii_file:
+            ascii_file.write("\n".join(lines) + "\n")
+        return self._path(filename)
+
+    def test_otoko(self):
+        q = self.rng.rand(1, 30).astype(np.float32)
+        frames = self.rng.randn(12, 30).astype(np.float32)
+        q_path = self._write_otoko("Q.hdr", "Q.bin", q)
+        data_path = self._write_otoko("I.hdr", "I.bin", frames)
+        converter = BatchConverter(metadata={'title': 'stack'},
+                                   compression='gzip', chunk_frames=5)
+        converted = converter.convert_otoko(q_path, data_path, self.output,
+                                            frames=range(1, 12, 2))
+        self.assertEqual(converted, [1, 3, 5, 7, 9, 11])
+        with h5py.File(self.output, 'r') as f:
+            sasdata = f['sasentry01/sasdata01']
+            self.assertEqual(sasdata['I'].shape, (6, 30))
+            self.assertEqual(sasdata['I'].chunks, (5, 30))
+            self.assertEqual(sasdata['I'].compression, 'gzip')
+            np.testing.assert_array_equal(sasdata['I'][()], frames[1::2])
+            np.testing.assert_array_equal(sasdata['Idev'][()], 0)
+            np.testing.assert_array_equal(sasdata['Q'][()], q[0])
+            np.testing.assert_array_equal(sasdata['frame_number'][()],
+                                          converted)
+            self.assertEqual(f['sasentry01/title'][0].decode(), 'stack')
+        self.assertRaises(ValueError, converter.convert_otoko, q_path,
+                          data_path, self.output, frames=[12])
+
+    def test_bsl(self):
+        frames = self.rng.randn(7, 4, 6).astype(np.float32)
+        with open(self._path("X01000.HDR"), "w") as header_file:
+            header_file.write("header line 1\nheader line 2\n")
+            header_file.write("6 4 7 0 0 0 0 0 0 0\nX01001.HDR\n")
+        frames.astype('>f4').tofile(self._path("X01001.HDR"))
+        BatchConverter().convert_bsl(self._path("X01000.HDR"), self.output)
+        with h5py.File(self.output, 'r') as f:
+            sasdata = f['sasentry01/sasdata01']
+            self.assertEqual(sasdata.attrs['I_axes'], '.,Q,Q')
+            np.testing.assert_array_equal(sasdata['I'][()], frames)
+            self.assertEqual(sasdata['Qx'].shape, (4, 6))
+
+    def test_ascii2d_pool(self):
+        intensities = self.rng.rand(5, 6)
+        errors = 0.1 * intensities
+        paths = [self._write_ascii2d("frame%d.dat" % i, intensities[i],
+                                     errors[i]) for i in range(5)]
+        BatchConverter(nproc=2).convert_ascii2d(paths, self.output)
+        expected = [ASCII2DLoader(path).load() for path in paths]
+        with h5py.File(self.output, 'r') as f:
+            sasdata = f['sasentry01/sasdata01']
+            # 2 rows of qy by 3 columns of qx
+            self.assertEqual(sasdata['I'].shape, (5, 2, 3))
+            for i, data in enumerate(expected):
+                np.testing.assert_array_equal(sasdata['I'][i].ravel(),
+                                              data.data)
+                np.testing.assert_array_equal(sasdata['Idev'][i].ravel(),
+                                              data.err_data)
+            np.testing.assert_allclose(sasdata['Qy'][:, 0], [0.5, 0.6])
+
+        # Frames must share their q axes
+        with open(paths[0]) as ascii_file:
+            lines = ascii_file.read().replace("0.5 0.6", "0.5 0.7")
+        with open(self._path("frame9.dat"), "w") as ascii_file:
+            ascii_file.write(lines)
+        self.assertRaises(ValueError, BatchConverter().convert_ascii2d,
+                          paths + [self._path("frame9.dat")], self.output)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+from sas.sascalc.file_converter.bsl_loader import BSLLoader
+
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+
+class bsl_loader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.frames = np.random.RandomState(0).randn(4, 3, 5)
+        self.frames = self.frames.astype(np.float32)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _write(self, swap_bytes, n_frames=4):
+        header = os.path.join(self.tmp_dir, "X01000.HDR")
+        with open(header, "w") as header_file:
+            header_file.write("header line 1\nheader line 2\n")
+            header_file.write("5 3 %d %d 0 0 0 0 0 0\nX01001.HDR\n"
+                              % (n_frames, 0 if swap_bytes else 1))
+        dtype = '>f4' if swap_bytes else '<f4'
+        self.frames.astype(dtype).tofile(
+            os.path.join(self.tmp_dir, "X01001.HDR"))
+        return BSLLoader(header)
+
+    def test_load_frames(self):
+        for swap_bytes in (True, False):
+            loader = self._write(swap_bytes)
+            self.assertEqual(loader.get_frames().shape, (4, 3, 5))
+            frame_data = loader.load_frames([1, 3])
+            self.assertEqual(len(frame_data), 2)
+            self.assertEqual(frame_data[1].data.dtype, np.float32)
+            np.testing.assert_array_equal(frame_data[0].data, self.frames[1])
+            np.testing.assert_array_equal(frame_data[1].data, self.frames[3])
+            self.assertEqual(list(frame_data[0].x_bins), [1, 2, 3, 4, 5])
+            self.assertEqual(list(frame_data[0].y_bins), [1, 2, 3])
+
+    def test_missing_frames(self):
+        # The header lists more frames than the data file holds
+        loader = self._write(True, n_frames=6)
+        self.assertEqual(len(loader.get_frames()), 4)
+        np.testing.assert_array_equal(loader.load_frames([3])[0].data,
+                                      self.frames[3])
+        self.assertRaises(RuntimeError, loader.load_frames, [4])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+from sas.sascalc.file_converter.otoko_loader import OTOKOLoader
+from sas.sascalc.file_converter.otoko_loader import OTOKOParsingError
+
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+
+class otoko_loader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        self.q = rng.rand(1, 20).astype(np.float32)
+        self.frames = rng.randn(9, 20).astype(np.float32)
+        self.q_path = self._write("Q.hdr", [("Q.bin", self.q, True)])
+        # The frames are split across a big and a little endian file
+        self.data_path = self._write("I.hdr",
+                                     [("I1.bin", self.frames[:6], True),
+                                      ("I2.bin", self.frames[6:], False)])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _write(self, header, binary_files):
+        lines = ["header line 1\n", "header line 2\n"]
+        for i, (filename, data, swap_bytes) in enumerate(binary_files):
+            last_file = int(i == len(binary_files) - 1)
+            lines.append("%d %d 1 %d 0 0 0 0 0 %d\n" % (
+                data.shape[1], data.shape[0], 0 if swap_bytes else 1,
+                1 - last_file))
+            lines.append(filename + "\n")
+            dtype = '>f4' if swap_bytes else '<f4'
+            data.astype(dtype).tofile(os.path.join(self.tmp_dir, filename))
+        path = os.path.join(self.tmp_dir, header)
+        with open(path, "w") as header_file:
+            header_file.writelines(lines)
+        return path
+
+    def test_load(self):
+        otoko_data = OTOKOLoader(self.q_path, self.data_path).load_otoko_data()
+        qdata = otoko_data.q_axis.data
+        iqdata = otoko_data.data_axis.data
+        self.assertEqual(len(qdata), 1)
+        self.assertEqual(iqdata.shape, (9, 20))
+        np.testing.assert_array_equal(qdata[0], self.q[0])
+        self.assertEqual(iqdata[7].dtype, np.float64)
+        np.testing.assert_array_equal(iqdata[7], self.frames[7])
+        np.testing.assert_array_equal(iqdata[4:8], self.frames[4:8])
+        np.testing.assert_array_equal(iqdata[[8, 0]], self.frames[[8, 0]])
+        np.testing.assert_array_equal(np.asarray(iqdata), self.frames)
+
+    def test_short_file(self):
+        with open(os.path.join(self.tmp_dir, "I2.bin"), "r+b") as data_file:
+            data_file.truncate(10)
+        loader = OTOKOLoader(self.q_path, self.data_path)
+        self.assertRaises(OTOKOParsingError, loader.load_otoko_data)
+
+
+if __name__ == '__main__':
+    unittest.main()
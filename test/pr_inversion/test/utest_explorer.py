@@ -35,6 +35,29 @@ class TestExplorer(unittest.TestCase):
         results = self.explo(120, 200, 25)
         self.assertEqual(len(results.errors), 0)
         self.assertEqual(len(results.chi2), 25)
-        
+
+    def test_batch_vs_serial(self):
+        """
+            Test the batched exploration against one inversion per D_max
+        """
+        for est_bck in (False, True):
+            self.invertor.est_bck = est_bck
+            d_values = numpy.linspace(120, 200, 9)
+            batch = self.explo(120, 200, 9)
+            serial = self.explo._explore_serial(d_values)
+            self.assertEqual(len(batch.errors), 0)
+            for name in ('d_max', 'chi2', 'pos', 'pos_err', 'osc', 'bck',
+                         'rg', 'iq0'):
+                # lstsq returns chi2 as a 1-element array
+                numpy.testing.assert_allclose(
+                    numpy.ravel(getattr(batch, name)),
+                    numpy.ravel(getattr(serial, name)), rtol=1e-8, atol=1e-10)
+
+    def test_process_pool(self):
+        results = self.explo(120, 200, 10, nproc=2)
+        self.assertEqual(len(results.errors), 0)
+        numpy.testing.assert_allclose(results.chi2,
+                                      self.explo(120, 200, 10).chi2)
+
 if __name__ == '__main__':
     unittest.main()
@@ -13,7 +13,7 @@ import os.path
 import unittest
 import math
 import numpy
-from sas.sascalc.pr.invertor import Invertor
+from sas.sascalc.pr.invertor import Invertor, RegularizationPath
 
 
 def find(filename):
@@ -59,7 +59,49 @@ class TestFiguresOfMerit(unittest.TestCase):
             for all r-values
         """
         self.assertTrue(self.invertor.get_pos_err(self.out, self.cov)>0.9)
-       
+
+    def test_regularization_path(self):
+        """
+            Test the solutions along the regularization path
+            against the full inversion
+        """
+        self.invertor.background = 0.1
+        for est_bck in (False, True):
+            self.invertor.est_bck = est_bck
+            path = RegularizationPath(self.invertor, 20)
+            for alpha in (1e-9, 0.0007, 1.0):
+                for nfunc in (5, 12, 20):
+                    self.invertor.alpha = alpha
+                    # lstsq pads the output with a zero when est_bck is set
+                    out, cov = self.invertor.invert(nfunc)
+                    out, cov = out[:nfunc], cov[:nfunc, :nfunc]
+                    background = 0.0 if est_bck else 0.1
+                    p_out, p_cov, chi2, suggested_alpha, bck = \
+                        path.solve(alpha, nfunc, background)
+                    numpy.testing.assert_allclose(p_out, out, rtol=1e-8)
+                    # a_transposed * a is badly conditioned for small alpha
+                    numpy.testing.assert_allclose(p_cov, cov, rtol=1e-3)
+                    self.assertAlmostEqual(chi2 / float(self.invertor.chi2),
+                                           1.0)
+                    self.assertAlmostEqual(
+                        suggested_alpha / self.invertor.suggested_alpha, 1.0)
+                    self.assertAlmostEqual(bck / self.invertor.background, 1.0)
+        self.assertRaises(ValueError, path.solve, 0.0007, 21)
+
+    def test_estimate_alpha(self):
+        alpha, message, _ = self.invertor.estimate_alpha(10)
+        self.assertIsNone(message)
+        path = RegularizationPath(self.invertor, 15)
+        self.assertEqual(self.invertor.estimate_alpha(10, path)[0], alpha)
+        self.invertor.alpha = alpha
+        out, _ = self.invertor.invert(10)
+        self.assertEqual(self.invertor.get_peaks(out), 1)
+
+    def test_estimate_numterms(self):
+        nterms, alpha, _ = self.invertor.estimate_numterms()
+        self.assertTrue(10 <= nterms < 50)
+        self.assertTrue(alpha > 0)
+
 class TestBasicComponent(unittest.TestCase):
     
     def setUp(self):
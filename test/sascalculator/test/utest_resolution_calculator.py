@@ -3,6 +3,7 @@
 """
 
 import unittest
+import numpy as np
 from  sas.sascalc.calculator.resolution_calculator import ResolutionCalculator \
                                             as calculator
 
@@ -31,8 +32,79 @@ class resolution_calculator(unittest.TestCase):
         
         # The value "0.000213283" was obtained by manual calculation.
         self.assertAlmostEqual(sigma_1d,   0.000213283, 5)
-        
-        
+
+    def _setup_instrument(self):
+        self.cal.set_wavelength(6.0)
+        self.cal.set_source_aperture_size([2])
+        self.cal.set_sample_aperture_size([1, 0.8])
+        self.cal.set_detector_pix_size([0.5])
+        self.cal.set_detector_size([64, 48])
+        self.cal.set_source2sample_distance([1500])
+        self.cal.set_sample2detector_distance([1000, 3])
+        self.cal.set_wave_list([5.0, 6.0, 8.0], [0.1, 0.1, 0.1])
+
+    def test_compute_resolution(self):
+        """
+            Test the resolution of q arrays against that of each q value
+        """
+        self._setup_instrument()
+        rng = np.random.RandomState(0)
+        qx = rng.uniform(-0.3, 0.3, (4, 5))
+        qy = rng.uniform(-0.3, 0.3, (4, 5))
+        qx[0, 0] = qy[0, 0] = 0
+        result = self.cal.compute_resolution(qx, qy)
+        for values in result:
+            self.assertEqual(values.shape, (3, 4, 5))
+        for i, lam in enumerate([5.0, 6.0, 8.0]):
+            for j in np.ndindex(qx.shape):
+                expected = self.cal.compute(lam, 0.1, qx[j], qy[j], tof=True)
+                for values, value in zip(result, expected):
+                    self.assertAlmostEqual(values[(i,) + j], value, 15)
+
+        # a single wavelength has no wavelength axis
+        result = self.cal.compute_resolution(qx, qy, 6.0, 0.1)
+        expected = self.cal.compute(6.0, 0.1, qx[1, 2], qy[1, 2])
+        self.assertEqual(result[5].shape, (4, 5))
+        self.assertAlmostEqual(result[5][1, 2], expected[5], 15)
+
+    def test_compute_detector(self):
+        """
+            Test the resolution at the pixels of the detector
+        """
+        self._setup_instrument()
+        qx, qy, sigma_1, sigma_2, sigma_r, sigma_1d = \
+            self.cal.compute_detector()
+        self.assertEqual(sigma_1d.shape, (3, 64, 48))
+        self.cal.set_wavelength(8.0)
+        pixels = self.cal._get_detector_qxqy_pixels()
+        np.testing.assert_array_equal(qx[2], pixels.qx_data)
+        np.testing.assert_array_equal(qy[2], pixels.qy_data)
+        expected = self.cal.compute(8.0, 0.1, qx[2, 5, 7], qy[2, 5, 7],
+                                    tof=True)
+        self.assertAlmostEqual(sigma_r[2, 5, 7], expected[4], 15)
+        self.assertAlmostEqual(sigma_1d[2, 5, 7], expected[5], 15)
+
+    def test_compute_image(self):
+        """
+            Test the image computed within a few sigmas of q
+        """
+        images = []
+        for nsigma in (None, 6):
+            self.cal = calculator()
+            self.cal.set_wave_list([5.0, 6.0, 7.0], [0.1, 0.1, 0.1])
+            self.cal.image_size = 400
+            self.cal.image_nsigma = nsigma
+            images.append(self.cal.compute_image(0.02, 0.01, -0.1, 0.1,
+                                                 -0.1, 0.1))
+        full, window = images
+        self.assertEqual(full.shape, window.shape)
+        self.assertLessEqual(max(full.shape), 400)
+        self.assertAlmostEqual(window.sum(), 1.0, 12)
+        np.testing.assert_allclose(window, full, atol=1e-6 * full.max())
+        # the image is only computed near q
+        self.assertEqual(window[:, :window.shape[1] // 2].max(), 0)
+
+
 if __name__ == '__main__':
     unittest.main()
    
@@ -3,6 +3,8 @@ Unit tests for the sas_gen
 """
 
 import os.path
+import shutil
+import tempfile
 import warnings
 warnings.simplefilter("ignore")
 
@@ -22,6 +24,12 @@ class sas_gen_test(unittest.TestCase):
         self.sldloader = sas_gen.SLDReader()
         self.pdbloader = sas_gen.PDBReader()
         self.omfloader = sas_gen.OMFReader()
+        self.cache_dir = tempfile.mkdtemp()
+        sas_gen.set_cache_dir(self.cache_dir)
+
+    def tearDown(self):
+        sas_gen.set_cache_dir()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
 
     def test_sldreader(self):
         """
@@ -41,6 +49,66 @@ class sas_gen_test(unittest.TestCase):
         self.assertEqual(f.pos_y[0], -1.008)
         self.assertEqual(f.pos_z[0], 3.326)
 
+    def test_pdbreader_conect(self):
+        """
+        Test the CONECT records are read once per bond
+        """
+        f = self.pdbloader.read(find("c60.pdb"))
+        self.assertEqual(len(f.pos_x), 60)
+        self.assertEqual(len(f.line_x), 5)
+        self.assertEqual(f.line_x[0], (-0.733, 0.733))
+        self.assertTrue(np.all(f.sld_n == f.sld_n[0]))
+        self.assertEqual(f.pix_symbol[0], 'C')
+
+    def test_reader_cache(self):
+        """
+        Test the readers reuse the binary cache until the source changes
+        """
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, "c60.pdb")
+            shutil.copy(find("c60.pdb"), path)
+            first = self.pdbloader.read(path)
+            self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+            cached = self.pdbloader.read(path)
+            self.assertIsInstance(cached.pos_x, np.memmap)
+            for name in ('pos_x', 'pos_y', 'pos_z', 'sld_n', 'vol_pix',
+                         'pix_symbol'):
+                np.testing.assert_array_equal(getattr(cached, name),
+                                              getattr(first, name))
+            self.assertEqual(cached.line_x, first.line_x)
+            self.assertEqual(cached.pix_type, 'atom')
+            # drop the last atom
+            with open(path) as fid:
+                lines = fid.readlines()
+            index = max(i for i, line in enumerate(lines)
+                        if line.startswith('ATOM'))
+            with open(path, 'w') as fid:
+                fid.writelines(lines[:index] + lines[index + 1:])
+            self.assertEqual(len(self.pdbloader.read(path).pos_x), 59)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def test_sldcache(self):
+        """
+        Test MagSLD and OMFData round trip through the cache file
+        """
+        path = os.path.join(self.cache_dir, "data.npz")
+        f = self.omfloader.read(find("A_Raw_Example-1.omf"))
+        sas_gen.SLDCache().write(path, f)
+        omfdata = sas_gen.SLDCache().read(path, mmap_mode=None)
+        self.assertEqual(str(omfdata), str(f))
+        np.testing.assert_array_equal(omfdata.mz, f.mz)
+        omf2sld = sas_gen.OMF2SLD()
+        omf2sld.set_data(omfdata)
+        sas_gen.SLDCache().write(path, omf2sld.output)
+        sld_data = sas_gen.SLDCache().read(path)
+        np.testing.assert_array_equal(sld_data.sld_mx,
+                                      omf2sld.output.sld_mx)
+        self.assertEqual(sld_data.xnodes, omf2sld.output.xnodes)
+        self.assertFalse(sld_data.has_conect)
+        self.assertIsNone(sld_data.line_x)
+
     def test_omfreader(self):
         """
         Test .omf file loaded
@@ -54,6 +122,7 @@ class sas_gen_test(unittest.TestCase):
         self.assertEqual(output.pos_x[0], 0.0)
         self.assertEqual(output.pos_y[0], 0.0)
         self.assertEqual(output.pos_z[0], 0.0)
+        self.assertEqual(len(f.mx), f.xnodes * f.ynodes * f.znodes)
 
     def test_calculator(self):
         """
@@ -67,6 +136,97 @@ class sas_gen_test(unittest.TestCase):
         x = np.linspace(0, 0.1, 11)[1:]
         model.runXY([x, x])
 
+    def test_calculator_threads(self):
+        """
+        Test that the result does not depend on the number of threads
+        """
+        f = self.omfloader.read(find("A_Raw_Example-1.omf"))
+        omf2sld = sas_gen.OMF2SLD()
+        omf2sld.set_data(f)
+        model = sas_gen.GenSAS()
+        model.set_sld_data(omf2sld.output)
+        x = np.linspace(0, 0.1, 11)[1:]
+        model.set_nthreads(1)
+        serial = model.runXY([x, x])
+        model.set_nthreads(4)
+        np.testing.assert_array_equal(model.runXY([x, x]), serial)
+
+    def test_calculator_split_pixels(self):
+        """
+        Test the split pixel 2D calculation against the per pixel one
+        """
+        f = self.omfloader.read(find("A_Raw_Example-1.omf"))
+        omf2sld = sas_gen.OMF2SLD()
+        omf2sld.set_data(f)
+        sld_data = omf2sld.output
+        # mix of null, non-magnetic and magnetic pixels
+        npts = len(sld_data.pos_x)
+        sld_data.sld_n = 1.0e-6 * (np.arange(npts) % 3)
+        for m in (sld_data.sld_mx, sld_data.sld_my, sld_data.sld_mz):
+            m[::2] = 0.0
+        model = sas_gen.GenSAS()
+        model.set_sld_data(sld_data)
+        qx = np.linspace(-0.1, 0.1, 21)
+        qy = qx[::-1] * 0.5
+        for up_frac in ((1.0, 1.0), (0.3, 0.6), (0.0, 1.0)):
+            model.params['Up_frac_in'], model.params['Up_frac_out'] = up_frac
+            model.params['Up_theta'] = 30.0
+            model.params['solvent_SLD'] = 1.0e-6
+            split = model.runXY([qx, qy])
+            sldn = model.data_sldn - model.params['solvent_SLD']
+            gen_i = sas_gen.mod.new_GenI(0, model.data_x, model.data_y,
+                                         model.data_z, sldn, model.data_mx,
+                                         model.data_my, model.data_mz,
+                                         model.data_vol, up_frac[0],
+                                         up_frac[1], 30.0)
+            per_pixel = np.empty_like(qx)
+            sas_gen.mod.genicomXY(gen_i, qx, qy, per_pixel)
+            np.testing.assert_allclose(split, per_pixel, rtol=1e-10)
+
+    def _lattice_sld(self):
+        pos = np.mgrid[0:6, 0:5, 0:4].reshape(3, -1) * 20.0
+        npts = pos.shape[1]
+        sld_n = 1.0e-6 * (1.0 + np.random.RandomState(1).rand(npts))
+        zeros = np.zeros(npts)
+        return sas_gen.MagSLD(pos[0], pos[1], pos[2], sld_n,
+                              zeros, zeros, zeros)
+
+    def test_debye_histogram(self):
+        """
+        Test the pair-distance histogram against the exact 1D sum
+        """
+        q = np.linspace(0.001, 0.1, 20)
+        for pix_type in ('pixel', 'atom'):
+            sld_data = self._lattice_sld()
+            # 'atom' data is not treated as a lattice
+            sld_data.set_pix_type(pix_type)
+            model = sas_gen.GenSAS()
+            model.set_sld_data(sld_data)
+            model.params['solvent_SLD'] = 1.0e-6
+            exact = model.run([q, []])
+            model.set_bin_width(0.01)
+            approx = model.run([q, []])
+            np.testing.assert_allclose(approx, exact, rtol=1e-6)
+
+    def test_debye_histogram_cache(self):
+        """
+        Test the histogram is reused across q, scale and background
+        """
+        model = sas_gen.GenSAS()
+        model.set_sld_data(self._lattice_sld())
+        model.set_bin_width(0.5)
+        q = np.linspace(0.001, 0.1, 20)
+        base = model.run([q, []])
+        hist = model._pair_hist
+        model.params['scale'] = 2.0
+        model.params['background'] = 1.0
+        np.testing.assert_allclose(model.run([q, []]), 2.0 * base + 1.0)
+        model.run([q[::2], []])
+        self.assertIs(model._pair_hist, hist)
+        model.params['solvent_SLD'] = 1.0e-6
+        model.run([q, []])
+        self.assertIsNot(model._pair_hist, hist)
+
 
 if __name__ == '__main__':
     unittest.main()
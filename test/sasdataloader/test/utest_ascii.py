@@ -3,12 +3,16 @@
 """
 
 import os.path
+import shutil
+import tempfile
 import warnings
 import math
 warnings.simplefilter("ignore")
 
 import unittest
+import numpy as np
 from sas.sascalc.dataloader.loader import Loader
+from sas.sascalc.dataloader.readers.ascii_reader import Reader
 
 
 def find(filename):
@@ -128,6 +132,36 @@ class ABSReaderTests(unittest.TestCase):
             self.assertFalse(math.isnan(f_2d.qx_data[i]))
             self.assertFalse(math.isnan(f_2d.qy_data[i]))
 
+    def test_large_file(self):
+        """
+        Test a file with more lines than read at once, with blank lines,
+        lines which are not data in the middle of the data and a footer
+        """
+        data = np.random.RandomState(0).rand(3000, 4) + 0.01
+        data = np.array(["%.8g" % value for value in data.flat],
+                        dtype=float).reshape(data.shape)
+        lines = ["Title", "Q I dI dQ"]
+        lines += ["%.8g %.8g %.8g %.8g" % tuple(row) for row in data[:1000]]
+        # same number of columns, not all numbers: the data stop here
+        lines += ["", "  ", "nan 1 2 3", "1 2,3 4 5"]
+        lines += ["%.8g,%.8g,%.8g,%.8g" % tuple(row) for row in data[1000:]]
+        lines += ["End of data"]
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, "large.txt")
+            with open(path, 'w') as fid:
+                fid.write("\n".join(lines))
+            f = Reader().read(path)[0]
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        # the nan line is read as data, then removed with the nan points
+        self.assertEqual(len(f.x), 1000)
+        expected = data[np.argsort(data[:1000, 0])]
+        np.testing.assert_array_equal(f.x, expected[:, 0])
+        np.testing.assert_array_equal(f.y, expected[:, 1])
+        np.testing.assert_array_equal(f.dy, expected[:, 2])
+        np.testing.assert_array_equal(f.dx, expected[:, 3])
+
 
 if __name__ == '__main__':
     unittest.main()
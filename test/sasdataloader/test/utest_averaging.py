@@ -7,7 +7,7 @@ import numpy as np
 
 import sas.sascalc.dataloader.data_info as data_info
 from sas.sascalc.dataloader.loader import Loader
-from sas.sascalc.dataloader.manipulations import (Boxavg, Boxsum,
+from sas.sascalc.dataloader.manipulations import (BinningPlan, Boxavg, Boxsum,
                                                   CircularAverage, Ring,
                                                   SectorPhi, SectorQ, SlabX,
                                                   SlabY, get_q,
@@ -101,6 +101,26 @@ class Averaging(unittest.TestCase):
         for i in range(17):
             self.assertEqual(o.y[i], 1.0)
 
+    def test_circularavg_zero_error(self):
+        """
+            Test points with no error use abs(data) and masked points are
+            left out of the circular average
+        """
+        self.data.err_data = np.zeros(len(self.data.data))
+        self.data.data = -self.data.data
+        self.data.mask = self.data.qx_data > 0
+        r = CircularAverage(r_min=self.qmin, r_max=3 * self.qmin,
+                            bin_width=self.qmin / 2)
+        o = r(self.data, ismask=True)
+        counts = [np.sum(self.data.mask & (self.data.q_data >= q_lo)
+                         & (self.data.q_data < q_lo + self.qmin / 2))
+                  for q_lo in self.qmin * (1 + 0.5 * np.arange(4))]
+        # empty bins are dropped
+        counts = [count for count in counts if count]
+        np.testing.assert_array_equal(o.y, -1.0)
+        np.testing.assert_allclose(o.dy, 1.0 / np.sqrt(counts))
+        self.assertTrue(np.all(o.x > self.qmin))
+
 
 class DataInfoTests(unittest.TestCase):
 
@@ -292,6 +312,32 @@ class DataInfoTests(unittest.TestCase):
         # print H.flatten().shape
         # print o.y.shape
 
+    def test_binning_plan(self):
+        """
+        Test the binning plan on a stack of frames against the averagers
+        """
+        rand = np.random.RandomState(0)
+        frames = self.data.data * rand.rand(3, len(self.data.data))
+        frames[rand.rand(*frames.shape) < 0.05] = np.nan
+        averagers = [CircularAverage(r_min=.00, r_max=.025, bin_width=0.0003),
+                     Ring(r_min=.005, r_max=.01, nbins=20),
+                     SectorPhi(r_min=.005, r_max=.01, phi_min=0,
+                               phi_max=math.pi / 2.0),
+                     SectorQ(r_min=.005, r_max=.01, phi_min=0,
+                             phi_max=math.pi / 2.0, base=10)]
+        for averager in averagers:
+            plan = BinningPlan(averager, self.data)
+            output = plan.apply(frames)
+            self.assertEqual(len(output), len(frames))
+            for frame, o in zip(frames, output):
+                self.data.data = frame
+                self.data.err_data = np.zeros(len(frame))
+                expected = averager(self.data)
+                np.testing.assert_array_equal(o.x, expected.x)
+                np.testing.assert_array_equal(o.y, expected.y)
+                np.testing.assert_array_equal(o.dy, expected.dy)
+            np.testing.assert_array_equal(plan(self.data).y, expected.y)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -2,7 +2,9 @@
     Unit tests for the new recursive cansas reader
 """
 import os
+import shutil
 import sys
+import tempfile
 import unittest
 import logging
 import warnings
@@ -11,6 +13,8 @@ if sys.version_info[0] >= 3:
 else:
     from StringIO import StringIO
 
+import h5py
+import numpy as np
 from lxml import etree
 from lxml.etree import XMLSyntaxError
 from xml.dom import minidom
@@ -22,6 +26,7 @@ from sas.sascalc.dataloader.data_info import Data1D, Data2D
 from sas.sascalc.dataloader.readers.xml_reader import XMLreader
 from sas.sascalc.dataloader.readers.cansas_reader import Reader
 from sas.sascalc.dataloader.readers.cansas_constants import CansasConstants
+from sas.sascalc.dataloader.readers import cansas_reader_HDF5
 
 logger = logging.getLogger(__name__)
 
@@ -274,6 +279,64 @@ class cansas_reader_hdf5(unittest.TestCase):
         self._check_multiple_data(self.data[1])
         self._check_1d_data(self.data[0])
 
+    def test_lazy(self):
+        reader = cansas_reader_HDF5.Reader()
+        eager = reader.read(self.datafile_multiplesasdata_multiplesasentry)
+        lazy = reader.read(self.datafile_multiplesasdata_multiplesasentry,
+                           lazy=True)
+        self.assertEqual([type(data).__name__ for data in lazy],
+                         ['LazyData2D', 'LazyData1D', 'LazyData2D'])
+        data2d = lazy[0]
+        self.assertFalse(data2d.is_loaded('data'))
+        self.assertFalse(data2d.is_loaded('mask'))
+        self.assertEqual(data2d.title, eager[0].title)
+        self.assertEqual(data2d.detector[0].name, eager[0].detector[0].name)
+        self.assertEqual(data2d.x_unit, eager[0].x_unit)
+        for name in ('data', 'err_data', 'qx_data', 'qy_data', 'q_data',
+                     'mask'):
+            np.testing.assert_array_equal(getattr(data2d, name),
+                                          getattr(eager[0], name))
+        self.assertTrue(data2d.is_loaded('data'))
+        np.testing.assert_array_equal(data2d.x_bins, data2d.qx_data[:150])
+        np.testing.assert_array_equal(data2d.y_bins, data2d.qy_data[::150])
+        lazy[2].load()
+        self.assertTrue(all(lazy[2].is_loaded(name)
+                            for name in lazy[2].lazy_fields))
+        # Lazy 1D data keeps the order of the file
+        np.testing.assert_array_equal(np.sort(lazy[1].x), eager[1].x)
+
+    def test_selection(self):
+        reader = cansas_reader_HDF5.Reader()
+        path = self.datafile_multiplesasdata_multiplesasentry
+        data = reader.read(path, entries='sasentry01')
+        self.assertEqual([type(d).__name__ for d in data], ['Data2D', 'Data1D'])
+        data = reader.read(path, entries=1)
+        self.assertEqual([type(d).__name__ for d in data], ['Data2D'])
+        # Only the first SASentry has a second SASdata group
+        data = reader.read(path, sasdata=[1])
+        self.assertEqual([type(d).__name__ for d in data], ['Data2D'])
+        data = reader.read(path, entries=0, sasdata='sasdata', lazy=True)
+        self.assertEqual([type(d).__name__ for d in data], ['LazyData1D'])
+        # The selection does not persist
+        self.assertEqual(len(reader.read(path)), 3)
+
+    def test_mask(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, "masked.h5")
+            shutil.copy(self.datafile_multiplesasdata_multiplesasentry, path)
+            mask = np.zeros((150, 150), dtype=bool)
+            mask[::7, 3] = True
+            mask[-1, -1] = True
+            with h5py.File(path, 'r+') as h5_file:
+                h5_file['sasentry02/sasdata/Mask'] = mask
+            reader = cansas_reader_HDF5.Reader()
+            for lazy in (False, True):
+                data = reader.read(path, entries=1, lazy=lazy)[0]
+                np.testing.assert_array_equal(data.mask, mask.flatten())
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
     def _check_multiple_data(self, data):
         self.assertTrue(data.title == "MH4_5deg_16T_SLOW")
         self.assertTrue(data.run[0] == '33837')
@@ -6,8 +6,14 @@ warnings.simplefilter("ignore")
 
 import unittest
 from sas.sascalc.dataloader.loader import  Loader
+from sas.sascalc.dataloader.readers.red2d_reader import Reader, \
+    parse_data_block
 
 import os.path
+import shutil
+import tempfile
+
+import numpy as np
 
 
 def find(filename):
@@ -35,6 +41,47 @@ class abs_reader(unittest.TestCase):
 
         self.assertEqual(f.meta_data['loader'],"IGOR/DAT 2D Q_map")
 
+    def test_parse_data_block(self):
+        """
+            Test the bulk parser rejects blocks it cannot parse fully
+        """
+        np.testing.assert_array_equal(
+            parse_data_block("1 2 3\n4\t5 6\n", 2, 3), [[1, 2, 3], [4, 5, 6]])
+        self.assertIsNone(parse_data_block("1 2 3\n4 x 6\n", 2, 3))
+        self.assertIsNone(parse_data_block("1 2 3\n4 5\n", 2, 3))
+
+    def test_malformed(self):
+        """
+            Test tokens which are not numbers are read as zero
+        """
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, "malformed.dat")
+            with open(path, 'w') as fd:
+                fd.write("Data columns Qx - Qy - I(Qx,Qy)\nASCII data\n"
+                         "0.1 0.2 3\n0.1 x 4\n0.2 0.3 5\n0.2 0.1 6\n")
+            f = self.loader.load(path)[0]
+            np.testing.assert_array_equal(f.qy_data, [0.2, 0, 0.3, 0.1])
+            np.testing.assert_array_equal(f.data, [3, 4, 5, 6])
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def test_write(self):
+        """
+            Test the written file loads back to the same data
+        """
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, "written.dat")
+            f = self.data_list[0]
+            Reader().write(path, f)
+            g = self.loader.load(path)[0]
+            np.testing.assert_allclose(g.qx_data, f.qx_data, rtol=1e-5)
+            np.testing.assert_allclose(g.qy_data, f.qy_data, rtol=1e-5)
+            np.testing.assert_allclose(g.data, f.data, rtol=1e-5)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
 
 if __name__ == '__main__':
     unittest.main()
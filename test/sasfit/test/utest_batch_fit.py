@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the headless batch fit
+"""
+from __future__ import unicode_literals
+
+import csv
+import io
+import os.path
+import shutil
+import tempfile
+import unittest
+
+import h5py
+import numpy as np
+
+from bumps.options import FIT_CONFIG
+
+from sas.sascalc.fit.batch_fit import BatchFit, main, write_csv, write_hdf5
+
+
+class TestBatchFit(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.radii = [40., 45., 50.]
+        self.paths = []
+        batch = BatchFit('sphere')
+        q = np.logspace(-2.5, -0.7, 80)
+        rng = np.random.RandomState(0)
+        for i, radius in enumerate(self.radii):
+            model = batch.make_model()
+            model.setParam('radius', radius)
+            model.setParam('scale', 0.01)
+            iq = model.evalDistribution(q)
+            diq = 0.01*iq
+            iq = iq + diq*rng.randn(len(q))
+            path = os.path.join(self.tmp_dir, "sphere%d.txt" % i)
+            np.savetxt(path, np.column_stack((q, iq, diq)))
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_fit(self):
+        batch = BatchFit('sphere', pars={'radius': 45, 'scale': 0.02},
+                         fitted=['radius', 'scale'], qmax=0.15)
+        results = batch.fit(batch.load(self.paths))
+        names, rows = batch.table(results)
+        self.assertEqual(names[6:], ['radius', 'error on radius', 'scale',
+                                     'error on scale'])
+        for row, radius in zip(rows, self.radii):
+            self.assertTrue(row[3])
+            self.assertLess(abs(row[6] - radius), 5*row[7])
+            self.assertLess(row[4], 2)
+            self.assertLess(row[5], 80)
+
+        # Same results from a pool of processes
+        batch.nproc = 2
+        pooled = batch.table(batch.fit(batch.load(self.paths)))[1]
+        for row, expected in zip(pooled, rows):
+            np.testing.assert_allclose(row[4:], expected[4:], rtol=1e-10)
+
+        # Results tables
+        csv_path = os.path.join(self.tmp_dir, "results.csv")
+        batch.write(csv_path, results)
+        with open(csv_path) as csv_file:
+            table = list(csv.reader(csv_file))
+        self.assertEqual(table[0], names)
+        self.assertEqual(len(table), 4)
+        self.assertEqual(float(table[1][6]), rows[0][6])
+        h5_path = os.path.join(self.tmp_dir, "results.h5")
+        batch.write(h5_path, results)
+        with h5py.File(h5_path, 'r') as h5_file:
+            table = h5_file['results'][()]
+            self.assertEqual(list(table.dtype.names), names)
+            np.testing.assert_array_equal(table['radius'],
+                                          [row[6] for row in rows])
+            self.assertEqual(_text(table['File'][2]), self.paths[2])
+
+    def test_constraints(self):
+        batch = BatchFit('sphere', pars={'radius': 45, 'scale': 0.02},
+                         fitted=['scale'],
+                         constraints={'radius': '2*20'})
+        names, rows = batch.table(batch.fit(batch.load(self.paths[:1])))
+        self.assertEqual(rows[0][names.index('radius')], 40.)
+        self.assertTrue(np.isnan(rows[0][names.index('error on radius')]))
+        self.assertAlmostEqual(rows[0][names.index('scale')], 0.01, places=3)
+        self.assertLess(rows[0][names.index('Chi2')], 2)
+        self.assertRaises(ValueError, BatchFit, 'sphere', fitted=['width'])
+        self.assertRaises(ValueError, BatchFit, 'sphere', optimizer='none')
+
+    def test_main(self):
+        selected_id = FIT_CONFIG.selected_id
+        output = os.path.join(self.tmp_dir, "results.csv")
+        status = main(['-m', 'sphere', '-p', 'radius=45', '-p', 'scale=0.02',
+                       '-f', 'radius,scale', '-b', 'radius=10:100',
+                       '--optimizer', 'amoeba', '--option', 'steps=200',
+                       '--seed', '1', '-o', output] + self.paths)
+        self.assertEqual(status, 0)
+        # The optimizer of the GUI is left unchanged
+        self.assertEqual(FIT_CONFIG.selected_id, selected_id)
+        with open(output) as csv_file:
+            table = list(csv.reader(csv_file))
+        self.assertEqual(len(table), 4)
+        for row, radius in zip(table[1:], self.radii):
+            self.assertLess(abs(float(row[6]) - radius), 1.0)
+
+    def test_bad_inputs(self):
+        """
+        Test a data set outside the fit range and unreadable files fail
+        without stopping the batch
+        """
+        q, iq, diq = np.loadtxt(self.paths[0]).T
+        outside = os.path.join(self.tmp_dir, "outside.txt")
+        np.savetxt(outside, np.column_stack((10*q + 1, iq, diq)))
+        unsupported = os.path.join(self.tmp_dir, "data.unknown")
+        with open(unsupported, "w") as data_file:
+            data_file.write("not data\n")
+        missing = os.path.join(self.tmp_dir, "missing.txt")
+        paths = [missing, self.paths[0], outside, unsupported]
+
+        batch = BatchFit('sphere', pars={'radius': 45, 'scale': 0.02},
+                         fitted=['radius', 'scale'], qmax=0.15)
+        names, rows = batch.table(batch.fit(batch.load(paths)))
+        self.assertEqual([path for path, _ in batch.load_errors],
+                         [missing, unsupported])
+        self.assertEqual([row[0] for row in rows], [self.paths[0], outside])
+        self.assertTrue(rows[0][3])
+        self.assertFalse(rows[1][3])
+        self.assertTrue(np.isnan(rows[1][4]))
+        self.assertEqual(rows[1][5], 0)
+        self.assertTrue(np.isnan(rows[1][names.index('error on radius')]))
+
+        output = os.path.join(self.tmp_dir, "results.csv")
+        status = main(['-m', 'sphere', '-p', 'radius=45', '-p', 'scale=0.02',
+                       '-f', 'radius,scale', '--qmax', '0.15', '-o', output]
+                      + paths)
+        self.assertEqual(status, 1)
+        with open(output) as csv_file:
+            table = list(csv.reader(csv_file))
+        self.assertEqual(len(table), 3)
+        self.assertEqual(table[2][3], 'False')
+        status = main(['-m', 'sphere', '-p', 'radius=45', '-p', 'scale=0.02',
+                       '-f', 'radius,scale', '--qmax', '0.15', '-o', output,
+                       self.paths[0], missing])
+        self.assertEqual(status, 1)
+
+    def test_write(self):
+        names = ['File', 'Entry', 'Title', 'Success', 'Chi2', 'Npts', 'radius']
+        rows = [['résultat.xml', 0, '40 Å spheres', True, 1.5, 80,
+                 40.25]]
+        csv_path = os.path.join(self.tmp_dir, "results.csv")
+        write_csv(csv_path, names, rows)
+        with io.open(csv_path, 'rb') as csv_file:
+            lines = csv_file.read().decode('utf-8').split('\n')
+        self.assertEqual(lines[1], 'résultat.xml,0,40 Å spheres,'
+                         'True,1.5,80,40.25')
+        h5_path = os.path.join(self.tmp_dir, "results.h5")
+        write_hdf5(h5_path, names, rows, model='sphere')
+        with h5py.File(h5_path, 'r') as h5_file:
+            table = h5_file['results'][()]
+            self.assertEqual(_text(table['File'][0]), rows[0][0])
+            self.assertEqual(_text(table['Title'][0]), rows[0][2])
+            self.assertEqual(table['radius'][0], 40.25)
+
+
+def _text(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+"""
+Unit tests for the bumps fitness of a sas model
+"""
+import unittest
+
+import numpy as np
+
+from sasmodels.sasview_model import _make_standard_model
+
+from sas.sascalc.dataloader.data_info import Data1D
+from sas.sascalc.fit.BumpsFitting import BumpsFit, SasFitness
+
+
+class TestSasFitness(unittest.TestCase):
+
+    def setUp(self):
+        model = _make_standard_model('sphere')()
+        model.name = 'M1'
+        model.setParam('radius', 40.)
+        model.setParam('scale', 0.01)
+        q = np.logspace(-2.5, -0.7, 50)
+        iq = model.evalDistribution(q)
+        data = Data1D(x=q, y=iq, dy=0.01*iq)
+        model.setParam('radius', 45.)
+        self.model = model
+        self.fitter = BumpsFit()
+        self.fitter.set_model(model, 0, ['radius', 'scale'], data=data)
+        self.fitter.set_data(data=data, id=0)
+        self.fitter.select_problem_for_fit(id=0, value=1)
+        # Record the parameters set in the model and its evaluations
+        self.set_calls = []
+        self.eval_calls = []
+        set_param, eval_distribution = model.setParam, model.evalDistribution
+
+        def record_set(name, value):
+            self.set_calls.append(name)
+            return set_param(name, value)
+
+        def record_eval(qx):
+            self.eval_calls.append(len(qx))
+            return eval_distribution(qx)
+
+        model.setParam = record_set
+        model.evalDistribution = record_eval
+
+    def make_fitness(self):
+        arrange = self.fitter.fit_arrange_dict[0]
+        fitness = SasFitness(model=arrange.get_model(),
+                             data=arrange.get_data(),
+                             fitted=arrange.pars)
+        del self.set_calls[:]
+        del self.eval_calls[:]
+        return fitness
+
+    def test_same_point(self):
+        """
+        Test the model is evaluated once for repeated calls at one point
+        """
+        fitness = self.make_fitness()
+        nllf = fitness.nllf()
+        fitness.update()
+        self.assertEqual(fitness.nllf(), nllf)
+        self.assertEqual(len(self.eval_calls), 1)
+        self.assertEqual(self.set_calls, [])
+        self.assertEqual(fitness.eval_count, 1)
+        self.assertEqual(fitness.update_count, 2)
+
+    def test_changed_parameter(self):
+        """
+        Test only the changed parameter is set, and the model re-evaluated
+        """
+        fitness = self.make_fitness()
+        nllf = fitness.nllf()
+        fitness.parameters()['radius'].value = 40.
+        fitness.update()
+        self.assertEqual(self.set_calls, ['radius'])
+        self.assertEqual(self.model.getParam('radius'), 40.)
+        self.assertLess(fitness.nllf(), nllf)
+        self.assertEqual(len(self.eval_calls), 2)
+        self.assertEqual(fitness.eval_count, 2)
+
+    def test_result_calls(self):
+        """
+        Test the result of a fit reports the evaluations of the model
+        """
+        result = self.fitter.fit()[0]
+        self.assertTrue(result.success)
+        self.assertAlmostEqual(result.pvec[0], 40., places=3)
+        self.assertEqual(result.calls, len(self.eval_calls))
+        self.assertGreater(result.calls, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,196 @@
+"""
+Unit tests for the FitPool class
+"""
+import os
+import time
+import unittest
+
+import numpy as np
+
+from sasmodels.sasview_model import _make_standard_model
+
+from sas.sascalc.dataloader.data_info import Data1D
+from sas.sascalc.fit import FitHandler
+from sas.sascalc.fit.AbstractFitEngine import FitEngine, FResult
+from sas.sascalc.fit.BumpsFitting import BumpsFit
+from sas.sascalc.fit.fit_pool import FitPool
+
+
+class LineFit(object):
+    """
+    Fit engine fitting a line to noisy data from a random starting slope
+    """
+    def __init__(self, slope, delay=0.0):
+        self.slope = slope
+        self.delay = delay
+
+    def fit(self, msg_q=None, q=None, handler=None, curr_thread=None,
+            ftol=1.49012e-8, reset_flag=False):
+        x = np.linspace(0, 1, 21)
+        y = self.slope*x + 0.01*np.random.randn(len(x))
+        start = np.random.rand()
+        for step in range(3):
+            if curr_thread is not None:
+                curr_thread.isquit()
+            time.sleep(self.delay)
+            if handler is not None:
+                handler.set_result(step)
+                handler.progress(step + 1, 3)
+        if handler is not None:
+            handler.update_fit(last=True)
+        return [np.dot(x, y)/np.dot(x, x), start]
+
+
+class SlopeModel(object):
+    """
+    Model which cannot be pickled
+    """
+    name = 'slope'
+
+    def __init__(self):
+        self.params = {'slope': 0.0}
+        self.evaluate = lambda x: self.params['slope']*x
+
+    def getParamList(self):
+        return list(self.params)
+
+    def getParam(self, name):
+        return self.params[name]
+
+    def setParam(self, name, value):
+        self.params[name] = value
+
+
+class SlopeFit(FitEngine):
+    """
+    Fit engine setting the slope of its model
+    """
+    def __init__(self, slope):
+        FitEngine.__init__(self)
+        self.set_model(SlopeModel(), 0, ['slope'])
+        self.slope = slope
+
+    def fit(self, msg_q=None, q=None, handler=None, curr_thread=None,
+            ftol=1.49012e-8, reset_flag=False):
+        model = self.get_model(0).model
+        model.setParam('slope', self.slope)
+        result = FResult(model=model, param_list=['slope'])
+        result.pvec = np.array([self.slope])
+        return [result]
+
+
+def sphere_fit(radius):
+    """
+    Return a BumpsFit of the radius of a sphere, starting from 45
+    """
+    model = _make_standard_model('sphere')()
+    model.name = 'M1'
+    model.setParam('radius', radius)
+    q = np.logspace(-2.5, -0.7, 50)
+    iq = model.evalDistribution(q)
+    data = Data1D(x=q, y=iq, dy=0.01*iq)
+    model.setParam('radius', 45.)
+    fitter = BumpsFit()
+    fitter.set_model(model, 0, ['radius'], data=data)
+    fitter.set_data(data=data, id=0)
+    fitter.select_problem_for_fit(id=0, value=1)
+    return fitter
+
+
+class RecordHandler(FitHandler):
+    def __init__(self):
+        self.calls = []
+
+    def progress(self, current, expected):
+        self.calls.append((current, expected))
+
+    def update_fit(self, last=False):
+        self.calls.append(last)
+
+
+class QuitThread(object):
+    """
+    Stand-in for a CalcThread which is interrupted after a delay
+    """
+    def __init__(self, delay):
+        self.stop_time = time.time() + delay
+        self.updates = 0
+
+    def isquit(self):
+        if time.time() > self.stop_time:
+            raise KeyboardInterrupt("Fitting: terminated by the user.")
+
+    def update(self):
+        self.updates += 1
+        self.isquit()
+
+
+class TestFitPool(unittest.TestCase):
+
+    def setUp(self):
+        self.fitters = [LineFit(slope) for slope in range(1, 8)]
+
+    def test_order(self):
+        """
+        Test the results come back in order whatever the number of processes
+        """
+        serial = FitPool(nproc=1, seed=10).map(self.fitters)
+        handler = RecordHandler()
+        thread = QuitThread(delay=1e6)
+        pooled = FitPool(nproc=3, seed=10).map(self.fitters, handler=handler,
+                                               curr_thread=thread)
+        np.testing.assert_array_equal(pooled, serial)
+        for slope, result in zip(range(1, 8), pooled):
+            self.assertAlmostEqual(result[0], slope, places=1)
+        # Every fit reports its progress to the parent handler
+        self.assertEqual(handler.calls.count(True), 7)
+        self.assertEqual(handler.calls.count((3, 3)), 7)
+        self.assertEqual(handler.result, 2)
+        self.assertEqual(thread.updates, 7)
+
+    def test_shared_models(self):
+        """
+        Test the results refer to the models of the parent, set to the
+        fitted values
+        """
+        fitters = [SlopeFit(slope) for slope in (1.0, 2.0, 3.0)]
+        results = FitPool(nproc=2).map(fitters)
+        for fitter, result in zip(fitters, results):
+            model = fitter.get_model(0).model
+            self.assertIs(result[0].model, model)
+            self.assertEqual(model.getParam('slope'), fitter.slope)
+            np.testing.assert_array_equal(result[0].pvec, [fitter.slope])
+
+    def test_bumps_fit(self):
+        """
+        Test bumps fits in the workers, with the OMP_NUM_THREADS=1 setting
+        which makes a single fit use a pool of processes
+        """
+        omp_threads = os.environ.get('OMP_NUM_THREADS')
+        os.environ['OMP_NUM_THREADS'] = '1'
+        try:
+            fitters = [sphere_fit(radius) for radius in (43., 47.)]
+            results = FitPool(nproc=2).map(fitters)
+        finally:
+            if omp_threads is None:
+                del os.environ['OMP_NUM_THREADS']
+            else:
+                os.environ['OMP_NUM_THREADS'] = omp_threads
+        for radius, result in zip((43., 47.), results):
+            self.assertTrue(result[0].success)
+            self.assertAlmostEqual(result[0].pvec[0], radius, places=3)
+
+    def test_cancel(self):
+        """
+        Test interrupting the calling thread stops the workers
+        """
+        fitters = [LineFit(slope, delay=0.5) for slope in range(1, 8)]
+        for nproc in (1, 2):
+            start = time.time()
+            self.assertRaises(KeyboardInterrupt, FitPool(nproc=nproc).map,
+                              fitters, curr_thread=QuitThread(delay=0.2))
+            self.assertLess(time.time() - start, 2.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+Unit tests for the 2D resolution smearing
+"""
+import unittest
+
+import numpy as np
+
+from sasmodels.resolution2d import Pinhole2D
+
+from sas.sascalc.dataloader.data_info import Data2D
+from sas.sascalc.fit.qsmearing import smear_selection
+
+
+class GaussianModel(object):
+    """
+    Model counting the points it is evaluated on
+    """
+    def __init__(self):
+        self.calls = 0
+
+    def evalDistribution(self, qxqy):
+        qx, qy = qxqy
+        self.calls += 1
+        return np.exp(-(qx/0.05)**2 - (qy/0.03)**2)
+
+
+class TestPySmear2D(unittest.TestCase):
+
+    def setUp(self):
+        qx, qy = np.meshgrid(np.linspace(-0.1, 0.1, 21),
+                             np.linspace(-0.08, 0.08, 17))
+        qx, qy = qx.ravel(), qy.ravel()
+        self.data = Data2D(data=np.ones(len(qx)), qx_data=qx, qy_data=qy,
+                           q_data=np.sqrt(qx**2 + qy**2),
+                           dqx_data=0.005 + 0.02*np.abs(qx),
+                           dqy_data=0.004*np.ones(len(qx)),
+                           mask=np.ones(len(qx), dtype=bool))
+        self.model = GaussianModel()
+        self.smearer = smear_selection(self.data)
+        self.smearer.set_model(self.model)
+
+    def smeared(self, index, accuracy='Low'):
+        res = Pinhole2D(data=self.data, index=index, accuracy=accuracy)
+        return res.apply(self.model.evalDistribution(res.q_calc))
+
+    def test_cache(self):
+        """
+        Test the cached resolution gives the result of a new one
+        """
+        index = self.data.q_data < 0.09
+        self.smearer.set_index(index.copy())
+        first = self.smearer.get_value()
+        res = self.smearer._resolution
+        np.testing.assert_allclose(first, self.smeared(index), rtol=1e-12)
+        # Same index: reused
+        self.smearer.set_index(index.copy())
+        np.testing.assert_allclose(self.smearer.get_value(), first,
+                                   rtol=1e-12)
+        self.assertIs(self.smearer._resolution, res)
+
+        # New q range
+        index = self.data.q_data < 0.07
+        self.smearer.set_index(index)
+        np.testing.assert_allclose(self.smearer.get_value(),
+                                   self.smeared(index), rtol=1e-12)
+        self.assertIsNot(self.smearer._resolution, res)
+
+        # New accuracy
+        res = self.smearer._resolution
+        self.smearer.set_accuracy('High')
+        np.testing.assert_allclose(self.smearer.get_value(),
+                                   self.smeared(index, 'High'), rtol=1e-12)
+        self.assertIsNot(self.smearer._resolution, res)
+
+
+if __name__ == '__main__':
+    unittest.main()
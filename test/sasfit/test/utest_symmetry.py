@@ -0,0 +1,92 @@
+"""
+Unit tests for the evaluation of centrosymmetric 2D models
+"""
+import unittest
+
+import numpy as np
+
+from sasmodels.sasview_model import _make_standard_model
+
+from sas.sascalc.dataloader.data_info import Data2D
+from sas.sascalc.fit.AbstractFitEngine import FitData2D
+from sas.sascalc.fit.symmetry import SymmetricEvaluator, is_centrosymmetric
+
+
+class TestSymmetry(unittest.TestCase):
+
+    def setUp(self):
+        self.model = _make_standard_model('cylinder')()
+        self.model.setParam('theta', 30.)
+        self.model.setParam('phi', 20.)
+        qx, qy = np.meshgrid(np.linspace(-0.2, 0.2, 41),
+                             np.linspace(-0.1, 0.1, 21))
+        self.qx, self.qy = qx.ravel(), qy.ravel()
+
+    def test_pairs(self):
+        """
+        Test the mirrored points are found, and only them
+        """
+        # Drop a point, which leaves its mirror without a partner
+        keep = np.arange(len(self.qx)) != 5
+        evaluator = SymmetricEvaluator(self.qx[keep], self.qy[keep])
+        paired = evaluator.partner >= 0
+        self.assertEqual(np.sum(~paired), 1)
+        partner = evaluator.partner[paired]
+        np.testing.assert_allclose(evaluator.qx[partner],
+                                   -evaluator.qx[paired], atol=1e-12)
+        np.testing.assert_allclose(evaluator.qy[partner],
+                                   -evaluator.qy[paired], atol=1e-12)
+        # q = 0, the unpaired point and one point of each other pair
+        self.assertEqual(len(evaluator.index), 2 + (len(self.qx) - 3)//2)
+
+        # A shifted grid has no mirrored points
+        evaluator = SymmetricEvaluator(self.qx + 1e-4, self.qy)
+        self.assertTrue(np.all(evaluator.partner < 0))
+        self.assertEqual(evaluator.fraction, 1.0)
+
+    def test_evaluate(self):
+        """
+        Test the values are those of the evaluation on every point
+        """
+        self.assertTrue(is_centrosymmetric(self.model))
+        evaluator = SymmetricEvaluator(self.qx, self.qy)
+        calls = []
+
+        def fn(qxqy):
+            calls.append(len(qxqy[0]))
+            return self.model.evalDistribution(qxqy)
+
+        full = self.model.evalDistribution([self.qx, self.qy])
+        np.testing.assert_allclose(evaluator.evaluate(fn), full, rtol=1e-12)
+        self.assertEqual(calls, [(len(self.qx) + 1)//2])
+
+    def test_magnetic(self):
+        """
+        Test magnetic models are evaluated on every point
+        """
+        self.model.setParam('sld_M0', 1.0)
+        self.assertFalse(is_centrosymmetric(self.model))
+        self.assertFalse(is_centrosymmetric(object()))
+
+    def test_residuals(self):
+        """
+        Test the residuals of a fit computed on half the points
+        """
+        n = len(self.qx)
+        data = Data2D(data=np.ones(n), err_data=0.1*np.ones(n),
+                      qx_data=self.qx, qy_data=self.qy,
+                      q_data=np.sqrt(self.qx**2 + self.qy**2),
+                      mask=np.ones(n, dtype=bool))
+        data.xmin, data.xmax, data.ymin, data.ymax = -0.2, 0.2, -0.1, 0.1
+        fitdata = FitData2D(sas_data2d=data, data=data.data,
+                            err_data=data.err_data)
+        fitdata.set_fit_range(qmin=0.01, qmax=0.15)
+        res, theory = fitdata.residuals(self.model.evalDistribution)
+        full = self.model.evalDistribution([self.qx[fitdata.idx],
+                                            self.qy[fitdata.idx]])
+        np.testing.assert_allclose(theory, full, rtol=1e-12)
+        self.assertLess(fitdata._evaluator.fraction, 0.51)
+
+
+if __name__ == '__main__':
+    unittest.main()
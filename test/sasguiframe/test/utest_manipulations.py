@@ -162,6 +162,23 @@ class ManipTests(unittest.TestCase):
             self.assertEqual(result.y[i], 3.0)
             self.assertEqual(result.dy[i], 6.0 * 0.5 / 4.0)
 
+    def test_inplace(self):
+        """
+            Test the in-place operators match the binary ones
+        """
+        expected = (self.data2 - self.data) * 2.0
+        result = self.data2
+        y = result.y
+        result -= self.data
+        result *= 2.0
+        self.assertTrue(result is self.data2)
+        self.assertTrue(result.y is y)
+        np.testing.assert_array_equal(result.y, expected.y)
+        np.testing.assert_array_equal(result.dy, expected.dy)
+        # the right-hand side is left untouched
+        np.testing.assert_array_equal(self.data.y, 2.0)
+        np.testing.assert_array_equal(self.data.dy, 0.5)
+
 
 class Manin2DTests(unittest.TestCase):
 
@@ -272,6 +289,36 @@ class Manin2DTests(unittest.TestCase):
             self.assertEqual(result.data[i], 3.0)
             self.assertEqual(result.err_data[i], 6.0 * 0.5 / 4.0)
 
+    def test_inplace(self):
+        """
+            Test the in-place operators match the binary ones
+        """
+        expected = self.data / self.data2 + 1.0
+        result = self.data
+        data = result.data
+        result /= self.data2
+        result += 1.0
+        self.assertTrue(result is self.data)
+        self.assertTrue(result.data is data)
+        np.testing.assert_array_equal(result.data, expected.data)
+        np.testing.assert_array_equal(result.err_data, expected.err_data)
+        np.testing.assert_array_equal(result.dqx_data, expected.dqx_data)
+        np.testing.assert_array_equal(result.qx_data, expected.qx_data)
+
+    def test_mismatch(self):
+        """
+            Test the first mismatching q value is reported
+        """
+        self.data2.qy_data = self.data2.qy_data * 1.0
+        self.data2.qy_data[3] = 5.0
+        try:
+            self.data + self.data2
+            self.fail("ValueError not raised")
+        except ValueError as exc:
+            self.assertTrue(str(exc).endswith("qy-values do not match: 3 5.0"))
+        self.assertRaises(ValueError, self.data.__iadd__, self.data2)
+        self.assertEqual(self.data.data[0], 2.0)
+
 
 class ExtraManip2DTests(unittest.TestCase):
 
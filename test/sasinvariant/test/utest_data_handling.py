@@ -682,3 +682,67 @@ class TestDataExtraHighSlitPowerLaw(unittest.TestCase):
         for i in range(len(self.data.x[start:])):
             value  = math.fabs(test_y[i]- temp[i])/temp[i]
             self.assert_(value < 0.001)                
+
+
+class TestBatchInvariantCalculator(unittest.TestCase):
+    """
+        Test the batch calculator against InvariantCalculator
+    """
+    def setUp(self):
+        self.data = Loader().load(find("PolySpheres.txt"))[0]
+        x = np.linspace(0.001, 0.3, 60)
+        y = 1000.0 * np.exp(-x * x * 400.0)
+        self.smeared = Data1D(x=x, y=y, dy=0.05 * y)
+        self.smeared.dxl = 0.02 * np.ones(len(x))
+        self.no_error = Data1D(x=x[:20], y=y[:20])
+
+    def test_qstar(self):
+        data = [self.data, self.smeared, self.no_error]
+        batch = invariant.BatchInvariantCalculator(data, background=0.1,
+                                                   scale=[1, 2, 3])
+        qstar, dqstar = batch.get_qstar_with_error()
+        for i, item in enumerate(data):
+            inv = invariant.InvariantCalculator(item, background=0.1,
+                                                scale=i + 1)
+            value, error = inv.get_qstar_with_error()
+            self.assertAlmostEqual(qstar[i] / value, 1.0, 12)
+            self.assertAlmostEqual(dqstar[i] / error, 1.0, 12)
+
+    def test_volume_and_surface(self):
+        batch = invariant.BatchInvariantCalculator([self.data, self.data],
+                                                   background=[0, 1e6])
+        inv = invariant.InvariantCalculator(self.data)
+        v, dv = batch.get_volume_fraction_with_error(2.6e-6)
+        s, ds = batch.get_surface_with_error(2.6e-6, 2e-5)
+        np.testing.assert_allclose(
+            [v[0], dv[0]], inv.get_volume_fraction_with_error(2.6e-6),
+            rtol=1e-12)
+        np.testing.assert_allclose(
+            [s[0], ds[0]], inv.get_surface_with_error(2.6e-6, 2e-5),
+            rtol=1e-12)
+        # A negative invariant has no volume fraction
+        self.assertTrue(np.isnan([v[1], dv[1], s[1], ds[1]]).all())
+        self.assertRaises(ValueError, batch.get_volume_fraction_with_error, 0)
+
+    def test_array(self):
+        q = self.smeared.x
+        iq = np.outer([1.0, 2.0, 3.0], self.smeared.y)
+        batch = invariant.BatchInvariantCalculator(iq, q=q)
+        qstar = batch.get_qstar()
+        for i in range(3):
+            inv = invariant.InvariantCalculator(Data1D(x=q, y=iq[i]))
+            self.assertAlmostEqual(qstar[i] / inv.get_qstar(), 1.0, 12)
+        self.assertRaises(ValueError, invariant.BatchInvariantCalculator,
+                          iq[:, :-1], q=q)
+
+    def test_trapezoid_sum(self):
+        """
+            Every point contributes to the invariant sum
+        """
+        x = np.array([1.0, 2.0, 4.0, 5.0])
+        data = Data1D(x=x, y=np.ones(4))
+        expected = 1 * 0.5 + 4 * 1.5 + 16 * 1.5 + 25 * 0.5
+        inv = invariant.InvariantCalculator(data)
+        self.assertAlmostEqual(inv.get_qstar(), expected)
+        batch = invariant.BatchInvariantCalculator([data])
+        self.assertAlmostEqual(batch.get_qstar()[0], expected)